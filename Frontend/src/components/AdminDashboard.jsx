@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { getAllBooks, createBook, updateBook, deleteBook, getAllCategories, createCategoria, updateCategoria, deleteCategoria } from "../utils/api";
+import { getAllBooks, createBook, updateBook, deleteBook, getAllCategories, createCategoria, updateCategoria, deleteCategoria, subscribeCatalogo } from "../utils/api";
 
 export default function AdminDashboard() {
     const [books, setBooks] = useState([]);
@@ -51,6 +51,28 @@ export default function AdminDashboard() {
         }
     }, [isAdmin]);
 
+    // Live stock/catalog changes from other sessions (no polling)
+    useEffect(() => {
+        if (!isAdmin) {
+            return;
+        }
+
+        return subscribeCatalogo((eventos) => {
+            // Stock-only changes are patched in place; anything else triggers a refetch
+            const soloStock = eventos.every((evento) => evento.tipo === "libro" && evento.accion === "actualizado" && evento.campos?.every((campo) => campo === "cantidad_disponible"));
+            if (!soloStock) {
+                fetchBooks();
+                if (eventos.some((evento) => evento.tipo === "categoria" || evento.tipo === "resync")) {
+                    fetchCategorias();
+                }
+                return;
+            }
+
+            const stock = new Map(eventos.map((evento) => [evento.id, evento.cantidad_disponible]));
+            setBooks((previos) => previos.map((libro) => stock.has(libro.id) ? { ...libro, cantidad_disponible: stock.get(libro.id) } : libro));
+        });
+    }, [isAdmin]);
+
     // Filter books when search term or filter changes
     useEffect(() => {
         filterBooks();
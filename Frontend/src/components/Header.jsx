@@ -48,6 +48,7 @@ export default function Header() {
         // Remove all auth-related data from localStorage
         localStorage.removeItem("user_id");
         localStorage.removeItem("access_token");
+        localStorage.removeItem("refresh_token");
         localStorage.removeItem("user_email");
 
         // Redirect to home page
@@ -27,6 +27,11 @@ export default function LoginForm() {
             if (data.is_admin !== undefined) {
                 localStorage.setItem('is_admin', data.is_admin.toString());
             }
+            // Tokens para las rutas protegidas del backend
+            if (data.access_token) {
+                localStorage.setItem('access_token', data.access_token);
+                localStorage.setItem('refresh_token', data.refresh_token);
+            }
 
             // Redirigir según el rol del usuario
             if (data.is_admin) {
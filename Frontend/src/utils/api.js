@@ -6,6 +6,18 @@
 // URL base del backend
 const API_BASE_URL = 'http://localhost:8000';
 
+/**
+ * Encabezados JSON con el token de acceso (si hay sesión iniciada)
+ * @returns {Object} Encabezados para rutas protegidas
+ */
+function authHeaders() {
+    const token = localStorage.getItem('access_token');
+    return {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    };
+}
+
 /**
  * Registra un nuevo usuario en el sistema
  * @param {Object} credentials - Objeto con las credenciales del usuario
@@ -115,6 +127,42 @@ export async function getAllBooks(categoria_id = null) {
     }
 }
 
+/**
+ * Obtiene varios libros por ID en una sola petición (carrito, resumen, carruseles)
+ * @param {Array<number>} ids - IDs de los libros, en el orden deseado
+ * @param {Array<string>} fields - Campos opcionales a incluir en cada libro (el id siempre va)
+ * @returns {Promise<{items: Array, faltantes: Array<number>}>} Libros encontrados e IDs inexistentes
+ */
+export async function getBooksByIds(ids, fields = null) {
+    try {
+        // Sets grandes van por POST para no exceder el largo de la URL
+        const response = ids.length > 100
+            ? await fetch(`${API_BASE_URL}/libros/batch`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ ids, fields }),
+            })
+            : await fetch(`${API_BASE_URL}/libros/batch?ids=${ids.join(',')}${fields ? `&fields=${fields.join(',')}` : ''}`, {
+                method: 'GET',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+            });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || 'Error al obtener los libros');
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error('Error en getBooksByIds:', error);
+        throw error;
+    }
+}
+
 /**
  * Crea un nuevo libro
  * @param {Object} bookData - Datos del libro a crear
@@ -124,9 +172,7 @@ export async function createBook(bookData) {
     try {
         const response = await fetch(`${API_BASE_URL}/libros/`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
             body: JSON.stringify(bookData),
         });
 
@@ -154,9 +200,7 @@ export async function updateBook(bookId, bookData) {
     try {
         const response = await fetch(`${API_BASE_URL}/libros/${bookId}`, {
             method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
             body: JSON.stringify(bookData),
         });
 
@@ -183,9 +227,7 @@ export async function deleteBook(bookId) {
     try {
         const response = await fetch(`${API_BASE_URL}/libros/${bookId}`, {
             method: 'DELETE',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
         });
 
         if (!response.ok) {
@@ -240,9 +282,7 @@ export async function createCategoria(categoriaData) {
     try {
         const response = await fetch(`${API_BASE_URL}/categorias/`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
             body: JSON.stringify(categoriaData),
         });
 
@@ -270,9 +310,7 @@ export async function updateCategoria(categoriaId, categoriaData) {
     try {
         const response = await fetch(`${API_BASE_URL}/categorias/${categoriaId}`, {
             method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
             body: JSON.stringify(categoriaData),
         });
 
@@ -299,9 +337,7 @@ export async function deleteCategoria(categoriaId) {
     try {
         const response = await fetch(`${API_BASE_URL}/categorias/${categoriaId}`, {
             method: 'DELETE',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: authHeaders(),
         });
 
         if (!response.ok) {
@@ -316,3 +352,38 @@ export async function deleteCategoria(categoriaId) {
         throw error;
     }
 }
+
+/**
+ * Se suscribe a los cambios del catálogo en vivo (/ws/catalogo)
+ * @param {Function} onEventos - Recibe el arreglo de eventos de cada mensaje
+ * @returns {Function} Cierra la conexión
+ */
+export function subscribeCatalogo(onEventos) {
+    let socket = null;
+    let cerrado = false;
+
+    const conectar = () => {
+        socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/catalogo`);
+        socket.onmessage = (message) => {
+            const eventos = JSON.parse(message.data).filter((evento) => evento.tipo !== 'ping');
+            if (eventos.length) {
+                onEventos(eventos);
+            }
+        };
+        // Reconectar tras un corte; al volver puede haber cambios perdidos
+        socket.onclose = () => {
+            if (!cerrado) {
+                setTimeout(() => {
+                    conectar();
+                    onEventos([{ tipo: 'resync' }]);
+                }, 3000);
+            }
+        };
+    };
+
+    conectar();
+    return () => {
+        cerrado = true;
+        socket.close();
+    };
+}
@@ -0,0 +1,248 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import config
+from serializacion import dumps
+
+'''
+CLASES DE RUTA
+'''
+# Cada clase tiene su propio bucket por cliente: un pico de logins (PBKDF2)
+# no se come el presupuesto de lectura del catálogo y viceversa
+AUTH = "auth"
+LECTURA = "lectura"
+ESCRITURA = "escritura"
+
+# Fuera de la admisión: el scrape de métricas debe seguir respondiendo bajo carga
+EXENTAS = frozenset({"/metrics"})
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith("/auth/") and method == "POST":
+        return AUTH
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return LECTURA
+    return ESCRITURA
+
+
+def client_key(scope) -> str:
+    # Detrás de un proxy la IP del socket es la del proxy; solo entonces se
+    # confía en el primer X-Forwarded-For
+    if config.RATE_LIMIT_TRUST_PROXY:
+        for nombre, valor in scope["headers"]:
+            if nombre == b"x-forwarded-for":
+                return valor.decode("latin-1").split(",", 1)[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "desconocido"
+
+
+def parse_rate(valor: str) -> Tuple[float, float]:
+    # "tasa,ráfaga": tokens por segundo y capacidad del bucket
+    tasa, rafaga = (float(parte) for parte in valor.split(","))
+    return tasa, rafaga
+
+
+'''
+TOKEN BUCKETS
+'''
+class TokenBuckets:
+    # Un dict por shard con tuplas (tokens, último acceso). Todo corre en el
+    # hilo del event loop, así que no hace falta lock; los shards solo sirven
+    # para barrer los clientes inactivos de a poco en lugar de todos a la vez
+    def __init__(self, tasa: float, rafaga: float, shards: int):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._shards: List[Dict[str, Tuple[float, float]]] = [{} for _ in range(shards)]
+        # Un bucket que lleva este tiempo sin uso ya está lleno: borrarlo no cambia nada
+        self._inactivo = rafaga / tasa
+        self._cursor = 0
+        self._proximo_barrido = 0.0
+        self.rechazados = 0
+        self.desalojados = 0
+
+    def take(self, key: str, now: float) -> float:
+        # 0 si hay token; si no, segundos hasta que haya uno
+        shard = self._shards[hash(key) % len(self._shards)]
+        tokens, ultimo = shard.get(key, (self.rafaga, now))
+        tokens = min(self.rafaga, tokens + (now - ultimo) * self.tasa)
+        if now >= self._proximo_barrido:
+            self._sweep(now)
+
+        if tokens >= 1:
+            shard[key] = (tokens - 1, now)
+            return 0.0
+        shard[key] = (tokens, now)
+        self.rechazados += 1
+        return (1 - tokens) / self.tasa
+
+    def _sweep(self, now: float):
+        # Un shard por vuelta; todos los shards se recorren en ~1 s
+        shard = self._shards[self._cursor]
+        self._cursor = (self._cursor + 1) % len(self._shards)
+        self._proximo_barrido = now + 1 / len(self._shards)
+        viejos = [key for key, (_, ultimo) in shard.items() if now - ultimo >= self._inactivo]
+        for key in viejos:
+            del shard[key]
+        self.desalojados += len(viejos)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class RateLimiter:
+    def __init__(self, limites: Dict[str, Tuple[float, float]], shards: int):
+        self.buckets = {clase: TokenBuckets(tasa, rafaga, shards) for clase, (tasa, rafaga) in limites.items()}
+
+    def check(self, clase: str, key: str) -> float:
+        return self.buckets[clase].take(key, time.monotonic())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            clase: {"clientes": len(buckets), "rechazados": buckets.rechazados, "desalojados": buckets.desalojados}
+            for clase, buckets in self.buckets.items()
+        }
+
+
+'''
+LIMITADOR DE CONCURRENCIA
+'''
+class LoadShedder:
+    # Hasta max_inflight requests a la vez; los demás esperan en una cola FIFO
+    # acotada. Si la cola está llena o la espera pasa de max_wait_ms se
+    # rechaza de inmediato: mejor un 503 rápido que un timeout del cliente
+    # tras haber hecho trabajo que nadie va a leer
+    def __init__(self, max_inflight: int, max_queue: int, max_wait_ms: float):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_wait = max_wait_ms / 1000
+        self.inflight = 0
+        self._cola: Deque[asyncio.Future] = deque()
+        self.admitidos = 0
+        self.encolados = 0
+        self.rechazados = 0
+
+    async def acquire(self) -> bool:
+        if self.inflight < self.max_inflight and not self._cola:
+            self.inflight += 1
+            self.admitidos += 1
+            return True
+        if len(self._cola) >= self.max_queue:
+            self.rechazados += 1
+            return False
+
+        espera = asyncio.get_running_loop().create_future()
+        self._cola.append(espera)
+        self.encolados += 1
+        try:
+            # release() pasa su lugar directo al primero de la cola (inflight no baja)
+            await asyncio.wait_for(espera, self.max_wait)
+        except asyncio.TimeoutError:
+            # release() pudo haberle pasado el lugar en la misma vuelta del loop
+            # en que venció la espera: se devuelve para no perder capacidad
+            if espera.done() and not espera.cancelled():
+                self.release()
+            elif espera in self._cola:
+                self._cola.remove(espera)
+            self.rechazados += 1
+            return False
+        except asyncio.CancelledError:
+            # El cliente se fue mientras esperaba; si alcanzó a recibir el lugar, se devuelve
+            if espera.done() and not espera.cancelled():
+                self.release()
+            elif espera in self._cola:
+                self._cola.remove(espera)
+            raise
+        self.admitidos += 1
+        return True
+
+    def release(self):
+        while self._cola:
+            espera = self._cola.popleft()
+            if not espera.done():
+                espera.set_result(None)
+                return
+        self.inflight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "en_vuelo": self.inflight,
+            "en_cola": len(self._cola),
+            "admitidos": self.admitidos,
+            "encolados": self.encolados,
+            "rechazados": self.rechazados,
+        }
+
+
+'''
+MIDDLEWARE
+'''
+def build_rate_limiter() -> Optional[RateLimiter]:
+    if not config.RATE_LIMIT_ENABLED:
+        return None
+    return RateLimiter({
+        AUTH: parse_rate(config.RATE_LIMIT_AUTH),
+        LECTURA: parse_rate(config.RATE_LIMIT_LECTURA),
+        ESCRITURA: parse_rate(config.RATE_LIMIT_ESCRITURA),
+    }, config.RATE_LIMIT_SHARDS)
+
+
+def build_load_shedder() -> Optional[LoadShedder]:
+    if not config.LOAD_SHED_ENABLED:
+        return None
+    return LoadShedder(config.LOAD_SHED_MAX_INFLIGHT, config.LOAD_SHED_MAX_QUEUE, config.LOAD_SHED_MAX_WAIT_MS)
+
+
+rate_limiter = build_rate_limiter()
+load_shedder = build_load_shedder()
+
+
+def admission_stats() -> Dict[str, object]:
+    return {
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "concurrencia": load_shedder.stats() if load_shedder is not None else None,
+    }
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    # ASGI puro como MetricsMiddleware. Primero el bucket del cliente (429:
+    # ese cliente pide de más) y luego la concurrencia global (503: el
+    # servidor está lleno, aunque el cliente se porte bien)
+    def __init__(self, app, limiter: Optional[RateLimiter] = None, shedder: Optional[LoadShedder] = None):
+        self.app = app
+        self.limiter = limiter if limiter is not None else rate_limiter
+        self.shedder = shedder if shedder is not None else load_shedder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXENTAS:
+            return await self.app(scope, receive, send)
+
+        if self.limiter is not None:
+            espera = self.limiter.check(route_class(scope["method"], scope["path"]), client_key(scope))
+            if espera:
+                return await _reject(send, 429, "Demasiadas solicitudes, intenta más tarde", espera)
+
+        if self.shedder is None:
+            return await self.app(scope, receive, send)
+        if not await self.shedder.acquire():
+            return await _reject(send, 503, "Servidor saturado, intenta más tarde", config.LOAD_SHED_RETRY_AFTER)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.release()
@@ -0,0 +1,174 @@
+'''
+Benchmark de admisión: latencia de los requests admitidos bajo sobrecarga
+
+Levanta la API con uvicorn en un subproceso (base temporal) dos veces, sin y
+con admisión, y la satura con clientes en lazo cerrado (sin pausa) contra
+GET /libros/ a concurrencia creciente. Cada cliente manda su propia IP en
+X-Forwarded-For (RATE_LIMIT_TRUST_PROXY=1) y, con --login, un cliente extra
+repite POST /auth/login desde una sola IP para ejercitar el bucket de auth.
+Los clientes respetan Retry-After. Reporta por nivel: requests/s atendidos,
+p50/p99 de los 200 y cuántos 429/503.
+Sin admisión el p99 crece con la concurrencia (todo se encola); con admisión
+debe quedar plano y el excedente sale como 503 rápido.
+Uso (desde backend/):
+    python -m benchmarks.admision --niveles 16 64 256 1024 --segundos 5
+'''
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Tuple
+
+import httpx
+
+from benchmarks.datos import PASSWORD, correo
+from benchmarks.ws_catalogo import free_port
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1)
+
+
+def prepare(env: dict):
+    codigo = (
+        "from db import create_db_and_tables, engine\n"
+        "from benchmarks.datos import generate\n"
+        "create_db_and_tables()\n"
+        "generate(engine, categorias=10, libros=2000, usuarios=1, carritos=0, ventas=0, semilla=1)\n"
+    )
+    subprocess.run([sys.executable, "-c", codigo], env=env, check=True, capture_output=True)
+
+
+async def request(reader, writer, linea: bytes, ip: str, body: bytes = b"") -> Tuple[int, float]:
+    # HTTP/1.1 keep-alive a mano: con cientos de clientes httpx gasta más CPU
+    # que el servidor y la cola que se mide termina siendo la del cliente
+    writer.write(
+        linea + b"\r\nHost: bench\r\nX-Forwarded-For: " + ip.encode()
+        + b"\r\nContent-Type: application/json\r\nContent-Length: " + str(len(body)).encode()
+        + b"\r\n\r\n" + body
+    )
+    encabezados = await reader.readuntil(b"\r\n\r\n")
+    status_code = int(encabezados[9:12])
+    largo, retry_after = 0, 0.0
+    for linea_encabezado in encabezados.split(b"\r\n"):
+        nombre, _, valor = linea_encabezado.partition(b":")
+        if nombre.lower() == b"content-length":
+            largo = int(valor)
+        elif nombre.lower() == b"retry-after":
+            retry_after = float(valor)
+    await reader.readexactly(largo)
+    return status_code, retry_after
+
+
+async def cliente(port: int, ip: str, hasta: float, latencias: list, codigos: Counter, login: bool = False):
+    if login:
+        linea = b"POST /auth/login HTTP/1.1"
+        body = json.dumps({"correo": correo(0), "password": PASSWORD}).encode()
+    else:
+        linea, body = b"GET /libros/?limit=20 HTTP/1.1", b""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < hasta:
+            inicio = time.perf_counter()
+            try:
+                status_code, retry_after = await request(reader, writer, linea, ip, body)
+            except (OSError, asyncio.IncompleteReadError):
+                codigos["error"] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                continue
+            if login:
+                codigos[f"login {status_code}"] += 1
+            else:
+                codigos[status_code] += 1
+                if status_code == 200:
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+            # Un cliente bien portado respeta el Retry-After de los 429/503
+            if retry_after:
+                await asyncio.sleep(min(retry_after, max(0.0, hasta - time.perf_counter())))
+    finally:
+        writer.close()
+
+
+async def nivel(port: int, concurrencia: int, segundos: float, login: bool) -> dict:
+    latencias, codigos = [], Counter()
+    hasta = time.perf_counter() + segundos
+    tareas = [cliente(port, f"10.0.{i // 256}.{i % 256}", hasta, latencias, codigos) for i in range(concurrencia)]
+    if login:
+        # Un solo cliente abusivo: sus logins topan con el bucket de auth
+        tareas.append(cliente(port, "10.255.0.1", hasta, latencias, codigos, login=True))
+    inicio = time.perf_counter()
+    await asyncio.gather(*tareas)
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "concurrencia": concurrencia,
+        "atendidos/s": round(len(latencias) / duracion, 1),
+        "p50 ms": percentile(latencias, 50) if latencias else None,
+        "p99 ms": percentile(latencias, 99) if latencias else None,
+        "códigos": {str(codigo): n for codigo, n in sorted(codigos.items(), key=str)},
+    }
+
+
+async def modo(args, admision: bool) -> list:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'admision.db')}",
+            RECOMENDACIONES_DIR=os.path.join(tmp, "recomendaciones"),
+            RATE_LIMIT_ENABLED="1" if admision else "0",
+            LOAD_SHED_ENABLED="1" if admision else "0",
+            RATE_LIMIT_TRUST_PROXY="1",
+            METRICS_ENABLED="0",
+        )
+        prepare(env)
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+             "--backlog", "4096"],
+            env=env,
+        )
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                for _ in range(100):
+                    try:
+                        (await client.get("/")).raise_for_status()
+                        break
+                    except httpx.HTTPError:
+                        await asyncio.sleep(0.1)
+            resultados = []
+            for concurrencia in args.niveles:
+                resultados.append(await nivel(port, concurrencia, args.segundos, args.login))
+                await asyncio.sleep(1)
+            return resultados
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+
+async def run(args) -> dict:
+    resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2)
+    return {
+        "sin admisión": await modo(args, False),
+        "con admisión": await modo(args, True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--niveles", type=int, nargs="+", default=[16, 64, 256, 1024])
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--login", action="store_true", help="Agrega un cliente que repite logins desde una IP")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
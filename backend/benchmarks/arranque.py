@@ -0,0 +1,95 @@
+'''
+Benchmark de arranque: desde `import main` hasta el primer request atendido
+
+Cada corrida es un proceso nuevo (imports en frío) que importa la app, corre
+el lifespan (migraciones) y atiende un GET /categorias/. Se mide dos casos:
+    - base nueva: se aplica todo el esquema y las categorías iniciales
+    - base al día: el marcador de versión ya está, el arranque es un SELECT
+Reporta la mediana de cada fase en ms y las consultas SQL del lifespan.
+Uso (desde backend/):
+    python -m benchmarks.arranque --repeat 5
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Se corre en el proceso hijo; imprime una línea JSON con los tiempos
+HIJO = r'''
+import json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from db import engine
+
+consultas = []
+event.listen(engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+with TestClient(main.app) as client:
+    listo = time.perf_counter()
+    sql_arranque = len(consultas)
+    response = client.get("/categorias/")
+    response.raise_for_status()
+    servido = time.perf_counter()
+
+import sys
+print(json.dumps({
+    "import ms": (importado - inicio) * 1000,
+    "lifespan ms": (listo - importado) * 1000,
+    "primer request ms": (servido - listo) * 1000,
+    "total ms": (servido - inicio) * 1000,
+    "sql arranque": sql_arranque,
+    "passlib cargado": "passlib.context" in sys.modules,
+}))
+'''
+
+
+def corrida(database_url: str) -> dict:
+    # Sin workers de tareas: sus procesos importarían en paralelo y ensuciarían la medición
+    env = dict(os.environ, DATABASE_URL=database_url, MIGRATIONS_AUTO="1", TAREAS_WORKERS="0")
+    salida = subprocess.run(
+        [sys.executable, "-c", HIJO], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def resumen(corridas: list) -> dict:
+    resultado = {}
+    for campo, valor in corridas[0].items():
+        if isinstance(valor, bool):
+            resultado[campo] = any(c[campo] for c in corridas)
+        else:
+            resultado[campo] = round(statistics.median(c[campo] for c in corridas), 1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    nueva, al_dia = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.repeat):
+            # Base nueva en cada vuelta: arranque de un despliegue desde cero
+            nueva.append(corrida(f"sqlite:///{os.path.join(tmp, f'nueva_{i}.db')}"))
+        # La primera base ya quedó migrada: arranques siguientes
+        url = f"sqlite:///{os.path.join(tmp, 'nueva_0.db')}"
+        for _ in range(args.repeat):
+            al_dia.append(corrida(url))
+
+    print(json.dumps({
+        "repeticiones": args.repeat,
+        "base nueva": resumen(nueva),
+        "base al día": resumen(al_dia),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
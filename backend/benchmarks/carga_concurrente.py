@@ -0,0 +1,118 @@
+'''
+Prueba de carga: lecturas del catálogo mientras hay escrituras de checkout
+
+Compara el modo de journal clásico (DELETE) contra WAL usando el mismo
+build_engine de db.py, y en WAL las lecturas sobre el pool de escritura
+(compartido) contra el pool de solo lectura (mode=ro). Con más escritores
+que conexiones y transacciones que retienen el lock (--trabajo-ms), en el
+pool compartido las lecturas esperan conexión detrás de los checkouts.
+Uso (desde backend/):
+    python -m benchmarks.carga_concurrente --lectores 8 --escritores 4 --segundos 5
+    python -m benchmarks.carga_concurrente --escritores 48 --trabajo-ms 2
+'''
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+
+from benchmarks.paginacion import seed
+import config
+from db import build_engine, read_database_url, read_only_pragmas, sqlite_pragmas
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(journal_mode: str, args, pool_lectura: bool = False) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'carga.db')}"
+        pragmas = sqlite_pragmas() | {"journal_mode": journal_mode}
+        pool = {"pool_size": args.pool_escritura, "max_overflow": 0} if args.pool_escritura else {}
+        engine = build_engine(url, pragmas=pragmas, **pool)
+        seed(engine, args.libros)
+        lector_engine = engine
+        if pool_lectura:
+            lector_engine = build_engine(
+                read_database_url(url), pragmas=read_only_pragmas(),
+                pool_size=config.DB_READ_POOL_SIZE, max_overflow=config.DB_READ_MAX_OVERFLOW
+            )
+
+        stop = threading.Event()
+        lecturas, escrituras, errores = [], [], []
+
+        def lector():
+            while not stop.is_set():
+                offset = random.randrange(0, args.libros - 100)
+                start = time.perf_counter()
+                try:
+                    with lector_engine.connect() as conn:
+                        conn.execute(
+                            text("SELECT * FROM libro WHERE id > :id ORDER BY id LIMIT 100"), {"id": offset}
+                        ).all()
+                    lecturas.append((time.perf_counter() - start) * 1000)
+                except Exception as exc:
+                    errores.append(exc)
+
+        def escritor():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        for _ in range(5):
+                            conn.execute(
+                                text("UPDATE libro SET cantidad_disponible = cantidad_disponible + 1 WHERE id = :id"),
+                                {"id": random.randint(1, args.libros)},
+                            )
+                        # Trabajo dentro de la transacción (validaciones, totales) con el lock tomado
+                        if args.trabajo_ms:
+                            time.sleep(args.trabajo_ms / 1000)
+                    escrituras.append((time.perf_counter() - start) * 1000)
+                except Exception as exc:
+                    errores.append(exc)
+
+        threads = [threading.Thread(target=lector) for _ in range(args.lectores)]
+        threads += [threading.Thread(target=escritor) for _ in range(args.escritores)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.segundos)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        lector_engine.dispose()
+
+        return {
+            "journal_mode": journal_mode,
+            "pool lectores": "solo lectura" if pool_lectura else "compartido",
+            "lecturas/s": round(len(lecturas) / args.segundos),
+            "lectura p50 ms": round(statistics.median(lecturas), 2) if lecturas else None,
+            "lectura p99 ms": round(percentile(lecturas, 99), 2) if lecturas else None,
+            "escrituras/s": round(len(escrituras) / args.segundos),
+            "errores": len(errores),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libros", type=int, default=20_000)
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--trabajo-ms", type=float, default=0)
+    parser.add_argument("--pool-escritura", type=int, default=0, help="Conexiones del pool de escritura (0 = DB_POOL_SIZE)")
+    args = parser.parse_args()
+
+    for journal_mode in ("DELETE", "WAL"):
+        print(run(journal_mode, args))
+    print(run("WAL", args, pool_lectura=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+'''
+Prueba de estrés del checkout: cientos de compradores compiten por las últimas copias
+
+Verifica que no haya sobreventa (stock final >= 0 y ventas == stock inicial)
+y mide checkouts por segundo. Uso (desde backend/):
+    python -m benchmarks.checkout_concurrente --compradores 300 --stock 50
+'''
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'checkout.db')}")
+# Todo el tráfico sale de una IP: sin admisión se mide la capacidad, no los límites
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOAD_SHED_ENABLED", "0")
+
+import httpx
+from sqlmodel import Session, insert, select
+
+from db import create_db_and_tables, engine
+from main import app
+from models import Carrito, CarritoLibroLink, Categoria, Libro, Usuario, Venta
+from security import create_access_token
+
+
+def seed(compradores: int, stock: int):
+    with Session(engine) as session:
+        categoria = session.exec(select(Categoria)).first()
+        escaso = Libro(
+            titulo="Última edición", autor="Autor", editorial="Editorial", precio=250,
+            cantidad_disponible=stock, descripcion="Pocas copias", paginas=100,
+            categoria_id=categoria.id, idioma="Español", fecha_publicacion=2020,
+            imagen_url="https://example.com/img.png",
+        )
+        session.add(escaso)
+        session.flush()
+
+        session.execute(insert(Usuario), [
+            {"correo": f"comprador{i}@example.com", "password": "x", "nombre": f"Comprador {i}",
+             "direccion": "Calle 1", "telefono": "1", "rfc": "RFC"}
+            for i in range(compradores)
+        ])
+        usuarios = session.exec(select(Usuario.id).order_by(Usuario.id)).all()
+        session.execute(insert(Carrito), [{"usuario_id": usuario_id} for usuario_id in usuarios])
+        carritos = session.exec(select(Carrito.id, Carrito.usuario_id).order_by(Carrito.id)).all()
+        session.execute(insert(CarritoLibroLink), [
+            {"carrito_id": carrito_id, "libro_id": escaso.id} for carrito_id, _ in carritos
+        ])
+        session.commit()
+        return escaso.id, carritos
+
+
+async def run(args):
+    create_db_and_tables()
+    libro_id, carritos = seed(args.compradores, args.stock)
+
+    async def comprar(client, carrito_id, usuario_id, clave):
+        token = create_access_token(usuario_id, False)
+        response = await client.post(
+            "/ventas/",
+            json={"carrito_id": carrito_id, "forma_pago": "tarjeta"},
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": clave},
+        )
+        return response.status_code
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        start = time.perf_counter()
+        codes = await asyncio.gather(*(
+            comprar(client, carrito_id, usuario_id, f"compra-{carrito_id}") for carrito_id, usuario_id in carritos
+        ))
+        elapsed = time.perf_counter() - start
+
+        # Reintentos con la misma llave: no deben crear ventas nuevas
+        ganadores = [c for c, code in zip(carritos, codes) if code == 201][:10]
+        replays = await asyncio.gather(*(
+            comprar(client, carrito_id, usuario_id, f"compra-{carrito_id}") for carrito_id, usuario_id in ganadores
+        ))
+
+    with Session(engine) as session:
+        stock_final = session.get(Libro, libro_id).cantidad_disponible
+        ventas = len(session.exec(select(Venta.id)).all())
+
+    resultado = {
+        "compradores": args.compradores,
+        "stock_inicial": args.stock,
+        "201": codes.count(201),
+        "409": codes.count(409),
+        "otros": len(codes) - codes.count(201) - codes.count(409),
+        "replays_200": replays.count(200),
+        "ventas_registradas": ventas,
+        "stock_final": stock_final,
+        "checkouts/s": round(len(codes) / elapsed, 1),
+        "sin_sobreventa": stock_final >= 0 and ventas == args.stock - stock_final == codes.count(201),
+    }
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return resultado["sin_sobreventa"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compradores", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+'''
+Generador de datos para benchmarks
+
+Llena la base configurada (DATABASE_URL, libreria.db por defecto) con N
+categorías, libros, usuarios, carritos y ventas. Con la misma semilla genera
+siempre los mismos datos. Uso (desde backend/):
+    python -m benchmarks.datos --libros 20000 --usuarios 2000 --ventas 10000
+'''
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, insert, select
+
+from models import Carrito, CarritoLibroLink, Categoria, Libro, Usuario, Venta, VentaLibroLink
+
+# Todos los usuarios generados comparten esta contraseña (se hashea una sola vez)
+PASSWORD = "benchmark123"
+BATCH_SIZE = 5000
+
+SUSTANTIVOS = [
+    "sombra", "jardín", "viento", "ciudad", "espejo", "río", "memoria", "invierno", "laberinto", "faro",
+    "desierto", "bosque", "reloj", "puerto", "silencio", "tormenta", "camino", "isla", "llama", "noche",
+]
+ADJETIVOS = [
+    "perdido", "eterno", "oscuro", "dorado", "secreto", "último", "antiguo", "infinito", "roto", "salvaje",
+]
+
+
+def correo(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def _batched(session: Session, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        session.execute(insert(model), batch)
+
+
+def generate(
+    engine,
+    categorias: int = 20,
+    libros: int = 5000,
+    usuarios: int = 500,
+    carritos: int = 500,
+    ventas: int = 2000,
+    semilla: int = 42,
+    stock: int = 1_000_000
+) -> dict:
+    # Supone que el esquema ya existe (create_db_and_tables)
+    from estadisticas import backfill
+    from security import hash_password
+
+    rng = random.Random(semilla)
+    password = hash_password(PASSWORD)
+    carritos = min(carritos, usuarios)
+    ahora = datetime.utcnow()
+
+    with Session(engine) as session:
+        existentes = set(session.exec(select(Categoria.nombre)).all())
+        _batched(session, Categoria, (
+            {"nombre": f"Categoría {i}"} for i in range(categorias) if f"Categoría {i}" not in existentes
+        ))
+        categoria_ids = session.exec(select(Categoria.id)).all()
+
+        primer_libro = (session.exec(select(Libro.id).order_by(Libro.id.desc())).first() or 0) + 1
+        _batched(session, Libro, (
+            {
+                "titulo": f"El {rng.choice(SUSTANTIVOS)} {rng.choice(ADJETIVOS)} {i}",
+                "autor": f"Autor {rng.randrange(libros // 10 + 1)}",
+                "editorial": f"Editorial {rng.randrange(50)}",
+                "precio": round(rng.uniform(80, 900), 2),
+                "cantidad_disponible": stock,
+                "descripcion": f"Una historia sobre el {rng.choice(SUSTANTIVOS)} y el {rng.choice(SUSTANTIVOS)}.",
+                "paginas": rng.randrange(80, 1200),
+                "categoria_id": rng.choice(categoria_ids),
+                "idioma": rng.choice(["Español", "Inglés", "Francés"]),
+                "fecha_publicacion": rng.randrange(1900, 2025),
+                "imagen_url": f"https://example.com/portadas/{i}.png",
+            }
+            for i in range(libros)
+        ))
+        libro_ids = range(primer_libro, primer_libro + libros)
+        precios = dict(session.exec(select(Libro.id, Libro.precio).where(Libro.id >= primer_libro)).all())
+        categorias_libro = dict(session.exec(select(Libro.id, Libro.categoria_id).where(Libro.id >= primer_libro)).all())
+
+        primer_usuario = (session.exec(select(Usuario.id).order_by(Usuario.id.desc())).first() or 0) + 1
+        _batched(session, Usuario, (
+            {
+                "correo": correo(i), "password": password, "nombre": f"Usuario {i}",
+                "direccion": f"Calle {i}", "telefono": "5555555555", "rfc": f"BENCH{i:08d}",
+            }
+            for i in range(usuarios)
+        ))
+        usuario_ids = range(primer_usuario, primer_usuario + usuarios)
+
+        _batched(session, Carrito, ({"usuario_id": usuario_id} for usuario_id in usuario_ids[:carritos]))
+        carrito_ids = session.exec(select(Carrito.id).where(Carrito.usuario_id >= primer_usuario)).all()
+        _batched(session, CarritoLibroLink, (
+            {"carrito_id": carrito_id, "libro_id": libro_id, "cantidad": rng.randint(1, 3)}
+            for carrito_id in carrito_ids
+            for libro_id in rng.sample(libro_ids, min(len(libro_ids), rng.randint(0, 5)))
+        ))
+
+        # Ventas con fechas repartidas en el último año
+        primera_venta = (session.exec(select(Venta.id).order_by(Venta.id.desc())).first() or 0) + 1
+        lineas = []
+        for _ in range(ventas):
+            elegidos = rng.sample(libro_ids, min(len(libro_ids), rng.randint(1, 4)))
+            lineas.append([(libro_id, rng.randint(1, 3)) for libro_id in elegidos])
+        _batched(session, Venta, (
+            {
+                "usuario_id": rng.choice(usuario_ids),
+                "total": round(sum(precios[libro_id] * cantidad for libro_id, cantidad in venta), 2),
+                "fecha": ahora - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                "forma_pago": rng.choice(["tarjeta", "efectivo", "transferencia"]),
+            }
+            for venta in lineas
+        ))
+        _batched(session, VentaLibroLink, (
+            {
+                "venta_id": primera_venta + i, "libro_id": libro_id, "cantidad": cantidad,
+                "precio_unitario": precios[libro_id], "categoria_id": categorias_libro[libro_id],
+            }
+            for i, venta in enumerate(lineas)
+            for libro_id, cantidad in venta
+        ))
+        session.commit()
+
+    # Los agregados del dashboard se reconstruyen a partir de las ventas
+    backfill(engine)
+
+    return {
+        "categorias": len(categoria_ids), "libros": libros, "usuarios": usuarios,
+        "carritos": len(carrito_ids), "ventas": ventas, "primer_usuario": primer_usuario,
+        "primer_libro": primer_libro,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categorias", type=int, default=20)
+    parser.add_argument("--libros", type=int, default=5000)
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--carritos", type=int, default=500)
+    parser.add_argument("--ventas", type=int, default=2000)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    from db import create_db_and_tables, engine
+
+    create_db_and_tables()
+    print(json.dumps(generate(
+        engine, args.categorias, args.libros, args.usuarios, args.carritos, args.ventas, args.semilla
+    ), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+'''
+Benchmark de login: logins/s por núcleo y su impacto en la latencia de /libros
+
+Uso (desde backend/):
+    python -m benchmarks.login --concurrencia 16 --segundos 5
+    PASSWORD_HASH_EXECUTOR=thread python -m benchmarks.login
+'''
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'login.db')}")
+# Todo el tráfico sale de una IP: sin admisión se mide la capacidad, no los límites
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOAD_SHED_ENABLED", "0")
+
+import httpx
+
+import config
+from db import create_db_and_tables
+from main import app
+from security import shutdown_executor
+
+USUARIO = {
+    "correo": "bench@example.com", "password": "secreto123", "nombre": "Bench",
+    "direccion": "Calle 1", "telefono": "5555555555", "rfc": "BENCH000000",
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+async def sample_libros(client, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/libros/?limit=20")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def login_loop(client, stop: asyncio.Event, counter: list):
+    credenciales = {"correo": USUARIO["correo"], "password": USUARIO["password"]}
+    while not stop.is_set():
+        response = await client.post("/auth/login", json=credenciales)
+        assert response.status_code == 200, response.text
+        counter.append(1)
+
+
+async def run(args):
+    create_db_and_tables()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json=USUARIO)
+
+        # Latencia de /libros sin carga de login
+        stop = asyncio.Event()
+        base = []
+        task = asyncio.create_task(sample_libros(client, stop, base))
+        await asyncio.sleep(args.segundos / 2)
+        stop.set()
+        await task
+
+        # Latencia de /libros durante un pico de logins
+        stop = asyncio.Event()
+        under_load, logins = [], []
+        tasks = [asyncio.create_task(login_loop(client, stop, logins)) for _ in range(args.concurrencia)]
+        tasks.append(asyncio.create_task(sample_libros(client, stop, under_load)))
+        start = time.perf_counter()
+        await asyncio.sleep(args.segundos)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    shutdown_executor()
+    logins_per_s = len(logins) / elapsed
+    return {
+        "executor": config.PASSWORD_HASH_EXECUTOR,
+        "workers": config.PASSWORD_HASH_WORKERS,
+        "rounds": config.PASSWORD_HASH_ROUNDS,
+        "logins/s": round(logins_per_s, 1),
+        "logins/s/nucleo": round(logins_per_s / config.PASSWORD_HASH_WORKERS, 1),
+        "libros p50 ms (sin carga)": round(statistics.median(base), 2),
+        "libros p99 ms (sin carga)": percentile(base, 99),
+        "libros p50 ms (con logins)": round(statistics.median(under_load), 2),
+        "libros p99 ms (con logins)": percentile(under_load, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+'''
+Benchmark de paginación: OFFSET/LIMIT contra keyset (cursor)
+
+Uso (desde backend/):
+    python -m benchmarks.paginacion --libros 120000
+'''
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel, create_engine, insert, select
+
+from models import Categoria, Libro
+from routers.libros import encode_cursor, libros_page_query
+
+
+def seed(engine, total: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Categoria(id=1, nombre="Benchmark"))
+        session.commit()
+
+        batch = []
+        for i in range(1, total + 1):
+            batch.append({
+                "titulo": f"Libro {i}", "autor": f"Autor {i % 500}", "editorial": "Editorial",
+                "precio": 100 + i % 400, "cantidad_disponible": i % 20, "descripcion": "Descripción",
+                "paginas": 200, "categoria_id": 1, "idioma": "Español",
+                "fecha_publicacion": 1950 + i % 70, "imagen_url": "https://example.com/img.png",
+            })
+            if len(batch) == 5000:
+                session.execute(insert(Libro), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Libro), batch)
+        session.commit()
+
+
+def measure(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libros", type=int, default=120_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed(engine, args.libros)
+
+        print(f"{'offset':>8} {'OFFSET (ms)':>12} {'keyset (ms)':>12}")
+        with Session(engine) as session:
+            for offset in (0, 10_000, 100_000):
+                if offset >= args.libros:
+                    continue
+
+                # El cursor equivalente apunta al último id de la página anterior
+                cursor = encode_cursor(offset) if offset else None
+
+                def by_offset():
+                    session.exec(select(Libro).order_by(Libro.id).offset(offset).limit(args.limit)).all()
+                    session.expunge_all()
+
+                def by_keyset():
+                    session.exec(libros_page_query(cursor, args.limit)).all()
+                    session.expunge_all()
+
+                print(f"{offset:>8} {measure(by_offset, args.repeat):>12.2f} {measure(by_keyset, args.repeat):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+'''
+Verificación de planes: ningún filtro del catálogo cae en un scan de la tabla
+
+Arma con libros_page_query todas las combinaciones de filtros soportados,
+cada orden y con/sin cursor, y revisa su EXPLAIN QUERY PLAN en SQLite:
+    - con algún filtro, libro se lee con SEARCH (índice), nunca SCAN libro,
+      ni de la tabla ni recorriendo un índice completo; la única excepción
+      son los índices parciales de en_stock, que solo tienen filas con stock
+    - sin filtros y en las combinaciones de ordenada(), el orden sale del
+      índice (sin TEMP B-TREE); en las demás el sort es sobre las filas que
+      ya filtró el índice
+Sale con código 1 si alguna combinación falla. Uso (desde backend/):
+    python -m benchmarks.planes_libros
+tests/test_planes.py corre lo mismo con hasta dos filtros a la vez dentro de
+la suite; este script revisa todas las combinaciones.
+'''
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import typing
+
+from sqlmodel import SQLModel
+
+from benchmarks.paginacion import seed
+from db import build_engine
+from models import Libro, LibroFiltros, LibroOrden
+from routers.libros import encode_cursor, libros_page_query
+from serializacion import libro_rows_query
+
+# Un valor representativo por filtro
+FILTROS = {
+    "categoria_id": 1,
+    "precio_min": 150.0,
+    "precio_max": 300.0,
+    "idioma": "Español",
+    "autor": "Autor 7",
+    "editorial": "Editorial",
+    "anio_min": 1990,
+    "anio_max": 2010,
+    "en_stock": True,
+}
+VALOR_CURSOR = {"precio": 200.0, "fecha_publicacion": 2000, "titulo": "Libro 500"}
+
+
+def plan(conn, query) -> typing.List[str]:
+    sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+# Filtro de igualdad -> órdenes que da su índice (simple o compuesto)
+ORDENES_CUBIERTOS = {
+    "categoria_id": {"id", "precio", "fecha_publicacion", "titulo"},
+    "idioma": {"id", "precio"},
+    "autor": {"id", "fecha_publicacion"},
+    "editorial": {"id", "titulo"},
+}
+# Filtro de rango -> columna de su índice
+RANGOS = {
+    "precio_min": "precio", "precio_max": "precio",
+    "anio_min": "fecha_publicacion", "anio_max": "fecha_publicacion",
+}
+# Índices parciales (solo filas con stock): recorrerlos no es un scan de la tabla
+PARCIALES = {index.name for index in Libro.__table__.indexes if index.dialect_options["sqlite"]["where"] is not None}
+
+
+def ordenada(combinacion: typing.Tuple[str, ...], orden: str) -> bool:
+    # Sin sort aparte: a lo más un filtro de igualdad con un índice para el
+    # orden, y rangos solo sobre la columna del orden (o en_stock a solas)
+    campo = orden.lstrip("-")
+    if "en_stock" in combinacion:
+        return combinacion == ("en_stock",)
+    igualdad = [nombre for nombre in combinacion if nombre in ORDENES_CUBIERTOS]
+    if len(igualdad) > 1 or {RANGOS[nombre] for nombre in combinacion if nombre in RANGOS} - {campo}:
+        return False
+    return not igualdad or campo in ORDENES_CUBIERTOS[igualdad[0]]
+
+
+def problemas(detalles: typing.List[str], combinacion: typing.Tuple[str, ...], orden: str) -> typing.List[str]:
+    encontrados = []
+    for detalle in detalles:
+        if detalle.startswith("SCAN libro"):
+            # Sin filtros, recorrer un índice en orden (o la tabla por rowid
+            # para orden=id) es el plan correcto: el LIMIT lo corta
+            if not combinacion:
+                if detalle == "SCAN libro" and orden != "id":
+                    encontrados.append(detalle)
+            elif detalle.rsplit(" ", 1)[-1] not in PARCIALES:
+                encontrados.append(detalle)
+        if "TEMP B-TREE" in detalle and ordenada(combinacion, orden):
+            encontrados.append(detalle)
+    return encontrados
+
+
+def combinaciones(maximo: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[str, ...]]:
+    # Todas las combinaciones de filtros, hasta maximo filtros a la vez
+    nombres = list(FILTROS)
+    for n in range(len(nombres) + 1 if maximo is None else maximo + 1):
+        yield from itertools.combinations(nombres, n)
+
+
+def revisar(conn, combinacion: typing.Tuple[str, ...]):
+    # (orden, con_cursor, detalles, problemas) de cada orden, con y sin cursor
+    for orden, con_cursor in itertools.product(typing.get_args(LibroOrden), (False, True)):
+        filtros = LibroFiltros(orden=orden, **{nombre: FILTROS[nombre] for nombre in combinacion})
+        campo = orden.lstrip("-")
+        cursor = encode_cursor(1000, orden, VALOR_CURSOR.get(campo)) if con_cursor else None
+        query = libros_page_query(cursor, 101, filtros)
+
+        # Camino ORM y camino rápido (tuplas con JOIN a categoría)
+        for consulta in (query, libro_rows_query(query)):
+            detalles = plan(conn, consulta)
+            yield orden, con_cursor, detalles, problemas(detalles, combinacion, orden)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libros", type=int, default=2000)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    fallas, total = [], 0
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'planes.db')}")
+        SQLModel.metadata.create_all(engine)
+        seed(engine, args.libros)
+
+        with engine.connect() as conn:
+            for combinacion in combinaciones():
+                for orden, con_cursor, detalles, encontrados in revisar(conn, combinacion):
+                    total += 1
+                    if encontrados or args.verbose:
+                        print(combinacion, orden, "cursor" if con_cursor else "", detalles)
+                    if encontrados:
+                        fallas.append((combinacion, orden, con_cursor, encontrados))
+        engine.dispose()
+
+    print(f"{total} planes revisados, {len(fallas)} con scan o sort fuera de índice")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
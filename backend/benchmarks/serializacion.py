@@ -0,0 +1,77 @@
+'''
+Benchmark de serialización del catálogo: ORM + pydantic contra tuplas + orjson
+
+Arma la misma página de /libros por los dos caminos (el de siempre y el de
+CATALOG_FAST_JSON), verifica que el JSON sea idéntico byte a byte y reporta
+bytes/s y filas/s de cada uno. Uso (desde backend/):
+    python -m benchmarks.serializacion --libros 20000 --limit 100 500
+'''
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, create_engine, select
+
+from benchmarks.paginacion import seed
+from cache import dump_json
+from models import Libro, LibroRead
+from serializacion import dumps, libro_dicts, libro_rows_query
+
+
+def actual(session: Session, limit: int) -> bytes:
+    libros = session.exec(select(Libro).options(selectinload(Libro.categoria)).limit(limit)).all()
+    return dump_json(List[LibroRead], libros)
+
+
+def rapido(session: Session, limit: int) -> bytes:
+    return dumps(libro_dicts(session.execute(libro_rows_query(select(Libro).limit(limit)))))
+
+
+def measure(fn, engine, limit: int, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        # Sesión nueva por vuelta: como en un request, sin identity map caliente
+        with Session(engine) as session:
+            start = time.perf_counter()
+            body = fn(session, limit)
+            samples.append(time.perf_counter() - start)
+    mediana = statistics.median(samples)
+    return {
+        "ms": round(mediana * 1000, 3),
+        "MB/s": round(len(body) / mediana / 1e6, 1),
+        "filas/s": round(limit / mediana),
+    }, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libros", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'serializacion.db')}")
+        seed(engine, args.libros)
+
+        for limit in args.limit:
+            resultado_actual, body_actual = measure(actual, engine, limit, args.repeat)
+            resultado_rapido, body_rapido = measure(rapido, engine, limit, args.repeat)
+            print(json.dumps({
+                "limit": limit,
+                "bytes": len(body_actual),
+                "identico": body_actual == body_rapido,
+                "orm + pydantic": resultado_actual,
+                "tuplas + orjson": resultado_rapido,
+                "aceleracion": round(resultado_actual["ms"] / resultado_rapido["ms"], 2),
+            }, ensure_ascii=False))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+'''
+Suite de benchmarks de la API (en proceso, sin red)
+
+Genera datos con benchmarks.datos en una base temporal y corre escenarios
+con httpx contra la app ASGI: catálogo, búsqueda, login, carrito y checkout.
+Reporta throughput y latencias p50/p95/p99 en JSON y puede compararse con una
+corrida anterior guardada. Uso (desde backend/):
+    python -m benchmarks.suite --salida base.json
+    python -m benchmarks.suite --baseline base.json --tolerancia 10
+    python -m benchmarks.suite --escenarios catalogo busqueda --segundos 3
+
+Con --baseline, el código de salida es 1 si algún escenario empeora más
+que la tolerancia (throughput o p95).
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'suite.db')}")
+# Todo el tráfico sale de una IP: sin admisión se mide la capacidad, no los límites
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOAD_SHED_ENABLED", "0")
+
+import httpx
+from sqlmodel import select
+
+from benchmarks.datos import ADJETIVOS, PASSWORD, SUSTANTIVOS, correo, generate
+from cache import catalog_cache
+from db import create_db_and_tables, engine
+from main import app
+from models import Carrito
+from security import create_access_token, shutdown_executor
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+'''
+ESCENARIOS
+'''
+# Cada escenario recibe (client, rng, worker, datos) y hace una operación;
+# cada worker tiene su propio usuario y carrito para no pisarse entre sí
+async def catalogo(client, rng, worker, datos):
+    primera = rng.random() < 0.5
+    if primera:
+        response = await client.get("/libros/pagina", params={"limit": 50})
+    else:
+        libro_id = datos["primer_libro"] + rng.randrange(datos["libros"])
+        response = await client.get(f"/libros/{libro_id}")
+    response.raise_for_status()
+
+
+async def busqueda(client, rng, worker, datos):
+    q = f"{rng.choice(SUSTANTIVOS)} {rng.choice(ADJETIVOS)}"
+    response = await client.get("/libros/search", params={"q": q, "limit": 20})
+    response.raise_for_status()
+
+
+async def login(client, rng, worker, datos):
+    response = await client.post("/auth/login", json={
+        "correo": correo(worker % datos["usuarios"]), "password": PASSWORD
+    })
+    response.raise_for_status()
+
+
+async def carrito(client, rng, worker, datos):
+    carrito_id = datos["carritos_workers"][worker]
+    libro_id = datos["primer_libro"] + rng.randrange(datos["libros"])
+    (await client.post(f"/carritos/{carrito_id}/items", json={"libro_id": libro_id, "cantidad": 1})).raise_for_status()
+    (await client.put(f"/carritos/{carrito_id}/items/{libro_id}", json={"cantidad": 2})).raise_for_status()
+    (await client.get(f"/carritos/{carrito_id}")).raise_for_status()
+    (await client.delete(f"/carritos/{carrito_id}/items/{libro_id}")).raise_for_status()
+
+
+async def checkout(client, rng, worker, datos):
+    carrito_id = datos["carritos_workers"][worker]
+    for libro_id in rng.sample(range(datos["primer_libro"], datos["primer_libro"] + datos["libros"]), 2):
+        (await client.post(f"/carritos/{carrito_id}/items", json={"libro_id": libro_id, "cantidad": 1})).raise_for_status()
+    response = await client.post(
+        "/ventas/",
+        json={"carrito_id": carrito_id, "forma_pago": "tarjeta"},
+        headers={"Authorization": f"Bearer {datos['tokens'][worker]}"},
+    )
+    response.raise_for_status()
+
+
+ESCENARIOS = {
+    "catalogo": catalogo,
+    "busqueda": busqueda,
+    "login": login,
+    "carrito": carrito,
+    "checkout": checkout,
+}
+
+
+async def run_escenario(client, nombre, args, datos) -> dict:
+    escenario = ESCENARIOS[nombre]
+    latencias, errores = [], []
+    fin = time.perf_counter() + args.segundos
+
+    async def worker(indice):
+        rng = random.Random(args.semilla * 1000 + indice)
+        while time.perf_counter() < fin:
+            start = time.perf_counter()
+            try:
+                await escenario(client, rng, indice, datos)
+                latencias.append((time.perf_counter() - start) * 1000)
+            except httpx.HTTPError as exc:
+                errores.append(str(exc))
+
+    # Calentamiento corto para que caché y pool no cuenten en la medición
+    rng = random.Random(args.semilla)
+    for _ in range(3):
+        try:
+            await escenario(client, rng, 0, datos)
+        except httpx.HTTPError:
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrencia)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "operaciones": len(latencias),
+        "errores": len(errores),
+        "ops/s": round(len(latencias) / elapsed, 1),
+        "p50 ms": percentile(latencias, 50) if latencias else None,
+        "p95 ms": percentile(latencias, 95) if latencias else None,
+        "p99 ms": percentile(latencias, 99) if latencias else None,
+    }
+
+
+'''
+COMPARACIÓN CONTRA BASELINE
+'''
+def compare(actual: dict, baseline: dict, tolerancia: float) -> dict:
+    comparacion = {}
+    for nombre, resultado in actual["escenarios"].items():
+        base = baseline.get("escenarios", {}).get(nombre)
+        if not base or not base.get("ops/s") or not base.get("p95 ms") or not resultado.get("p95 ms"):
+            continue
+        delta_ops = (resultado["ops/s"] - base["ops/s"]) / base["ops/s"] * 100
+        delta_p95 = (resultado["p95 ms"] - base["p95 ms"]) / base["p95 ms"] * 100
+        comparacion[nombre] = {
+            "ops/s %": round(delta_ops, 1),
+            "p95 %": round(delta_p95, 1),
+            "regresion": delta_ops < -tolerancia or delta_p95 > tolerancia,
+        }
+    return comparacion
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    create_db_and_tables()
+    datos = generate(
+        engine, libros=args.libros, usuarios=args.usuarios, carritos=args.usuarios,
+        ventas=args.ventas, semilla=args.semilla
+    )
+    # Worker i usa el usuario/carrito i de los generados
+    with engine.connect() as conn:
+        carritos = conn.execute(
+            select(Carrito.id, Carrito.usuario_id)
+            .where(Carrito.usuario_id >= datos["primer_usuario"])
+            .order_by(Carrito.usuario_id)
+            .limit(args.concurrencia)
+        ).all()
+    datos["carritos_workers"] = [carrito_id for carrito_id, _ in carritos]
+    datos["tokens"] = [create_access_token(usuario_id, False) for _, usuario_id in carritos]
+
+    resultados = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for nombre in args.escenarios:
+            catalog_cache.clear()
+            resultados[nombre] = await run_escenario(client, nombre, args, datos)
+    shutdown_executor()
+
+    return {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "libros": args.libros,
+            "usuarios": args.usuarios,
+            "ventas": args.ventas,
+            "concurrencia": args.concurrencia,
+            "segundos": args.segundos,
+            "semilla": args.semilla,
+        },
+        "escenarios": resultados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--libros", type=int, default=5000)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--ventas", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Guarda el resultado en este archivo JSON")
+    parser.add_argument("--baseline", help="Resultado previo contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=10, help="Porcentaje de empeoramiento permitido")
+    args = parser.parse_args()
+    args.concurrencia = min(args.concurrencia, args.usuarios)
+
+    resultado = asyncio.run(run(args))
+
+    regresion = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            resultado["comparacion"] = compare(resultado, json.load(f), args.tolerancia)
+        regresion = any(c["regresion"] for c in resultado["comparacion"].values())
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    sys.exit(1 if regresion else 0)
+
+
+if __name__ == "__main__":
+    main()
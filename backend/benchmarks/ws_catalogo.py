@@ -0,0 +1,179 @@
+'''
+Benchmark de /ws/catalogo: costo de suscriptores inactivos y latencia del fan-out
+
+Levanta la API con uvicorn en un subproceso (base temporal), abre N conexiones
+WebSocket desde este proceso y mide en el servidor (vía /proc):
+    - memoria RSS antes y después de conectar (KB por suscriptor)
+    - CPU consumida durante una ventana sin cambios (solo pings)
+    - tiempo hasta que todos los suscriptores reciben un cambio de stock
+Por defecto el servidor usa --ws websockets-sansio: sin tareas propias por
+conexión, cuesta la mitad de memoria que la implementación "websockets".
+Uso (desde backend/, solo Linux):
+    python -m benchmarks.ws_catalogo --suscriptores 10000 --inactivo 10
+'''
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1])
+    return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        campos = f.read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / CLK_TCK
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare(database_url: str, env: dict) -> dict:
+    # Datos mínimos y un token de admin firmado con el mismo secreto del servidor
+    codigo = (
+        "import json\n"
+        "from db import create_db_and_tables, engine\n"
+        "from benchmarks.datos import generate\n"
+        "from security import create_access_token\n"
+        "create_db_and_tables()\n"
+        "datos = generate(engine, categorias=3, libros=20, usuarios=1, carritos=0, ventas=0, semilla=1, stock=1000)\n"
+        "print(json.dumps({'libro': datos['primer_libro'], 'token': create_access_token(datos['primer_usuario'], True)}))\n"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+async def connect_all(url: str, total: int, concurrencia: int) -> list:
+    conexiones = []
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def uno():
+        async with semaforo:
+            # Sin ping del cliente: el servidor es quien mantiene viva la conexión
+            conexiones.append(await websockets.connect(url, ping_interval=None, max_queue=4))
+
+    await asyncio.gather(*(uno() for _ in range(total)))
+    return conexiones
+
+
+async def run(args) -> dict:
+    resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2)
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'ws.db')}",
+            RECOMENDACIONES_DIR=os.path.join(tmp, "recomendaciones"),
+            JWT_SECRET="benchmark-ws",
+            CATALOG_WS_PING_SECONDS=str(args.ping),
+        )
+        datos = prepare(env["DATABASE_URL"], env)
+
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+             "--ws", args.ws, "--ws-ping-interval", "86400", "--backlog", "4096"],
+            env=env,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+                for _ in range(100):
+                    try:
+                        (await client.get("/")).raise_for_status()
+                        break
+                    except httpx.HTTPError:
+                        await asyncio.sleep(0.1)
+
+                rss_inicial = rss_kb(servidor.pid)
+                inicio = time.perf_counter()
+                conexiones = await connect_all(f"ws://127.0.0.1:{port}/ws/catalogo", args.suscriptores, args.concurrencia)
+                conexion_s = time.perf_counter() - inicio
+                await asyncio.sleep(1)
+                rss_conectados = rss_kb(servidor.pid)
+                suscriptores = (await client.get("/ws/catalogo/stats")).json()["suscriptores"]
+
+                # Ventana inactiva: solo el ping del hub
+                cpu_antes = cpu_seconds(servidor.pid)
+                await asyncio.sleep(args.inactivo)
+                cpu_inactivo = cpu_seconds(servidor.pid) - cpu_antes
+
+                # Un cambio de stock debe llegar a todos
+                for conexion in conexiones:
+                    while True:
+                        try:
+                            await asyncio.wait_for(conexion.recv(), 0)
+                        except (asyncio.TimeoutError, TimeoutError):
+                            break
+
+                async def esperar(conexion):
+                    while True:
+                        mensaje = json.loads(await conexion.recv())
+                        if mensaje[0]["tipo"] == "libro":
+                            return time.perf_counter()
+
+                esperas = [asyncio.ensure_future(esperar(conexion)) for conexion in conexiones]
+                cpu_antes = cpu_seconds(servidor.pid)
+                enviado = time.perf_counter()
+                (await client.patch(
+                    f"/libros/{datos['libro']}", json={"cantidad_disponible": 7},
+                    headers={"Authorization": f"Bearer {datos['token']}"}
+                )).raise_for_status()
+                llegadas = sorted((t - enviado) * 1000 for t in await asyncio.gather(*esperas))
+                cpu_fanout = cpu_seconds(servidor.pid) - cpu_antes
+
+            for conexion in conexiones:
+                await conexion.close()
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+    return {
+        "suscriptores": suscriptores,
+        "conexion s": round(conexion_s, 2),
+        "rss inicial MB": round(rss_inicial / 1024, 1),
+        "rss conectados MB": round(rss_conectados / 1024, 1),
+        "KB por suscriptor": round((rss_conectados - rss_inicial) / max(suscriptores, 1), 2),
+        "inactivo s": args.inactivo,
+        "cpu inactivo %": round(cpu_inactivo / args.inactivo * 100, 2),
+        "fan-out p50 ms": round(llegadas[len(llegadas) // 2], 1),
+        "fan-out p99 ms": round(llegadas[int(len(llegadas) * 0.99)], 1),
+        "fan-out max ms": round(llegadas[-1], 1),
+        "cpu fan-out ms": round(cpu_fanout * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suscriptores", type=int, default=10_000)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--inactivo", type=float, default=10, help="Segundos sin cambios para medir CPU")
+    parser.add_argument("--ping", type=float, default=30, help="CATALOG_WS_PING_SECONDS del servidor")
+    parser.add_argument("--ws", default="websockets-sansio", help="Implementación WebSocket de uvicorn")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import re
+from typing import List
+from sqlalchemy import and_, case, or_, text
+from sqlmodel import Session, select
+
+from models import Libro
+
+'''
+ÍNDICE DE BÚSQUEDA (SQLite FTS5)
+'''
+# Tabla de contenido externo: el índice guarda solo los tokens, el texto
+# sigue viviendo en `libro`. Los triggers lo mantienen sincronizado en cada
+# INSERT/UPDATE/DELETE, sin importar qué ruta de escritura lo haga.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS libro_fts USING fts5(
+        titulo, autor, editorial, descripcion,
+        content='libro', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS libro_fts_ai AFTER INSERT ON libro BEGIN
+        INSERT INTO libro_fts(rowid, titulo, autor, editorial, descripcion)
+        VALUES (new.id, new.titulo, new.autor, new.editorial, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS libro_fts_ad AFTER DELETE ON libro BEGIN
+        INSERT INTO libro_fts(libro_fts, rowid, titulo, autor, editorial, descripcion)
+        VALUES ('delete', old.id, old.titulo, old.autor, old.editorial, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS libro_fts_au AFTER UPDATE OF titulo, autor, editorial, descripcion ON libro BEGIN
+        INSERT INTO libro_fts(libro_fts, rowid, titulo, autor, editorial, descripcion)
+        VALUES ('delete', old.id, old.titulo, old.autor, old.editorial, old.descripcion);
+        INSERT INTO libro_fts(rowid, titulo, autor, editorial, descripcion)
+        VALUES (new.id, new.titulo, new.autor, new.editorial, new.descripcion);
+    END
+    """,
+]
+
+# Reindexa desde `libro` (bases con libros que nunca pasaron por los triggers)
+FTS_REBUILD = "INSERT INTO libro_fts(libro_fts) VALUES ('rebuild')"
+
+# Pesos bm25 por columna: titulo, autor, editorial, descripcion
+BM25_WEIGHTS = "10.0, 5.0, 1.0, 2.0"
+
+
+def create_search_index(engine):
+    # FTS5 es propio de SQLite; los otros motores buscan con LIKE (search_statement)
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'libro_fts'")
+        ).first()
+
+        for ddl in FTS_DDL:
+            conn.execute(text(ddl))
+
+        # Una base existente trae libros que nunca pasaron por los triggers
+        if not exists:
+            conn.execute(text(FTS_REBUILD))
+
+
+def rebuild_search_index(engine):
+    with engine.begin() as conn:
+        conn.execute(text(FTS_REBUILD))
+        conn.execute(text("INSERT INTO libro_fts(libro_fts) VALUES ('optimize')"))
+
+
+'''
+CONSULTA
+'''
+def build_match_query(q: str) -> str:
+    # Cada palabra se busca como prefijo; las comillas evitan que la entrada
+    # del usuario se interprete como sintaxis de FTS5 (AND, NEAR, *, etc.)
+    tokens = re.findall(r"\w+", q)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+# Respaldo sin FTS5 (PostgreSQL): mismas columnas y pesos que bm25
+PESOS_LIKE = [(Libro.titulo, 10), (Libro.autor, 5), (Libro.editorial, 1), (Libro.descripcion, 2)]
+
+
+def like_statement(tokens: List[str], limit: int, offset: int):
+    # Cada palabra debe aparecer en alguna columna; la relevancia suma el peso
+    # de las columnas donde aparece. Sin índice: recorre el catálogo, que es
+    # lo que hay mientras el motor no tenga un índice de texto propio
+    # Los tokens son \w+: el único comodín posible es "_" y nunca traen "!"
+    patrones = ["%" + token.replace("_", "!_") + "%" for token in tokens]
+    coincide = {
+        (columna, patron): columna.ilike(patron, escape="!") for columna, _ in PESOS_LIKE for patron in patrones
+    }
+    relevancia = sum(
+        case((coincide[columna, patron], peso), else_=0) for columna, peso in PESOS_LIKE for patron in patrones
+    )
+    return (
+        select(Libro.id)
+        .where(and_(*(or_(*(coincide[columna, patron] for columna, _ in PESOS_LIKE)) for patron in patrones)))
+        .order_by(relevancia.desc(), Libro.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def search_statement(q: str, limit: int = 20, offset: int = 0, dialect: str = "sqlite"):
+    if dialect != "sqlite":
+        tokens = re.findall(r"\w+", q)
+        return like_statement(tokens, limit, offset) if tokens else None
+
+    match = build_match_query(q)
+    if not match:
+        return None
+
+    return text(
+        f"SELECT rowid FROM libro_fts WHERE libro_fts MATCH :match "
+        f"ORDER BY bm25(libro_fts, {BM25_WEIGHTS}) LIMIT :limit OFFSET :offset"
+    ).bindparams(match=match, limit=limit, offset=offset)
+
+
+def search_libro_ids(session: Session, q: str, limit: int = 20, offset: int = 0) -> List[int]:
+    statement = search_statement(q, limit, offset, session.get_bind().dialect.name)
+    if statement is None:
+        return []
+
+    return [row[0] for row in session.execute(statement)]
+
+
+if __name__ == "__main__":
+    # python -m busqueda  -> reconstruye el índice completo
+    from db import engine
+
+    create_search_index(engine)
+    rebuild_search_index(engine)
+    print("Índice de búsqueda reconstruido.")
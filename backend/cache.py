@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+import config
+
+'''
+CACHÉ LRU CON TTL
+'''
+# Guarda respuestas ya serializadas (bytes JSON). Cada entrada lleva etiquetas
+# ("libros", "libro:3", "categoria:2"...) para que las escrituras invaliden
+# exactamente lo que cambió en vez de vaciar toda la caché.
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Se incrementa con cada invalidación; una lectura que empezó antes de
+        # una escritura no debe guardar su resultado (ya podría estar viejo)
+        self.generation = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires, body, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: str, body: bytes, tags: Iterable[str], generation: Optional[int] = None):
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, body, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+catalog_cache = ResponseCache(config.CATALOG_CACHE_MAX_ENTRIES, config.CATALOG_CACHE_TTL)
+
+
+'''
+HELPERS PARA LOS ROUTERS
+'''
+_adapters: Dict[Any, TypeAdapter] = {}
+
+def dump_json(model: Any, data: Any) -> bytes:
+    # Valida desde atributos ORM y serializa directo a bytes
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+def cache_key(request: Request) -> str:
+    params = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}"
+
+def cached_json(
+    request: Request,
+    build: Callable[[], Tuple[bytes, Iterable[str]]],
+    key: Optional[str] = None
+) -> Response:
+    # build() corre solo en un miss y devuelve (bytes, etiquetas)
+    key = key or cache_key(request)
+    body = catalog_cache.get(key)
+    if body is None:
+        generation = catalog_cache.generation
+        body, tags = build()
+        catalog_cache.set(key, body, tags, generation)
+    return Response(content=body, media_type="application/json")
+
+
+async def cached_json_async(
+    request: Request,
+    build: Callable[[], Awaitable[Tuple[bytes, Iterable[str]]]],
+    key: Optional[str] = None
+) -> Response:
+    key = key or cache_key(request)
+    body = catalog_cache.get(key)
+    if body is None:
+        generation = catalog_cache.generation
+        body, tags = await build()
+        catalog_cache.set(key, body, tags, generation)
+    return Response(content=body, media_type="application/json")
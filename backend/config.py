@@ -0,0 +1,158 @@
+import os
+import secrets
+from dotenv import load_dotenv
+
+# Variables de entorno (y .env si existe)
+load_dotenv()
+
+def env_bool(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+'''
+BASE DE DATOS
+'''
+# sqlite:///libreria.db por defecto; acepta cualquier URL de SQLAlchemy (p. ej. postgresql://...)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///libreria.db")
+DB_ECHO = env_bool("DB_ECHO")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Pool aparte para los GET: con SQLite es la misma base abierta en solo
+# lectura (mode=ro + query_only), así las lecturas no esperan conexiones
+# detrás de un checkout; en motores de servidor puede apuntar a una réplica
+DB_READ_POOL = env_bool("DB_READ_POOL", "1")
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(max(4, (os.cpu_count() or 1) * 2))))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "40"))
+
+# PRAGMAs aplicados a cada conexión SQLite nueva
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+
+# Migraciones (migraciones.py): al arrancar o solo desde el CLI; los
+# backfills van en lotes con commit propio y una pausa opcional entre lotes
+MIGRATIONS_AUTO = env_bool("MIGRATIONS_AUTO", "1")
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0"))
+
+# ASYNC_DB=1 sirve las lecturas del catálogo con routers async sobre un
+# AsyncEngine (aiosqlite); las escrituras siguen en los routers sync
+ASYNC_DB = env_bool("ASYNC_DB")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+'''
+CACHÉ DEL CATÁLOGO
+'''
+# CATALOG_FAST_JSON=1: los GET de listas arman el JSON con orjson desde
+# tuplas de columnas en lugar de objetos ORM revalidados por pydantic
+CATALOG_FAST_JSON = env_bool("CATALOG_FAST_JSON")
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1024"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Máximo de ids por consulta a /libros/batch (GET o POST)
+LIBROS_BATCH_MAX = int(os.getenv("LIBROS_BATCH_MAX", "500"))
+
+'''
+HTTP CONDICIONAL
+'''
+# El navegador siempre revalida (304 barato); un CDN/proxy puede servir la copia por s-maxage
+CATALOG_CACHE_CONTROL = os.getenv(
+    "CATALOG_CACHE_CONTROL",
+    "public, max-age=0, s-maxage=30, stale-while-revalidate=30, must-revalidate"
+)
+
+'''
+EVENTOS EN VIVO (/ws/catalogo)
+'''
+# Ventana en la que se juntan cambios al mismo libro/categoría antes de enviarlos
+CATALOG_WS_COALESCE_MS = float(os.getenv("CATALOG_WS_COALESCE_MS", "100"))
+# Mensajes en espera por cliente; si se llena, recibe "resync" en su lugar
+CATALOG_WS_QUEUE_SIZE = int(os.getenv("CATALOG_WS_QUEUE_SIZE", "64"))
+# Ping periódico para detectar conexiones cerradas; 0 lo desactiva
+CATALOG_WS_PING_SECONDS = float(os.getenv("CATALOG_WS_PING_SECONDS", "30"))
+
+'''
+RECOMENDACIONES
+'''
+# Artefacto de co-ocurrencias (python -m recomendaciones build); cada worker
+# lee las ventas nuevas como delta cada RECOMENDACIONES_REFRESH_SECONDS y,
+# al juntar RECOMENDACIONES_REBUILD_VENTAS, lo reconstruye en segundo plano
+RECOMENDACIONES_DIR = os.getenv("RECOMENDACIONES_DIR", "recomendaciones")
+RECOMENDACIONES_REFRESH_SECONDS = float(os.getenv("RECOMENDACIONES_REFRESH_SECONDS", "5"))
+RECOMENDACIONES_REBUILD_VENTAS = int(os.getenv("RECOMENDACIONES_REBUILD_VENTAS", "5000"))
+
+'''
+CONTRASEÑAS
+'''
+# Costo de pbkdf2_sha256; al cambiarlo, los hashes viejos se rehacen en el siguiente login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# "process" evita que el hashing compita por el GIL con el resto de la API
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Máximo de hashes en vuelo (ejecutándose o en cola) por worker de la API
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+'''
+TOKENS (JWT)
+'''
+# En producción JWT_SECRET debe venir del entorno y ser igual en todos los
+# workers; el valor aleatorio solo sirve para desarrollo con un proceso
+JWT_SECRET = os.getenv("JWT_SECRET") or secrets.token_urlsafe(32)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
+# Cada cuánto se sincroniza la lista de tokens revocados con la base
+TOKEN_DENYLIST_REFRESH_SECONDS = float(os.getenv("TOKEN_DENYLIST_REFRESH_SECONDS", "5"))
+
+'''
+MÉTRICAS
+'''
+# Latencia por ruta y conteo/tiempo de SQL por request, expuestos en /metrics
+METRICS_ENABLED = env_bool("METRICS_ENABLED", "1")
+# Umbral del log de requests lentos en ms; 0 lo desactiva (y no se guarda el SQL)
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+# Sentencias guardadas por request y cuántas de las más lentas se registran
+METRICS_SLOW_SQL_CAPTURE = int(os.getenv("METRICS_SLOW_SQL_CAPTURE", "200"))
+METRICS_SLOW_SQL_LIMIT = int(os.getenv("METRICS_SLOW_SQL_LIMIT", "5"))
+
+'''
+ADMISIÓN (RATE LIMIT Y LOAD SHEDDING)
+'''
+# Token bucket por cliente (IP) y clase de ruta: "tasa,ráfaga" en requests/s.
+# Las rutas POST /auth/* pagan PBKDF2, por eso su presupuesto es el más chico
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", "1")
+RATE_LIMIT_AUTH = os.getenv("RATE_LIMIT_AUTH", "2,10")
+RATE_LIMIT_LECTURA = os.getenv("RATE_LIMIT_LECTURA", "50,200")
+RATE_LIMIT_ESCRITURA = os.getenv("RATE_LIMIT_ESCRITURA", "10,40")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))
+# Solo detrás de un proxy de confianza: la IP del cliente sale de X-Forwarded-For
+RATE_LIMIT_TRUST_PROXY = env_bool("RATE_LIMIT_TRUST_PROXY")
+# Requests en vuelo por worker; los excedentes esperan hasta LOAD_SHED_MAX_WAIT_MS
+# en una cola de LOAD_SHED_MAX_QUEUE lugares y si no, reciben 503 + Retry-After
+LOAD_SHED_ENABLED = env_bool("LOAD_SHED_ENABLED", "1")
+LOAD_SHED_MAX_INFLIGHT = int(os.getenv("LOAD_SHED_MAX_INFLIGHT", "32"))
+LOAD_SHED_MAX_QUEUE = int(os.getenv("LOAD_SHED_MAX_QUEUE", "256"))
+LOAD_SHED_MAX_WAIT_MS = float(os.getenv("LOAD_SHED_MAX_WAIT_MS", "100"))
+LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", "1"))
+
+'''
+TAREAS EN SEGUNDO PLANO
+'''
+# Cola durable en la tabla tarea. La API lanza TAREAS_WORKERS procesos al
+# arrancar (0 = ninguno; se corren aparte con `python -m tareas worker`)
+TAREAS_WORKERS = int(os.getenv("TAREAS_WORKERS", "1"))
+# Espera entre consultas cuando la cola está vacía
+TAREAS_POLL_SECONDS = float(os.getenv("TAREAS_POLL_SECONDS", "0.5"))
+# Una tarea en curso cuyo worker murió vuelve a la cola al vencer el lease
+TAREAS_LEASE_SECONDS = float(os.getenv("TAREAS_LEASE_SECONDS", "300"))
+TAREAS_MAX_INTENTOS = int(os.getenv("TAREAS_MAX_INTENTOS", "5"))
+# Reintentos con backoff exponencial: base * 2^(intento - 1), con tope y jitter
+TAREAS_BACKOFF_SECONDS = float(os.getenv("TAREAS_BACKOFF_SECONDS", "2"))
+TAREAS_BACKOFF_MAX_SECONDS = float(os.getenv("TAREAS_BACKOFF_MAX_SECONDS", "600"))
+# Las tareas hechas se borran después de este tiempo (las fallidas se conservan)
+TAREAS_RETENCION_HORAS = float(os.getenv("TAREAS_RETENCION_HORAS", "24"))
+# Documentos de confirmación de pedido generados por los workers
+CONFIRMACIONES_DIR = os.getenv("CONFIRMACIONES_DIR", "confirmaciones")
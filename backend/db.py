@@ -1,13 +1,133 @@
+import os
+from urllib.parse import quote
 from sqlmodel import create_engine, Session, SQLModel, select
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from typing import AsyncGenerator, Dict, Generator, Optional
 from models import Libro, Usuario, Categoria
+from migraciones import migrate, pending
+from metricas import instrument_engine, registry
 
 from security import hash_password
+import config
 
-sqlite_file_name = "libreria.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+'''
+MOTOR DE BASE DE DATOS
+'''
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def sqlite_pragmas() -> Dict[str, object]:
+    # WAL deja que las lecturas del catálogo sigan mientras un checkout escribe
+    return {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT,
+        "foreign_keys": "ON",
+    }
+
+def _listen_pragmas(sync_engine: Engine, pragmas: Dict[str, object]):
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def read_only_pragmas() -> Dict[str, object]:
+    # journal_mode/synchronous son de quien escribe; query_only rechaza
+    # cualquier escritura que se cuele por una sesión de lectura
+    pragmas = {name: value for name, value in sqlite_pragmas().items() if name not in ("journal_mode", "synchronous")}
+    pragmas["query_only"] = "ON"
+    return pragmas
+
+def _engine_options(url: str, pool_size: Optional[int] = None, max_overflow: Optional[int] = None) -> dict:
+    options = {"echo": config.DB_ECHO}
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # :memory: usa SingletonThreadPool y no admite pool_size
+        if make_url(url).database in (None, "", ":memory:"):
+            return options
+    else:
+        options["pool_pre_ping"] = True
+
+    options.update(
+        pool_size=config.DB_POOL_SIZE if pool_size is None else pool_size,
+        max_overflow=config.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    return options
+
+def build_engine(
+    url: Optional[str] = None,
+    pragmas: Optional[Dict[str, object]] = None,
+    pool: Optional[str] = None,
+    **options
+) -> Engine:
+    url = url or config.DATABASE_URL
+    new_engine = create_engine(url, **{**_engine_options(url), **options})
+    if new_engine.dialect.name == "sqlite":
+        _listen_pragmas(new_engine, sqlite_pragmas() if pragmas is None else pragmas)
+    if config.METRICS_ENABLED:
+        instrument_engine(new_engine)
+        if pool:
+            registry.instrument_pool(pool, new_engine)
+    return new_engine
+
+def read_database_url(url: str) -> Optional[str]:
+    # Réplica explícita, o la misma base SQLite como URI de solo lectura;
+    # None si no tiene sentido un pool aparte (:memory: es por conexión)
+    if config.READ_DATABASE_URL:
+        return config.READ_DATABASE_URL
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return url
+    if parsed.database in (None, "", ":memory:") or parsed.database.startswith("file:"):
+        return None
+    return parsed.set(
+        database=f"file:{quote(os.path.abspath(parsed.database))}",
+        query={**parsed.query, "mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+def build_read_engine(write_engine: Engine) -> Engine:
+    url = read_database_url(config.DATABASE_URL) if config.DB_READ_POOL else None
+    if url is None:
+        return write_engine
 
-engine = create_engine(sqlite_url, echo=True, connect_args={"check_same_thread": False})
+    options = _engine_options(url, config.DB_READ_POOL_SIZE, config.DB_READ_MAX_OVERFLOW)
+    if make_url(url).get_backend_name() == "postgresql":
+        # Equivalente de query_only: cada transacción arranca en solo lectura
+        options["connect_args"] = {"options": "-c default_transaction_read_only=on"}
+    return build_engine(url, pragmas=read_only_pragmas(), pool="lectura", **options)
+
+def build_async_engine(url: Optional[str] = None) -> AsyncEngine:
+    url = url or config.ASYNC_DATABASE_URL
+    if not url:
+        sync_url = make_url(config.DATABASE_URL)
+        url = sync_url.set(
+            drivername=ASYNC_DRIVERS.get(sync_url.get_backend_name(), sync_url.drivername)
+        ).render_as_string(hide_password=False)
+
+    new_engine = create_async_engine(url, **_engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        _listen_pragmas(new_engine.sync_engine, sqlite_pragmas())
+    if config.METRICS_ENABLED:
+        instrument_engine(new_engine.sync_engine)
+        registry.instrument_pool("async", new_engine.sync_engine)
+    return new_engine
+
+
+engine = build_engine(pool="escritura")
+
+# Pool de solo lectura para los GET (si no aplica, es el mismo motor)
+read_engine = build_read_engine(engine)
+
+# Motor async: solo se crea si está habilitado en config
+async_engine = build_async_engine() if config.ASYNC_DB else None
 
 ADMIN_EMAIL = ""
 ADMIN_PASSWORD = ""
@@ -15,27 +135,23 @@ ADMIN_NOMBRE = ""
 
 # Crear las tablas si no existes
 def create_db_and_tables():
+    # Esquema versionado: tablas, columnas, índices, FTS, triggers y las
+    # categorías iniciales viven en migraciones.py. Con todo aplicado, el
+    # arranque es un solo SELECT a la tabla migracion; con MIGRATIONS_AUTO=0
+    # se aplican solo desde el CLI
+    if config.MIGRATIONS_AUTO:
+        migrate(engine)
+        return
 
-    SQLModel.metadata.create_all(engine)
-    
-    # Poblar categorías iniciales
-    seed_initial_categories()
+    pendientes = pending(engine, crear=False)
+    if pendientes:
+        print(f"Migraciones pendientes: {[m.version for m in pendientes]} (python -m migraciones aplicar)")
 
-def seed_initial_categories():
-    """Populate initial categories if they don't exist"""
-    with Session(engine) as session:
-        categories = ["Fantasía", "Ciencia ficción", "Misterio", "Novela Histórica", "Ficción", "Romance", "Terror", "Aventura"]
-        
-        for cat_name in categories:
-            existing = session.exec(
-                select(Categoria).where(Categoria.nombre == cat_name)
-            ).first()
-            
-            if not existing:
-                session.add(Categoria(nombre=cat_name))
-                print(f"Categoría '{cat_name}' agregada.")
-        
-        session.commit()
+def upsert_insert(session: Session, model):
+    # INSERT ... ON CONFLICT propio de cada dialecto
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
 
 '''
     with Session(engine) as session:
@@ -73,4 +189,14 @@ def seed_initial_categories():
 # Dependencia para obtener una sesión de base de datos
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# Dependencia para las rutas que solo leen: conexiones del pool de lectura
+def get_read_session() -> Generator[Session, None, None]:
+    with Session(read_engine, autoflush=False) as session:
+        yield session
+
+# Dependencia async para los routers con ASYNC_DB habilitado
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,42 @@
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+from typing import Optional
+
+from db import engine
+from models import UsuarioToken
+from revocacion import build_denylist
+from security import ACCESS, decode_token
+
+'''
+AUTENTICACIÓN POR TOKEN
+'''
+bearer_scheme = HTTPBearer(auto_error=False)
+token_denylist = build_denylist(engine)
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+# Valida firma, expiración y revocación en memoria: ninguna consulta por request
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> UsuarioToken:
+    if credentials is None:
+        raise _unauthorized("No autenticado")
+
+    try:
+        claims = decode_token(credentials.credentials, ACCESS)
+    except JWTError:
+        raise _unauthorized("Token inválido o expirado")
+
+    if token_denylist.is_revoked(claims["jti"]):
+        raise _unauthorized("Token revocado")
+
+    return UsuarioToken(id=int(claims["sub"]), es_admin=claims["adm"], jti=claims["jti"], exp=claims["exp"])
+
+def require_admin(usuario: UsuarioToken = Depends(get_current_user)) -> UsuarioToken:
+    if not usuario.es_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Se requieren permisos de administrador")
+    return usuario
@@ -0,0 +1,171 @@
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import delete, func, insert, inspect
+from sqlmodel import Session, select
+
+from db import upsert_insert
+from models import (
+    Categoria, EstadisticasRead, IngresoDiario, Libro, LibroStockBajo, ResumenCategoria, ResumenLibro,
+    Venta, VentaCategoriaResumen, VentaDiaria, VentaLibroLink, VentaLibroResumen
+)
+
+# (libro_id, categoria_id, cantidad, precio_unitario)
+LineaVenta = Tuple[int, int, int, float]
+
+'''
+ACTUALIZACIÓN INCREMENTAL
+'''
+def _upsert_sum(session: Session, model, key: str, rows: List[dict]):
+    # INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col, en un executemany
+    statement = upsert_insert(session, model)
+    columnas = [columna for columna in rows[0] if columna != key]
+    statement = statement.on_conflict_do_update(
+        index_elements=[key],
+        set_={columna: getattr(model, columna) + statement.excluded[columna] for columna in columnas}
+    )
+    session.execute(statement, rows)
+
+
+def record_venta(session: Session, fecha: datetime, lineas: Iterable[LineaVenta]):
+    # Corre dentro de la transacción del checkout: la venta y sus agregados
+    # se confirman (o se deshacen) juntos
+    lineas = list(lineas)
+    por_categoria: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    for _, categoria_id, cantidad, precio in lineas:
+        por_categoria[categoria_id][0] += cantidad
+        por_categoria[categoria_id][1] += cantidad * precio
+
+    _upsert_sum(session, VentaDiaria, "fecha", [{
+        "fecha": fecha.date(),
+        "ventas": 1,
+        "unidades": sum(cantidad for _, _, cantidad, _ in lineas),
+        "ingresos": sum(cantidad * precio for _, _, cantidad, precio in lineas),
+    }])
+    _upsert_sum(session, VentaLibroResumen, "libro_id", [
+        {"libro_id": libro_id, "unidades": cantidad, "ingresos": cantidad * precio}
+        for libro_id, _, cantidad, precio in lineas
+    ])
+    _upsert_sum(session, VentaCategoriaResumen, "categoria_id", [
+        {"categoria_id": categoria_id, "unidades": unidades, "ingresos": ingresos}
+        for categoria_id, (unidades, ingresos) in por_categoria.items()
+    ])
+
+
+'''
+BACKFILL
+'''
+BACKFILL_BATCH_SIZE = 5000
+
+def backfill(engine) -> Dict[str, int]:
+    # Reconstruye los agregados en una sola pasada (ordenada por venta) sobre
+    # el historial; todo en una transacción para no exponer datos a medias.
+    # Igual que record_venta, cada línea cuenta para la categoría que tenía
+    # el libro al venderse (la guardada en la línea), no para la actual
+    dias: Dict[date, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    libros: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    categorias: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    lineas = 0
+
+    # La migración 5 corre este backfill antes de que exista la columna (10)
+    columnas = {columna["name"] for columna in inspect(engine).get_columns(VentaLibroLink.__tablename__)}
+    categoria = (
+        func.coalesce(VentaLibroLink.categoria_id, Libro.categoria_id) if "categoria_id" in columnas
+        else Libro.categoria_id
+    )
+
+    with Session(engine) as session:
+        rows = session.execute(
+            select(Venta.id, Venta.fecha, VentaLibroLink.libro_id, categoria,
+                   VentaLibroLink.cantidad, VentaLibroLink.precio_unitario)
+            .join(VentaLibroLink, VentaLibroLink.venta_id == Venta.id)
+            .join(Libro, Libro.id == VentaLibroLink.libro_id)
+            .order_by(Venta.id)
+            .execution_options(yield_per=BACKFILL_BATCH_SIZE)
+        )
+
+        venta_anterior = None
+        for venta_id, fecha, libro_id, categoria_id, cantidad, precio in rows:
+            lineas += 1
+            dia = dias[fecha.date()]
+            if venta_id != venta_anterior:
+                dia[0] += 1
+                venta_anterior = venta_id
+            dia[1] += cantidad
+            dia[2] += cantidad * precio
+            libros[libro_id][0] += cantidad
+            libros[libro_id][1] += cantidad * precio
+            categorias[categoria_id][0] += cantidad
+            categorias[categoria_id][1] += cantidad * precio
+
+        for model in (VentaDiaria, VentaLibroResumen, VentaCategoriaResumen):
+            session.execute(delete(model))
+
+        if dias:
+            session.execute(insert(VentaDiaria), [
+                {"fecha": fecha, "ventas": v, "unidades": u, "ingresos": i} for fecha, (v, u, i) in dias.items()
+            ])
+        if libros:
+            session.execute(insert(VentaLibroResumen), [
+                {"libro_id": libro_id, "unidades": u, "ingresos": i} for libro_id, (u, i) in libros.items()
+            ])
+        if categorias:
+            session.execute(insert(VentaCategoriaResumen), [
+                {"categoria_id": categoria_id, "unidades": u, "ingresos": i} for categoria_id, (u, i) in categorias.items()
+            ])
+        session.commit()
+
+    return {"lineas": lineas, "dias": len(dias), "libros": len(libros), "categorias": len(categorias)}
+
+
+'''
+LECTURA PARA EL DASHBOARD
+'''
+def read_stats(session: Session, dias: int = 30, limit: int = 10, umbral_stock: int = 5) -> EstadisticasRead:
+    # Todas las consultas van por llave primaria o índice, sobre tablas pequeñas
+    # Los días de VentaDiaria son fechas UTC (Venta.fecha es utcnow)
+    desde = datetime.now(timezone.utc).date() - timedelta(days=dias)
+    por_dia = session.exec(
+        select(VentaDiaria).where(VentaDiaria.fecha >= desde).order_by(VentaDiaria.fecha)
+    ).all()
+
+    mas_vendidos = session.execute(
+        select(VentaLibroResumen.libro_id, Libro.titulo, VentaLibroResumen.unidades, VentaLibroResumen.ingresos)
+        .join(Libro, Libro.id == VentaLibroResumen.libro_id)
+        .order_by(VentaLibroResumen.unidades.desc())
+        .limit(limit)
+    ).all()
+
+    por_categoria = session.execute(
+        select(VentaCategoriaResumen.categoria_id, Categoria.nombre,
+               VentaCategoriaResumen.unidades, VentaCategoriaResumen.ingresos)
+        .join(Categoria, Categoria.id == VentaCategoriaResumen.categoria_id)
+        .order_by(VentaCategoriaResumen.unidades.desc())
+    ).all()
+
+    stock_bajo = session.execute(
+        select(Libro.id, Libro.titulo, Libro.cantidad_disponible)
+        .where(Libro.cantidad_disponible <= umbral_stock)
+        .order_by(Libro.cantidad_disponible)
+        .limit(limit)
+    ).all()
+
+    return EstadisticasRead(
+        ingresos_por_dia=[IngresoDiario.model_validate(dia, from_attributes=True) for dia in por_dia],
+        mas_vendidos=[ResumenLibro(**row._mapping) for row in mas_vendidos],
+        por_categoria=[ResumenCategoria(**row._mapping) for row in por_categoria],
+        stock_bajo=[LibroStockBajo(**row._mapping) for row in stock_bajo],
+    )
+
+
+if __name__ == "__main__":
+    # python -m estadisticas backfill
+    from db import create_db_and_tables, engine
+
+    parser = argparse.ArgumentParser(prog="python -m estadisticas")
+    parser.add_argument("comando", choices=["backfill"])
+    parser.parse_args()
+
+    create_db_and_tables()
+    print(backfill(engine))
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Set, Tuple
+
+import config
+from serializacion import dumps
+
+'''
+HUB DE EVENTOS DEL CATÁLOGO
+'''
+# Fan-out en proceso para /ws/catalogo. Las rutas de escritura (que corren en
+# el threadpool) publican eventos compactos; el hub los junta durante
+# CATALOG_WS_COALESCE_MS por (tipo, id), los codifica una sola vez y reparte
+# el mismo payload a todos los suscriptores. Cada worker tiene su propio hub
+# (solo ve las escrituras que atiende él).
+RESYNC = dumps([{"tipo": "resync"}]).decode()
+PING = dumps([{"tipo": "ping"}]).decode()
+
+
+class Suscriptor:
+    # Cola acotada sin asyncio.Queue: un suscriptor inactivo es un deque vacío
+    # y un Future pendiente
+    __slots__ = ("limite", "cola", "esperando", "descartados")
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self.cola: Deque[str] = deque()
+        self.esperando: Optional[asyncio.Future] = None
+        self.descartados = 0
+
+    def offer(self, payload: str):
+        # Contrapresión: un cliente que no lee a tiempo pierde lo acumulado y
+        # recibe un solo "resync" (debe volver a pedir lo que muestra)
+        if len(self.cola) >= self.limite:
+            self.descartados += len(self.cola)
+            self.cola.clear()
+            payload = RESYNC
+        self.cola.append(payload)
+        if self.esperando is not None and not self.esperando.done():
+            self.esperando.set_result(None)
+
+    async def get(self) -> str:
+        while not self.cola:
+            self.esperando = asyncio.get_running_loop().create_future()
+            try:
+                await self.esperando
+            finally:
+                self.esperando = None
+        return self.cola.popleft()
+
+
+def _merge(previo: Dict[str, Any], evento: Dict[str, Any]) -> Dict[str, Any]:
+    # Dos cambios al mismo libro dentro de la ventana salen como uno: campos
+    # unidos, valores más recientes; creado/eliminado pesan sobre actualizado
+    combinado = {**previo, **evento}
+    if "campos" in previo or "campos" in evento:
+        combinado["campos"] = sorted(set(previo.get("campos", ())) | set(evento.get("campos", ())))
+    if previo["accion"] == "creado" and evento["accion"] != "eliminado":
+        combinado["accion"] = "creado"
+    return combinado
+
+
+class CatalogHub:
+    def __init__(self, coalesce_ms: float, queue_size: int, ping_seconds: float):
+        self.coalesce = coalesce_ms / 1000
+        self.queue_size = queue_size
+        self.ping_seconds = ping_seconds
+        self._suscriptores: Set[Suscriptor] = set()
+        self._pendientes: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._programado = False
+        self._ping: Optional[asyncio.TimerHandle] = None
+        self.publicados = 0
+        self.enviados = 0
+
+    def subscribe(self) -> Suscriptor:
+        # Corre en el loop: ahí quedan el flush y el ping
+        self._loop = asyncio.get_running_loop()
+        suscriptor = Suscriptor(self.queue_size)
+        self._suscriptores.add(suscriptor)
+        if self._ping is None and self.ping_seconds > 0:
+            self._ping = self._loop.call_later(self.ping_seconds, self._send_ping)
+        return suscriptor
+
+    def unsubscribe(self, suscriptor: Suscriptor):
+        self._suscriptores.discard(suscriptor)
+
+    def publish(self, *eventos: Dict[str, Any]):
+        # Se llama desde las rutas (threadpool o loop); sin suscriptores no hace nada
+        if not self._suscriptores or self._loop is None:
+            return
+
+        with self._lock:
+            for evento in eventos:
+                llave = (evento["tipo"], evento.get("id"))
+                previo = self._pendientes.get(llave)
+                self._pendientes[llave] = evento if previo is None else _merge(previo, evento)
+            self.publicados += len(eventos)
+            if self._programado:
+                return
+            self._programado = True
+
+        try:
+            self._loop.call_soon_threadsafe(self._loop.call_later, self.coalesce, self._flush)
+        except RuntimeError:
+            # El loop ya cerró (apagado)
+            self._programado = False
+
+    def _flush(self):
+        with self._lock:
+            eventos = list(self._pendientes.values())
+            self._pendientes.clear()
+            self._programado = False
+        if not eventos:
+            return
+
+        payload = dumps(eventos).decode()
+        for suscriptor in list(self._suscriptores):
+            suscriptor.offer(payload)
+        self.enviados += len(self._suscriptores)
+
+    def _send_ping(self):
+        # Un envío periódico detecta las conexiones muertas (el send falla)
+        for suscriptor in list(self._suscriptores):
+            if not suscriptor.cola:
+                suscriptor.offer(PING)
+        self._ping = self._loop.call_later(self.ping_seconds, self._send_ping) if self._suscriptores else None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "suscriptores": len(self._suscriptores),
+            "publicados": self.publicados,
+            "enviados": self.enviados,
+            "descartados": sum(suscriptor.descartados for suscriptor in self._suscriptores),
+        }
+
+
+catalog_hub = CatalogHub(config.CATALOG_WS_COALESCE_MS, config.CATALOG_WS_QUEUE_SIZE, config.CATALOG_WS_PING_SECONDS)
+
+
+'''
+EVENTOS
+'''
+def libro_evento(libro_id: int, accion: str, campos: Iterable[str] = (), cantidad_disponible: Optional[int] = None) -> Dict[str, Any]:
+    evento: Dict[str, Any] = {"tipo": "libro", "id": libro_id, "accion": accion}
+    if campos:
+        evento["campos"] = sorted(campos)
+    if cantidad_disponible is not None:
+        evento["cantidad_disponible"] = cantidad_disponible
+    return evento
+
+
+def categoria_evento(categoria_id: int, accion: str) -> Dict[str, Any]:
+    return {"tipo": "categoria", "id": categoria_id, "accion": accion}
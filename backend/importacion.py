@@ -0,0 +1,217 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, insert, select
+
+from models import Categoria, Libro, LibroBase, LibroCreate, LibroRead
+
+'''
+FORMATOS
+'''
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = ["id", *LibroBase.model_fields, "categoria"]
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+def formato_from_content_type(content_type: str) -> str:
+    return "csv" if "csv" in (content_type or "") else "ndjson"
+
+
+'''
+EXPORTAR
+'''
+def libros_export_query(categoria_id: Optional[int] = None):
+    query = select(Libro).options(selectinload(Libro.categoria)).order_by(Libro.id)
+    if categoria_id:
+        query = query.where(Libro.categoria_id == categoria_id)
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def ndjson_lines(libros) -> bytes:
+    return b"".join(
+        LibroRead.model_validate(libro).model_dump_json().encode() + b"\n"
+        for libro in libros
+    )
+
+
+def csv_lines(libros, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for libro in libros:
+        writer.writerow([
+            *(getattr(libro, column) for column in CSV_COLUMNS[:-1]),
+            libro.categoria.nombre if libro.categoria else "",
+        ])
+    return buffer.getvalue().encode()
+
+
+def export_lines(libros, formato: str, first: bool) -> bytes:
+    if formato == "csv":
+        return csv_lines(libros, header=first)
+    return ndjson_lines(libros)
+
+
+def iter_export(engine, categoria_id: Optional[int] = None, formato: str = "ndjson") -> Iterator[bytes]:
+    # La sesión vive lo mismo que el stream; yield_per trae los registros
+    # por lotes desde el cursor del servidor en vez de cargar todo en memoria
+    with Session(engine) as session:
+        result = session.exec(libros_export_query(categoria_id))
+        first = True
+        for partition in result.partitions():
+            yield export_lines(partition, formato, first)
+            first = False
+            # Soltar las filas ya enviadas para que el identity map no crezca
+            for libro in partition:
+                session.expunge(libro)
+
+        if first and formato == "csv":
+            yield csv_lines([], header=True)
+
+
+'''
+IMPORTAR
+'''
+def read_rows(lines: Iterable[str], formato: str) -> Iterator[Tuple[int, object]]:
+    # Devuelve (número de fila, dict | excepción) sin cargar el archivo completo
+    if formato == "csv":
+        reader = csv.DictReader(lines)
+        for numero, row in enumerate(reader, start=1):
+            yield numero, {key: value for key, value in row.items() if value not in ("", None)}
+        return
+
+    for numero, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield numero, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield numero, exc
+
+
+class CategoriaLookup:
+    # Las categorías son pocas: se cargan una vez y se resuelven en memoria
+    def __init__(self, engine):
+        with Session(engine) as session:
+            categorias = session.exec(select(Categoria)).all()
+        self.por_nombre: Dict[str, int] = {c.nombre.casefold(): c.id for c in categorias}
+        self.ids = set(self.por_nombre.values())
+
+    def resolve(self, row: dict) -> dict:
+        if row.get("categoria_id") in (None, ""):
+            nombre = row.get("categoria")
+            if isinstance(nombre, dict):
+                nombre = nombre.get("nombre")
+            if not nombre:
+                raise ValueError("Falta categoria_id o categoria")
+            categoria_id = self.por_nombre.get(str(nombre).casefold())
+            if categoria_id is None:
+                raise ValueError(f"Categoría '{nombre}' no encontrada")
+            row = row | {"categoria_id": categoria_id}
+        elif int(row["categoria_id"]) not in self.ids:
+            raise ValueError(f"Categoría {row['categoria_id']} no encontrada")
+        return row
+
+
+def _insert_batch(engine, batch: List[Tuple[int, dict]], report: dict):
+    try:
+        with Session(engine) as session:
+            session.execute(insert(Libro), [values for _, values in batch])  # executemany
+            session.commit()
+        report["insertados"] += len(batch)
+    except SQLAlchemyError:
+        # Un registro malo no tumba el lote: se reintenta fila por fila
+        for numero, values in batch:
+            try:
+                with Session(engine) as session:
+                    session.execute(insert(Libro), [values])
+                    session.commit()
+                report["insertados"] += 1
+            except SQLAlchemyError as exc:
+                _add_error(report, numero, str(exc.orig if hasattr(exc, "orig") else exc))
+
+
+def _add_error(report: dict, numero: int, error: str):
+    report["fallidos"] += 1
+    if len(report["errores"]) < MAX_REPORTED_ERRORS:
+        report["errores"].append({"fila": numero, "error": error})
+
+
+def import_libros(engine, lines: Iterable[str], formato: str = "ndjson", batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    report = {"insertados": 0, "fallidos": 0, "errores": []}
+    categorias = CategoriaLookup(engine)
+    batch: List[Tuple[int, dict]] = []
+
+    for numero, row in read_rows(lines, formato):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            # JSON válido pero no objeto (5, [1, 2], "s", null): error de esa fila
+            if not isinstance(row, dict):
+                raise ValueError(f"Se esperaba un objeto JSON, llegó {type(row).__name__}")
+            libro = LibroCreate.model_validate(categorias.resolve(row))
+        except (ValidationError, ValueError, TypeError, OverflowError) as exc:
+            _add_error(report, numero, str(exc))
+            continue
+
+        batch.append((numero, libro.model_dump()))
+        if len(batch) >= batch_size:
+            _insert_batch(engine, batch, report)
+            batch = []
+
+    if batch:
+        _insert_batch(engine, batch, report)
+
+    return report
+
+
+'''
+CLI
+'''
+# python -m importacion importar libros.csv
+# python -m importacion exportar --formato csv --salida libros.csv
+def main(argv: Optional[List[str]] = None):
+    from db import create_db_and_tables, engine
+
+    parser = argparse.ArgumentParser(prog="python -m importacion")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    importar = sub.add_parser("importar", help="Importa libros desde CSV o NDJSON")
+    importar.add_argument("archivo", help="Ruta del archivo, o - para stdin")
+    importar.add_argument("--formato", choices=EXPORT_MEDIA_TYPES, default=None)
+    importar.add_argument("--lote", type=int, default=IMPORT_BATCH_SIZE)
+
+    exportar = sub.add_parser("exportar", help="Exporta el catálogo")
+    exportar.add_argument("--formato", choices=EXPORT_MEDIA_TYPES, default="ndjson")
+    exportar.add_argument("--categoria-id", type=int, default=None)
+    exportar.add_argument("--salida", default="-")
+
+    args = parser.parse_args(argv)
+    create_db_and_tables()
+
+    if args.comando == "importar":
+        formato = args.formato or ("csv" if args.archivo.endswith(".csv") else "ndjson")
+        source = sys.stdin if args.archivo == "-" else open(args.archivo, encoding="utf-8", newline="")
+        with source:
+            report = import_libros(engine, source, formato, args.lote)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    target = sys.stdout.buffer if args.salida == "-" else open(args.salida, "wb")
+    with target:
+        for chunk in iter_export(engine, args.categoria_id, args.formato):
+            target.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
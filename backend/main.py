@@ -1,8 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from db import create_db_and_tables
-from routers import libros, carrito, autenticacion, categorias
+import config
+from sqlmodel import Session
+from db import async_engine, create_db_and_tables, read_engine
+from cache import catalog_cache
+from metricas import MetricsMiddleware, registry
+from admision import AdmissionMiddleware, admission_stats
+from security import shutdown_executor
+from dependencias import token_denylist
+from eventos import catalog_hub
+from tareas import WorkerPool, queue_stats
+from routers import libros, carrito, autenticacion, categorias, ventas, admin, eventos
 
 '''
 INICIAR DATABASE
@@ -10,7 +20,20 @@ INICIAR DATABASE
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    # Hilo que sincroniza los tokens revocados por los otros workers
+    token_denylist.start()
+    # Hilo de recomendaciones: abre (o arma) el artefacto y lee las ventas nuevas
+    libros.recomendador.start()
+    # Workers de la cola de tareas en procesos aparte (python -m tareas worker si TAREAS_WORKERS=0)
+    workers = WorkerPool(config.TAREAS_WORKERS)
+    workers.start()
     yield
+    workers.stop()
+    libros.recomendador.stop()
+    token_denylist.stop()
+    shutdown_executor()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 '''
@@ -22,6 +45,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+'''
+ADMISIÓN
+'''
+# Por dentro de CORS (los 429/503 llevan sus encabezados y el navegador los
+# puede leer) y de las métricas (que cuentan los rechazos)
+if config.RATE_LIMIT_ENABLED or config.LOAD_SHED_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 '''
 CONFIGURAR CORS
 '''
@@ -33,14 +64,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+'''
+MÉTRICAS
+'''
+# Se agrega al final para quedar por fuera de CORS y medir el request completo
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 '''
 INCLUIR ROUTERS
 '''
+# Con ASYNC_DB los GET del catálogo se registran primero y atienden ellos
+if config.ASYNC_DB:
+    from routers import libros_async, categorias_async
+    app.include_router(libros_async.router)
+    app.include_router(categorias_async.router)
+
 app.include_router(libros.router)
 app.include_router(carrito.router)
 app.include_router(autenticacion.router)
 app.include_router(categorias.router)
+app.include_router(ventas.router)
+app.include_router(admin.router)
+app.include_router(eventos.router)
 
 @app.get("/", tags=["Root"])
 def read_root():
-    return {"message": "Bienvenido a la Libreria API por alex.py B)"}
\ No newline at end of file
+    return {"message": "Bienvenido a la Libreria API por alex.py B)"}
+
+
+@app.get("/cache/stats", tags=["Root"])
+def read_cache_stats():
+    return catalog_cache.stats()
+
+
+@app.get("/ws/catalogo/stats", tags=["Root"])
+def read_eventos_stats():
+    return catalog_hub.stats()
+
+
+@app.get("/tareas/stats", tags=["Root"])
+def read_tareas_stats():
+    with Session(read_engine) as session:
+        return queue_stats(session)
+
+
+@app.get("/admision/stats", tags=["Root"])
+def read_admision_stats():
+    return admission_stats()
+
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
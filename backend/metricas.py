@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+logger = logging.getLogger("libreria.metricas")
+
+'''
+ESTADO POR REQUEST
+'''
+class RequestStats:
+    # Objeto mutable guardado en un ContextVar: el threadpool de FastAPI
+    # copia el contexto, así que los eventos del motor lo ven desde el worker
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self, capture: bool):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements: Optional[List[Tuple[float, str]]] = [] if capture else None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+'''
+INSTRUMENTACIÓN DEL MOTOR
+'''
+def instrument_engine(sync_engine: Engine):
+    # Solo se mide lo que ocurre dentro de un request; el resto (arranque,
+    # CLIs) no paga más que la lectura del ContextVar
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_stats.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is None:
+            return
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None and len(stats.statements) < config.METRICS_SLOW_SQL_CAPTURE:
+            stats.statements.append((elapsed, statement))
+
+
+'''
+REGISTRO DE MÉTRICAS
+'''
+# Segundos; mismos cortes que el cliente oficial de Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Tiempo que una sesión retiene su conexión del pool
+HOLD_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "queries", "db_time", "status")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.status: Dict[int, int] = {}
+
+
+class PoolMetrics:
+    __slots__ = ("pool", "checkouts", "hold")
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.checkouts = 0
+        self.hold = Histogram(HOLD_BUCKETS)
+
+    def connections(self) -> Dict[str, int]:
+        # Solo QueuePool lleva estas cuentas; SingletonThreadPool (:memory:) no
+        if not hasattr(self.pool, "checkedout"):
+            return {}
+        return {
+            "en_uso": self.pool.checkedout(),
+            "libres": self.pool.checkedin(),
+            "overflow": max(0, self.pool.overflow()),
+            "tamano": self.pool.size(),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._pools: Dict[str, PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def instrument_pool(self, nombre: str, sync_engine: Engine):
+        # Préstamos y tiempo de retención por pool (escritura / lectura), para
+        # ver si las lecturas compiten por conexiones con los checkouts
+        metrics = self._pools[nombre] = PoolMetrics(sync_engine.pool)
+
+        @event.listens_for(sync_engine, "checkout")
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["checkout_start"] = time.perf_counter()
+
+        @event.listens_for(sync_engine, "checkin")
+        def checkin(dbapi_connection, connection_record):
+            start = connection_record.info.pop("checkout_start", None)
+            if start is None:
+                return
+            with self._lock:
+                metrics.checkouts += 1
+                metrics.hold.observe(time.perf_counter() - start)
+
+    def observe(self, method: str, route: str, status_code: int, elapsed: float, stats: RequestStats):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(elapsed)
+            metrics.queries.observe(stats.queries)
+            metrics.db_time += stats.db_time
+            metrics.status[status_code] = metrics.status.get(status_code, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        # Formato de texto de Prometheus (version 0.0.4)
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_requests_total Requests atendidos por ruta y código de estado.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), metrics in routes:
+                for status_code, count in sorted(metrics.status.items()):
+                    lines.append(f'http_requests_total{{{_labels(method, route)},status="{status_code}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Latencia de los requests por ruta.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), metrics in routes:
+                lines += _histogram_lines("http_request_duration_seconds", _labels(method, route), metrics.latency)
+
+            lines += [
+                "# HELP db_queries_per_request Sentencias SQL ejecutadas por request.",
+                "# TYPE db_queries_per_request histogram",
+            ]
+            for (method, route), metrics in routes:
+                lines += _histogram_lines("db_queries_per_request", _labels(method, route), metrics.queries)
+
+            lines += [
+                "# HELP db_query_duration_seconds_total Tiempo acumulado en la base por ruta.",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            for (method, route), metrics in routes:
+                lines.append(f"db_query_duration_seconds_total{{{_labels(method, route)}}} {metrics.db_time:.6f}")
+
+            pools = sorted(self._pools.items())
+            lines += [
+                "# HELP db_pool_connections Conexiones de cada pool por estado.",
+                "# TYPE db_pool_connections gauge",
+            ]
+            for nombre, pool in pools:
+                for estado, valor in pool.connections().items():
+                    lines.append(f'db_pool_connections{{pool="{nombre}",estado="{estado}"}} {valor}')
+
+            lines += [
+                "# HELP db_pool_checkouts_total Conexiones prestadas y devueltas por pool.",
+                "# TYPE db_pool_checkouts_total counter",
+            ]
+            for nombre, pool in pools:
+                lines.append(f'db_pool_checkouts_total{{pool="{nombre}"}} {pool.checkouts}')
+
+            lines += [
+                "# HELP db_pool_hold_seconds Tiempo que cada préstamo retuvo su conexión.",
+                "# TYPE db_pool_hold_seconds histogram",
+            ]
+            for nombre, pool in pools:
+                lines += _histogram_lines("db_pool_hold_seconds", f'pool="{nombre}"', pool.hold)
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    lines = []
+    acumulado = 0
+    for limite, count in zip(histogram.buckets, histogram.counts):
+        acumulado += count
+        lines.append(f'{name}_bucket{{{labels},le="{limite}"}} {acumulado}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+'''
+MIDDLEWARE
+'''
+class MetricsMiddleware:
+    # Middleware ASGI puro: no envuelve el body como BaseHTTPMiddleware,
+    # así que no rompe el streaming de /libros/export ni de /libros/bulk
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        slow_ms = config.METRICS_SLOW_REQUEST_MS
+        stats = RequestStats(capture=slow_ms > 0)
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # La plantilla de la ruta ("/libros/{libro_id}") evita una serie por id
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or "unmatched"
+            self.registry.observe(scope["method"], template, status_code, elapsed, stats)
+
+            if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+                log_slow_request(scope["method"], scope["path"], status_code, elapsed, stats)
+
+
+def log_slow_request(method: str, path: str, status_code: int, elapsed: float, stats: RequestStats):
+    peores = sorted(stats.statements or [], reverse=True)[:config.METRICS_SLOW_SQL_LIMIT]
+    detalle = "".join(f"\n  {duracion * 1000:.1f} ms: {' '.join(sql.split())}" for duracion, sql in peores)
+    logger.warning(
+        "Request lento %s %s -> %s en %.1f ms (%d sentencias, %.1f ms en la base)%s",
+        method, path, status_code, elapsed * 1000, stats.queries, stats.db_time * 1000, detalle
+    )
@@ -0,0 +1,393 @@
+import argparse
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import Session, SQLModel, select
+
+import config
+from busqueda import FTS_DDL, FTS_REBUILD, create_search_index
+from models import Categoria, MigracionAplicada
+from versiones import create_version_triggers, version_ddl
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+'''
+PASOS
+'''
+# Cada paso sabe mostrar su SQL (dry-run) y aplicarse, y es idempotente: si
+# una migración se corta a medias, volver a correrla termina el trabajo. Que
+# dos workers que arrancan a la vez no la corran juntos lo asegura el lock de
+# migrate(), no los pasos
+def _table(nombre: str):
+    return SQLModel.metadata.tables[nombre]
+
+
+class CrearEsquema:
+    # create_all: en una base nueva deja el esquema completo; en una existente
+    # solo crea las tablas que falten (no altera las que ya están)
+    descripcion = "tablas faltantes (create_all)"
+
+    def sql(self, engine: Engine) -> List[str]:
+        existentes = set(inspect(engine).get_table_names())
+        return [
+            str(CreateTable(table).compile(dialect=engine.dialect)).strip()
+            for table in SQLModel.metadata.sorted_tables if table.name not in existentes
+        ]
+
+    def apply(self, engine: Engine):
+        try:
+            SQLModel.metadata.create_all(engine)
+        except (OperationalError, ProgrammingError):
+            # Sin lock de migraciones otro proceso pudo crear una tabla entre
+            # la revisión y el CREATE; la segunda pasada ya la ve
+            SQLModel.metadata.create_all(engine)
+
+
+class AgregarColumna:
+    def __init__(self, tabla: str, columna: str):
+        self.tabla = tabla
+        self.columna = columna
+        self.descripcion = f"columna {tabla}.{columna}"
+
+    def sql(self, engine: Engine) -> List[str]:
+        inspector = inspect(engine)
+        # Si la tabla aún no existe, CrearEsquema la crea ya con la columna
+        if not inspector.has_table(self.tabla):
+            return []
+        if self.columna in {column["name"] for column in inspector.get_columns(self.tabla)}:
+            return []
+
+        column = _table(self.tabla).columns[self.columna]
+        # Una columna NOT NULL nueva necesita server_default para las filas que ya existen
+        ddl = f"ALTER TABLE {self.tabla} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+        return [ddl]
+
+    def apply(self, engine: Engine):
+        # ADD COLUMN con default constante solo toca el catálogo, no reescribe la tabla
+        try:
+            with engine.begin() as conn:
+                for ddl in self.sql(engine):
+                    conn.execute(text(ddl))
+        except (OperationalError, ProgrammingError):
+            # Sin lock de migraciones otro proceso pudo agregarla entre la revisión y el ALTER
+            if self.sql(engine):
+                raise
+
+
+class CrearIndice:
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.descripcion = f"índice {nombre}"
+
+    def _index(self):
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name == self.nombre:
+                    return index
+        raise KeyError(self.nombre)
+
+    def sql(self, engine: Engine) -> List[str]:
+        ddl = str(CreateIndex(self._index(), if_not_exists=True).compile(dialect=engine.dialect)).strip()
+        if engine.dialect.name == "postgresql":
+            # Postgres construye el índice sin bloquear escrituras
+            ddl = ddl.replace("INDEX", "INDEX CONCURRENTLY", 1)
+        return [ddl]
+
+    def apply(self, engine: Engine):
+        if engine.dialect.name == "postgresql":
+            # CONCURRENTLY no puede correr dentro de una transacción
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for ddl in self.sql(engine):
+                    conn.execute(text(ddl))
+            return
+
+        # SQLite no tiene construcción en línea: el índice va en su propia
+        # transacción corta; con WAL las lecturas siguen durante la construcción
+        # y los escritores esperan (busy_timeout) solo lo que tarde este índice
+        with engine.begin() as conn:
+            for ddl in self.sql(engine):
+                conn.execute(text(ddl))
+
+
+class Backfill:
+    # UPDATE por rangos de la llave, un commit por lote: ningún escritor queda
+    # bloqueado más de lo que tarda un lote
+    def __init__(self, tabla: str, asignacion: str, pendiente: str, llave: str = "id"):
+        self.tabla = tabla
+        self.asignacion = asignacion
+        self.pendiente = pendiente
+        self.llave = llave
+        self.descripcion = f"backfill {tabla}: {asignacion}"
+
+    def _statement(self) -> str:
+        return (
+            f"UPDATE {self.tabla} SET {self.asignacion} "
+            f"WHERE {self.llave} > :desde AND {self.llave} <= :hasta AND ({self.pendiente})"
+        )
+
+    def sql(self, engine: Engine) -> List[str]:
+        return [f"-- lotes de {config.MIGRATION_BATCH_SIZE} por {self.llave}, un commit por lote", self._statement()]
+
+    def apply(self, engine: Engine):
+        with engine.connect() as conn:
+            minimo, maximo = conn.execute(
+                text(f"SELECT MIN({self.llave}), MAX({self.llave}) FROM {self.tabla} WHERE {self.pendiente}")
+            ).one()
+        if minimo is None:
+            return
+
+        desde = minimo - 1
+        while desde < maximo:
+            hasta = desde + config.MIGRATION_BATCH_SIZE
+            with engine.begin() as conn:
+                conn.execute(text(self._statement()), {"desde": desde, "hasta": hasta})
+            desde = hasta
+            if config.MIGRATION_BATCH_PAUSE:
+                time.sleep(config.MIGRATION_BATCH_PAUSE)
+
+
+class Sembrar:
+    # Datos iniciales en un solo INSERT multi-fila ... ON CONFLICT DO NOTHING,
+    # una transacción: no consulta fila por fila qué existe ya
+    def __init__(self, model, filas: List[dict], llave: str):
+        self.model = model
+        self.filas = filas
+        self.llave = llave
+        self.descripcion = f"datos iniciales de {model.__tablename__} ({len(filas)} filas)"
+
+    def _statement(self, engine: Engine):
+        insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        return insert(self.model).values(self.filas).on_conflict_do_nothing(index_elements=[self.llave])
+
+    def sql(self, engine: Engine) -> List[str]:
+        return [str(self._statement(engine).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))]
+
+    def apply(self, engine: Engine):
+        with engine.begin() as conn:
+            conn.execute(self._statement(engine))
+
+
+class Ejecutar:
+    # Paso en Python (triggers, FTS, backfills con lógica propia)
+    def __init__(self, descripcion: str, fn: Callable[[Engine], None], sql: Callable[[Engine], List[str]]):
+        self.descripcion = descripcion
+        self.fn = fn
+        self._sql = sql
+
+    def sql(self, engine: Engine) -> List[str]:
+        return self._sql(engine)
+
+    def apply(self, engine: Engine):
+        self.fn(engine)
+
+
+def _backfill_estadisticas(engine: Engine):
+    # Import diferido: estadisticas depende de db, que a su vez usa este módulo
+    from estadisticas import backfill
+    backfill(engine)
+
+
+'''
+MIGRACIONES
+'''
+class Migracion:
+    def __init__(self, version: int, nombre: str, pasos: list):
+        self.version = version
+        self.nombre = nombre
+        self.pasos = pasos
+
+
+CATEGORIAS_INICIALES = [
+    "Fantasía", "Ciencia ficción", "Misterio", "Novela Histórica", "Ficción", "Romance", "Terror", "Aventura",
+]
+
+# Solo se agregan al final; una versión aplicada nunca se edita
+MIGRACIONES = [
+    Migracion(1, "esquema_base", [CrearEsquema()]),
+    Migracion(2, "cantidades_y_precio_unitario", [
+        AgregarColumna("carritolibrolink", "cantidad"),
+        AgregarColumna("ventalibrolink", "cantidad"),
+        AgregarColumna("ventalibrolink", "precio_unitario"),
+        # Ventas anteriores a la columna: se toma el precio actual del libro
+        Backfill(
+            "ventalibrolink",
+            "precio_unitario = (SELECT precio FROM libro WHERE libro.id = ventalibrolink.libro_id)",
+            "precio_unitario = 0",
+            llave="venta_id",
+        ),
+    ]),
+    Migracion(3, "versiones_de_tablas", [
+        Ejecutar("triggers de versión (ETag)", create_version_triggers, lambda engine: version_ddl(engine.dialect.name)),
+    ]),
+    Migracion(4, "busqueda_fts", [
+        Ejecutar(
+            "índice FTS5 del catálogo", create_search_index,
+            lambda engine: FTS_DDL + [FTS_REBUILD] if engine.dialect.name == "sqlite" else []
+        ),
+    ]),
+    Migracion(5, "agregados_de_ventas", [
+        Ejecutar(
+            "reconstruir agregados de ventas", _backfill_estadisticas,
+            lambda engine: ["-- python -m estadisticas backfill"]
+        ),
+    ]),
+    Migracion(6, "indices_del_catalogo", [
+        CrearIndice(nombre) for nombre in (
+            "ix_libro_cantidad_disponible", "ix_libro_en_stock", "ix_libro_precio",
+            "ix_libro_fecha_publicacion", "ix_libro_titulo", "ix_libro_categoria_id",
+            "ix_libro_categoria_precio", "ix_libro_categoria_fecha_publicacion", "ix_libro_categoria_titulo",
+            "ix_libro_idioma_precio", "ix_libro_autor_fecha_publicacion", "ix_libro_editorial_titulo",
+        )
+    ]),
+    Migracion(7, "categorias_iniciales", [
+        Sembrar(Categoria, [{"nombre": nombre} for nombre in CATEGORIAS_INICIALES], llave="nombre"),
+    ]),
+    # create_all solo crea lo que falta: la tabla tarea con su índice
+    Migracion(8, "cola_de_tareas", [CrearEsquema()]),
+    Migracion(9, "indices_de_filtros", [
+        CrearIndice(nombre) for nombre in (
+            "ix_libro_en_stock_precio", "ix_libro_en_stock_fecha_publicacion", "ix_libro_en_stock_titulo",
+            "ix_libro_idioma", "ix_libro_autor", "ix_libro_editorial",
+        )
+    ]),
+    Migracion(10, "categoria_de_la_venta", [
+        AgregarColumna("ventalibrolink", "categoria_id"),
+        # Ventas anteriores a la columna: la única categoría conocida es la actual
+        Backfill(
+            "ventalibrolink",
+            "categoria_id = (SELECT categoria_id FROM libro WHERE libro.id = ventalibrolink.libro_id)",
+            "categoria_id IS NULL",
+            llave="venta_id",
+        ),
+    ]),
+]
+
+
+'''
+EJECUCIÓN
+'''
+# Llave del pg_advisory_lock de las migraciones (cualquier bigint fijo)
+MIGRATION_LOCK_KEY = 7_151_004_218
+
+
+def applied_versions(engine: Engine, crear: bool = True) -> set:
+    # Camino normal de un arranque: la tabla existe y esto es el único query;
+    # solo si falta se revisa el catálogo y se crea
+    def leer() -> set:
+        with Session(engine) as session:
+            return set(session.exec(select(MigracionAplicada.version)).all())
+
+    try:
+        return leer()
+    except (OperationalError, ProgrammingError):
+        # Otro proceso pudo crearla entre el SELECT y la revisión: se relee
+        if inspect(engine).has_table(MigracionAplicada.__tablename__):
+            return leer()
+    if not crear:
+        return set()
+    MigracionAplicada.__table__.create(engine, checkfirst=True)
+    return set()
+
+
+def pending(engine: Engine, hasta: Optional[int] = None, crear: bool = True) -> List[Migracion]:
+    aplicadas = applied_versions(engine, crear)
+    return [
+        migracion for migracion in MIGRACIONES
+        if migracion.version not in aplicadas and (hasta is None or migracion.version <= hasta)
+    ]
+
+
+@contextmanager
+def migration_lock(engine: Engine):
+    # Un solo proceso migra a la vez; los demás esperan aquí y al entrar
+    # vuelven a leer qué falta. Los pasos usan sus propias conexiones, así que
+    # el lock no puede ser uno de escritura de la base (se bloquearían solos)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:llave)"), {"llave": MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:llave)"), {"llave": MIGRATION_LOCK_KEY})
+    elif engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:") and fcntl is not None:
+        # SQLite es de un solo host: basta un flock sobre un archivo junto a la base
+        with open(f"{engine.url.database}.migraciones.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def migrate(engine: Engine, hasta: Optional[int] = None, dry_run: bool = False, log=print) -> List[int]:
+    if dry_run:
+        return _migrate(engine, hasta, dry_run, log)
+    # Camino normal del arranque: nada pendiente, sin tomar el lock
+    if not pending(engine, hasta, crear=False):
+        return []
+    with migration_lock(engine):
+        return _migrate(engine, hasta, dry_run, log)
+
+
+def _migrate(engine: Engine, hasta: Optional[int], dry_run: bool, log) -> List[int]:
+    aplicadas = []
+    # Dentro del lock: lo que otro proceso aplicó mientras se esperaba ya no está pendiente
+    for migracion in pending(engine, hasta, crear=not dry_run):
+        log(f"-- {migracion.version:04d} {migracion.nombre}")
+        for paso in migracion.pasos:
+            if dry_run:
+                log(f"--   {paso.descripcion}")
+                for ddl in paso.sql(engine):
+                    ddl = " ".join(ddl.split())
+                    log(ddl if ddl.startswith("--") else ddl + ";")
+                continue
+
+            inicio = time.perf_counter()
+            paso.apply(engine)
+            log(f"--   {paso.descripcion} ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+
+        if dry_run:
+            continue
+
+        with engine.begin() as conn:
+            # Sin lock (SQLite sin fcntl) otro worker pudo registrarla primero
+            conn.execute(
+                text("INSERT INTO migracion (version, nombre, aplicada) VALUES (:version, :nombre, CURRENT_TIMESTAMP) ON CONFLICT DO NOTHING"),
+                {"version": migracion.version, "nombre": migracion.nombre},
+            )
+        aplicadas.append(migracion.version)
+    return aplicadas
+
+
+if __name__ == "__main__":
+    # python -m migraciones estado
+    # python -m migraciones aplicar [--hasta N] [--dry-run]
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m migraciones")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("estado")
+    aplicar = sub.add_parser("aplicar")
+    aplicar.add_argument("--hasta", type=int, default=None)
+    aplicar.add_argument("--dry-run", action="store_true", help="Solo muestra el SQL que se ejecutaría")
+    args = parser.parse_args()
+
+    if args.comando == "estado":
+        aplicadas = applied_versions(engine, crear=False)
+        for migracion in MIGRACIONES:
+            marca = "aplicada " if migracion.version in aplicadas else "pendiente"
+            print(f"{migracion.version:04d} {marca} {migracion.nombre}")
+    else:
+        migrate(engine, args.hasta, args.dry_run)
@@ -1,7 +1,8 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, text
 from pydantic import EmailStr
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Literal, Optional, List
 
 
 '''
@@ -10,10 +11,16 @@ Many-to-Many
 class CarritoLibroLink(SQLModel, table=True):
     carrito_id: Optional[int] = Field(foreign_key="carrito.id", primary_key=True)
     libro_id: Optional[int] = Field(foreign_key="libro.id", primary_key=True)
+    cantidad: int = Field(default=1, ge=1, sa_column_kwargs={"server_default": "1"})
 
 class VentaLibroLink(SQLModel, table=True):
     venta_id: Optional[int] = Field(foreign_key="venta.id", primary_key=True)
     libro_id: Optional[int] = Field(foreign_key="libro.id", primary_key=True)
+    cantidad: int = Field(default=1, ge=1, sa_column_kwargs={"server_default": "1"})
+    precio_unitario: float = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Categoría del libro al momento de la venta: los agregados por categoría
+    # (incrementales o por backfill) se atribuyen a esta, no a la actual
+    categoria_id: Optional[int] = None
 
 
 '''
@@ -40,6 +47,16 @@ class UsuarioLogin(SQLModel):
     correo: EmailStr
     password: str
 
+# Claims del token de acceso
+class UsuarioToken(SQLModel):
+    id: int
+    es_admin: bool
+    jti: str
+    exp: int
+
+class TokenRefresh(SQLModel):
+    refresh_token: str
+
 # Modelo completo
 class Usuario(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
@@ -97,6 +114,42 @@ class LibroBase(SQLModel):
     imagen_url: str
     
 class Libro(LibroBase, table=True):
+    __table_args__ = (
+        # Lista de bajo stock del dashboard
+        Index("ix_libro_cantidad_disponible", "cantidad_disponible"),
+        # Parciales: solo libros con stock, uno por orden (filtro en_stock)
+        *(
+            Index(
+                nombre, columna,
+                sqlite_where=text("cantidad_disponible > 0"), postgresql_where=text("cantidad_disponible > 0")
+            )
+            for nombre, columna in (
+                ("ix_libro_en_stock", "id"),
+                ("ix_libro_en_stock_precio", "precio"),
+                ("ix_libro_en_stock_fecha_publicacion", "fecha_publicacion"),
+                ("ix_libro_en_stock_titulo", "titulo"),
+            )
+        ),
+        # Orden (y rangos) del catálogo sin filtro de categoría
+        Index("ix_libro_precio", "precio"),
+        Index("ix_libro_fecha_publicacion", "fecha_publicacion"),
+        Index("ix_libro_titulo", "titulo"),
+        # Navegación por categoría ya ordenada, sin paso de ordenamiento
+        # (el índice simple da el orden por id: SQLite le agrega el rowid)
+        Index("ix_libro_categoria_id", "categoria_id"),
+        Index("ix_libro_categoria_precio", "categoria_id", "precio"),
+        Index("ix_libro_categoria_fecha_publicacion", "categoria_id", "fecha_publicacion"),
+        Index("ix_libro_categoria_titulo", "categoria_id", "titulo"),
+        # Filtros por igualdad: el índice simple da el orden por id y el
+        # compuesto el orden más común de cada uno
+        Index("ix_libro_idioma", "idioma"),
+        Index("ix_libro_autor", "autor"),
+        Index("ix_libro_editorial", "editorial"),
+        Index("ix_libro_idioma_precio", "idioma", "precio"),
+        Index("ix_libro_autor_fecha_publicacion", "autor", "fecha_publicacion"),
+        Index("ix_libro_editorial_titulo", "editorial", "titulo"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
     categoria: Optional[Categoria] = Relationship(back_populates="libros")
@@ -118,6 +171,47 @@ class LibroRead(LibroBase):
     id: int
     categoria: Optional[CategoriaRead] = None
 
+# Filtros y orden del catálogo (query params de /libros y /libros/pagina);
+# cada combinación está respaldada por un índice de Libro
+LibroOrden = Literal[
+    "id", "precio", "-precio", "fecha_publicacion", "-fecha_publicacion", "titulo", "-titulo"
+]
+
+class LibroFiltros(SQLModel):
+    categoria_id: Optional[int] = None
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    idioma: Optional[str] = None
+    autor: Optional[str] = None
+    editorial: Optional[str] = None
+    anio_min: Optional[int] = None
+    anio_max: Optional[int] = None
+    en_stock: bool = False
+    orden: LibroOrden = "id"
+
+# Página por cursor (keyset)
+class LibroPage(SQLModel):
+    items: List[LibroRead] = []
+    next_cursor: Optional[str] = None
+
+# Varios libros por id (carrito, checkout, carruseles); con fields= los items
+# solo traen esos campos (más el id)
+class LibroBatchRequest(SQLModel):
+    ids: List[int] = Field(min_length=1)
+    fields: Optional[List[str]] = None
+
+class LibroBatch(SQLModel):
+    items: List[LibroRead] = []
+    faltantes: List[int] = []
+
+# "También compraron": primero por co-ocurrencia en ventas y, si no alcanza,
+# más vendidos de la misma categoría
+class LibroRelacionados(SQLModel):
+    libro_id: int
+    items: List[LibroRead] = []
+    por_compras: int = 0
+    por_categoria: int = 0
+
 class LibroUpdate(SQLModel):
     titulo: Optional[str] = Field(default=None, max_length=100)
     autor: Optional[str] = Field(default=None, max_length=100)
@@ -162,6 +256,33 @@ class CarritoCreate(SQLModel):
 class CarritoUpdate(SQLModel):
     libros_ids: Optional[List[int]] = Field(default=None)
 
+# Líneas del carrito con cantidad
+class CarritoItemCreate(SQLModel):
+    libro_id: int
+    cantidad: int = Field(default=1, ge=1)
+
+class CarritoItemUpdate(SQLModel):
+    cantidad: int = Field(ge=1)
+
+class CarritoItem(SQLModel):
+    carrito_id: int
+    libro_id: int
+    cantidad: int
+
+class CarritoItemRead(SQLModel):
+    libro_id: int
+    titulo: str
+    precio: float
+    cantidad: int
+    subtotal: float
+
+class CarritoDetalle(SQLModel):
+    id: int
+    usuario_id: int
+    items: List[CarritoItemRead] = []
+    total_items: int = 0
+    total: float = 0
+
 
 '''
 Venta
@@ -179,4 +300,144 @@ class Venta(SQLModel, table=True):
     libros: list[Libro] = Relationship(
         back_populates="ventas",
         link_model=VentaLibroLink
-    )
\ No newline at end of file
+    )
+
+class VentaCreate(SQLModel):
+    carrito_id: int
+    forma_pago: str = Field(max_length=100)
+
+class VentaLinea(SQLModel):
+    libro_id: int
+    cantidad: int
+    precio_unitario: float
+
+class VentaRead(SQLModel):
+    id: int
+    usuario_id: int
+    total: float
+    fecha: datetime
+    forma_pago: str
+    lineas: List[VentaLinea] = []
+
+# Llave de idempotencia -> venta ya creada (reintentos seguros del checkout)
+class VentaIdempotencia(SQLModel, table=True):
+    clave: str = Field(primary_key=True, max_length=100)
+    usuario_id: int = Field(foreign_key="usuario.id")
+    venta_id: int = Field(foreign_key="venta.id")
+
+
+'''
+Versión por tabla (ETag / Last-Modified)
+'''
+class VersionTabla(SQLModel, table=True):
+    tabla: str = Field(primary_key=True, max_length=50)
+    version: int = Field(default=0)
+    actualizado: datetime = Field(default_factory=datetime.utcnow)
+
+
+'''
+Migraciones aplicadas
+'''
+class MigracionAplicada(SQLModel, table=True):
+    __tablename__ = "migracion"
+
+    version: int = Field(primary_key=True)
+    nombre: str = Field(max_length=100)
+    aplicada: datetime = Field(default_factory=datetime.utcnow)
+
+
+'''
+Tokens revocados (logout / rotación de refresh)
+'''
+class TokenRevocado(SQLModel, table=True):
+    jti: str = Field(primary_key=True, max_length=64)
+    expira: datetime = Field(index=True)
+
+
+'''
+Estadísticas (agregados incrementales)
+'''
+# Se actualizan dentro de la misma transacción del checkout; el dashboard lee
+# de aquí y nunca recorre venta/ventalibrolink
+class VentaDiaria(SQLModel, table=True):
+    fecha: date = Field(primary_key=True)
+    ventas: int = Field(default=0)
+    unidades: int = Field(default=0)
+    ingresos: float = Field(default=0)
+
+class VentaLibroResumen(SQLModel, table=True):
+    libro_id: int = Field(foreign_key="libro.id", primary_key=True)
+    unidades: int = Field(default=0, index=True)
+    ingresos: float = Field(default=0)
+
+class VentaCategoriaResumen(SQLModel, table=True):
+    categoria_id: int = Field(foreign_key="categoria.id", primary_key=True)
+    unidades: int = Field(default=0)
+    ingresos: float = Field(default=0)
+
+class IngresoDiario(SQLModel):
+    fecha: date
+    ventas: int
+    unidades: int
+    ingresos: float
+
+class ResumenLibro(SQLModel):
+    libro_id: int
+    titulo: str
+    unidades: int
+    ingresos: float
+
+class ResumenCategoria(SQLModel):
+    categoria_id: int
+    nombre: str
+    unidades: int
+    ingresos: float
+
+class LibroStockBajo(SQLModel):
+    id: int
+    titulo: str
+    cantidad_disponible: int
+
+class EstadisticasRead(SQLModel):
+    ingresos_por_dia: List[IngresoDiario] = []
+    mas_vendidos: List[ResumenLibro] = []
+    por_categoria: List[ResumenCategoria] = []
+    stock_bajo: List[LibroStockBajo] = []
+
+
+'''
+Cola de tareas en segundo plano
+'''
+# Trabajo que no debe sumar latencia al request (documentos, reindexado,
+# agregados). La llave deduplica mientras la tarea está viva: al terminar se
+# libera y la misma llave se puede volver a encolar
+class Tarea(SQLModel, table=True):
+    __table_args__ = (
+        # Siguiente tarea disponible: WHERE estado = ... ORDER BY disponible_en
+        Index("ix_tarea_estado_disponible_en", "estado", "disponible_en"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tipo: str = Field(max_length=100)
+    payload: str = Field(default="{}")  # JSON
+    llave: Optional[str] = Field(default=None, max_length=200, unique=True)
+    estado: str = Field(default="pendiente", max_length=20)  # pendiente | en_curso | hecha | fallida
+    intentos: int = Field(default=0)
+    max_intentos: int = Field(default=5)
+    creada: datetime = Field(default_factory=datetime.utcnow)
+    disponible_en: datetime = Field(default_factory=datetime.utcnow)
+    iniciada: Optional[datetime] = None
+    terminada: Optional[datetime] = None
+    worker: Optional[str] = Field(default=None, max_length=100)
+    lease_hasta: Optional[datetime] = None
+    error: Optional[str] = None
+
+class TareaRead(SQLModel):
+    id: int
+    tipo: str
+    estado: str
+    intentos: int
+    creada: datetime
+    disponible_en: datetime
+    terminada: Optional[datetime] = None
+    error: Optional[str] = None
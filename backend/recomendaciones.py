@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+import config
+from models import Libro, VentaLibroLink
+
+logger = logging.getLogger("libreria.recomendaciones")
+
+'''
+MATRIZ DE CO-OCURRENCIA ("TAMBIÉN COMPRARON")
+'''
+# Matriz libro x libro en formato CSR: la fila de un libro son los libros que
+# salieron en las mismas ventas, ordenados por número de ventas en común. Se
+# calcula en una pasada vectorizada sobre ventalibrolink y se guarda como .npy
+# (abiertos con mmap), así que una recomendación es un slice de la fila.
+ARREGLOS = ("libros", "categorias", "unidades", "indptr", "indices", "pesos")
+LOTE_LECTURA = 50_000
+MAS_VENDIDOS_POR_CATEGORIA = 100
+
+
+def _read_links(session: Session, desde: int = 0) -> np.ndarray:
+    # (venta_id, libro_id, cantidad) ordenado por venta, en lotes
+    result = session.execute(
+        select(VentaLibroLink.venta_id, VentaLibroLink.libro_id, VentaLibroLink.cantidad)
+        .where(VentaLibroLink.venta_id > desde)
+        .order_by(VentaLibroLink.venta_id)
+        .execution_options(yield_per=LOTE_LECTURA)
+    )
+    lotes = [np.array(lote, dtype=np.int64) for lote in result.partitions()]
+    return np.concatenate(lotes) if lotes else np.zeros((0, 3), dtype=np.int64)
+
+
+def coocurrencias(ventas: np.ndarray, columnas: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # ventas viene ordenado; cada elemento se empareja con todos los de su
+    # venta (sin bucle por venta): se repite tantas veces como mida su grupo
+    if not len(ventas):
+        return np.zeros(n + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    inicios = np.flatnonzero(np.r_[True, ventas[1:] != ventas[:-1]])
+    tamanos = np.diff(np.r_[inicios, len(ventas)])
+    repeticiones = np.repeat(tamanos, tamanos)
+    izquierda = np.repeat(columnas, repeticiones)
+    posicion = np.arange(repeticiones.sum()) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    derecha = columnas[np.repeat(np.repeat(inicios, tamanos), repeticiones) + posicion]
+
+    distintos = izquierda != derecha
+    llaves, pesos = np.unique(izquierda[distintos] * n + derecha[distintos], return_counts=True)
+    filas, indices = np.divmod(llaves, n)
+
+    # Dentro de cada fila, de más a menos ventas en común (el id desempata)
+    orden = np.lexsort((indices, -pesos, filas))
+    filas, indices, pesos = filas[orden], indices[orden], pesos[orden]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(filas, minlength=n), out=indptr[1:])
+    return indptr, indices.astype(np.int32), pesos.astype(np.int32)
+
+
+'''
+ARTEFACTO EN DISCO
+'''
+def _version_actual(directorio: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directorio, "ACTUAL"), encoding="utf-8") as f:
+            return os.path.join(directorio, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def build(engine, directorio: str) -> dict:
+    # Calcula la matriz completa y la publica como una versión nueva; el
+    # puntero ACTUAL se reemplaza de forma atómica, los lectores nunca ven
+    # un artefacto a medias
+    with Session(engine) as session:
+        catalogo = np.array(session.execute(select(Libro.id, Libro.categoria_id).order_by(Libro.id)).all(), dtype=np.int64)
+        links = _read_links(session)
+    catalogo = catalogo.reshape(-1, 2)
+    libros, categorias = catalogo[:, 0], catalogo[:, 1]
+    n = len(libros)
+
+    # Libro -> columna; se descartan líneas de libros que ya no existen
+    columnas = np.searchsorted(libros, links[:, 1]) if n else np.zeros(len(links), dtype=np.int64)
+    existe = columnas < n
+    existe[existe] = libros[columnas[existe]] == links[existe, 1]
+    ventas, columnas, cantidades = links[existe, 0], columnas[existe], links[existe, 2]
+
+    indptr, indices, pesos = coocurrencias(ventas, columnas, n)
+    unidades = np.bincount(columnas, weights=cantidades, minlength=n).astype(np.int64)
+    ultima_venta = int(links[:, 0].max()) if len(links) else 0
+
+    os.makedirs(directorio, exist_ok=True)
+    temporal = tempfile.mkdtemp(dir=directorio, prefix=".tmp-")
+    for nombre, arreglo in zip(ARREGLOS, (libros, categorias, unidades, indptr, indices, pesos)):
+        np.save(os.path.join(temporal, f"{nombre}.npy"), arreglo)
+    meta = {"ultima_venta": ultima_venta, "libros": n, "pares": len(indices), "lineas": int(existe.sum())}
+    with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    version = f"v{ultima_venta}-{time.time_ns()}"
+    os.rename(temporal, os.path.join(directorio, version))
+    puntero = os.path.join(directorio, f".ACTUAL-{os.getpid()}")
+    with open(puntero, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(puntero, os.path.join(directorio, "ACTUAL"))
+
+    # Se conservan la actual y la anterior (un proceso puede seguir leyéndola)
+    versiones = sorted(
+        (entrada for entrada in os.listdir(directorio) if entrada.startswith("v")),
+        key=lambda entrada: os.path.getmtime(os.path.join(directorio, entrada))
+    )
+    for vieja in versiones[:-2]:
+        shutil.rmtree(os.path.join(directorio, vieja), ignore_errors=True)
+    return meta
+
+
+'''
+CONSULTA EN MEMORIA
+'''
+# Cada proceso abre el artefacto con mmap y le suma en memoria un delta con
+# las ventas posteriores a él. Un hilo propio hace todo lo que toca la base o
+# el disco: arma el artefacto si falta, lee las ventas nuevas por venta_id
+# cada refresh_seconds (sin JOIN) y, con rebuild_ventas ventas en el delta,
+# lo reconstruye. Los requests solo leen la foto actual bajo el lock.
+class Recomendador:
+    def __init__(self, engine, directorio: str, refresh_seconds: float, rebuild_ventas: int):
+        self.engine = engine
+        self.directorio = directorio
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_ventas = rebuild_ventas
+        self._lock = threading.Lock()
+        self._arreglos: Optional[Dict[str, np.ndarray]] = None
+        self._mas_vendidos: Dict[int, List[int]] = {}
+        self._reset_delta(0)
+        self._stop = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def _reset_delta(self, ultima_venta: int):
+        self._ultima_venta = ultima_venta
+        self._delta: Dict[int, Counter] = defaultdict(Counter)
+        self._delta_ventas = 0
+
+    def load(self) -> bool:
+        version = _version_actual(self.directorio)
+        if version is None:
+            return False
+
+        arreglos = {nombre: np.load(os.path.join(version, f"{nombre}.npy"), mmap_mode="r") for nombre in ARREGLOS}
+        with open(os.path.join(version, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        # Más vendidos por categoría (respaldo para libros sin historial)
+        mas_vendidos: Dict[int, List[int]] = {}
+        orden = np.lexsort((arreglos["libros"], -arreglos["unidades"], arreglos["categorias"]))
+        for posicion in orden[arreglos["unidades"][orden] > 0].tolist():
+            lista = mas_vendidos.setdefault(int(arreglos["categorias"][posicion]), [])
+            if len(lista) < MAS_VENDIDOS_POR_CATEGORIA:
+                lista.append(int(arreglos["libros"][posicion]))
+
+        with self._lock:
+            self._arreglos = arreglos
+            self._mas_vendidos = mas_vendidos
+            self._reset_delta(meta["ultima_venta"])
+        return True
+
+    def start(self):
+        # Sin bloquear el arranque: mientras no haya artefacto, relacionados()
+        # responde vacío y el endpoint cae a los más vendidos de la categoría
+        self._stop.clear()
+        self._hilo = threading.Thread(target=self._run, name="recomendaciones", daemon=True)
+        self._hilo.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._arreglos is None:
+                    # Sin artefacto (primer arranque) lo construye este hilo
+                    if not self.load():
+                        build(self.engine, self.directorio)
+                        self.load()
+                elif self.sync() >= self.rebuild_ventas:
+                    build(self.engine, self.directorio)
+                    self.load()
+            except Exception:
+                logger.exception("No se pudieron actualizar las recomendaciones")
+            self._stop.wait(self.refresh_seconds)
+
+    def sync(self) -> int:
+        # La lectura va fuera del lock; solo este hilo cambia _ultima_venta
+        with Session(self.engine) as session:
+            links = _read_links(session, self._ultima_venta)
+        if not len(links):
+            return self._delta_ventas
+
+        # Pares de cada venta nueva (son pocas: Counter basta)
+        inicios = np.flatnonzero(links[1:, 0] != links[:-1, 0]) + 1
+        with self._lock:
+            for grupo in np.split(links[:, 1], inicios):
+                libros = grupo.tolist()
+                for libro_id in libros:
+                    self._delta[libro_id].update(otro for otro in libros if otro != libro_id)
+            self._delta_ventas += len(inicios) + 1
+            self._ultima_venta = int(links[:, 0].max())
+            return self._delta_ventas
+
+    def _posicion(self, libro_id: int) -> Optional[int]:
+        libros = self._arreglos["libros"]
+        posicion = int(np.searchsorted(libros, libro_id))
+        return posicion if posicion < len(libros) and libros[posicion] == libro_id else None
+
+    def relacionados(self, libro_id: int, k: int) -> List[int]:
+        # Top-k exacto de base + delta: un libro fuera del delta conserva su
+        # peso base, así que basta mirar los primeros k + len(delta) de la fila
+        with self._lock:
+            arreglos = self._arreglos
+            if arreglos is None:
+                return []
+            delta = dict(self._delta.get(libro_id, {}))
+            posicion = self._posicion(libro_id)
+
+        pesos: Dict[int, int] = {}
+        if posicion is not None:
+            inicio, fin = arreglos["indptr"][posicion], arreglos["indptr"][posicion + 1]
+            ventana = min(fin, inicio + k + len(delta))
+            columnas = arreglos["indices"][inicio:ventana]
+            pesos = dict(zip(arreglos["libros"][columnas].tolist(), arreglos["pesos"][inicio:ventana].tolist()))
+
+            # Los del delta que quedaron fuera de la ventana suman su peso base
+            fila = arreglos["indices"][inicio:fin]
+            for otro in delta:
+                columna = None if otro in pesos else self._posicion(otro)
+                if columna is not None:
+                    encontrado = np.flatnonzero(fila == columna)
+                    if len(encontrado):
+                        pesos[otro] = int(arreglos["pesos"][inicio + encontrado[0]])
+        for otro, peso in delta.items():
+            pesos[otro] = pesos.get(otro, 0) + peso
+
+        return sorted(pesos, key=lambda otro: (-pesos[otro], otro))[:k]
+
+    def categoria_de(self, libro_id: int) -> Optional[int]:
+        with self._lock:
+            if self._arreglos is None:
+                return None
+            posicion = self._posicion(libro_id)
+            return int(self._arreglos["categorias"][posicion]) if posicion is not None else None
+
+    def mas_vendidos(self, categoria_id: int, k: int, excluir: Iterable[int] = ()) -> List[int]:
+        excluir = set(excluir)
+        return [libro_id for libro_id in self._mas_vendidos.get(categoria_id, []) if libro_id not in excluir][:k]
+
+
+def build_recomendador(engine) -> Recomendador:
+    return Recomendador(
+        engine, config.RECOMENDACIONES_DIR, config.RECOMENDACIONES_REFRESH_SECONDS, config.RECOMENDACIONES_REBUILD_VENTAS
+    )
+
+
+if __name__ == "__main__":
+    # python -m recomendaciones build
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m recomendaciones")
+    parser.add_argument("comando", choices=["build"])
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    meta = build(engine, config.RECOMENDACIONES_DIR)
+    print(json.dumps({**meta, "ms": round((time.perf_counter() - inicio) * 1000)}))
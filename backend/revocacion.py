@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+import config
+from models import TokenRevocado
+
+logger = logging.getLogger("libreria.revocacion")
+
+'''
+LISTA DE TOKENS REVOCADOS
+'''
+# La fuente de verdad es la tabla tokenrevocado (compartida entre workers);
+# cada proceso guarda una copia en memoria {jti: exp} que un hilo propio
+# sincroniza cada TOKEN_DENYLIST_REFRESH_SECONDS, así que validar un token
+# nunca consulta la base (ni espera a quien lo esté haciendo).
+class TokenDenylist:
+    def __init__(self, engine, refresh_seconds: float):
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self._revocados: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def revoke(self, jti: str, exp: int) -> bool:
+        # INSERT simple: False si el jti ya estaba revocado (en este u otro
+        # worker). La rotación del refresh depende de esto: de dos requests
+        # con el mismo token solo uno puede insertar su jti
+        with Session(self.engine) as session:
+            # Podar aquí (las revocaciones son raras) y no en cada sincronización:
+            # un token expirado ya no pasa la validación, no hace falta recordarlo
+            session.execute(delete(TokenRevocado).where(TokenRevocado.expira < datetime.utcnow()))
+            session.add(TokenRevocado(
+                jti=jti,
+                expira=datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+            ))
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                nuevo = False
+            else:
+                nuevo = True
+
+        with self._lock:
+            self._revocados[jti] = exp
+        return nuevo
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revocados
+
+    def start(self):
+        # La primera sincronización bloquea el arranque: sin ella el proceso
+        # aceptaría tokens revocados hasta la primera vuelta del hilo
+        self.sync()
+        self._stop.clear()
+        self._hilo = threading.Thread(target=self._run, name="revocaciones", daemon=True)
+        self._hilo.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("No se pudo sincronizar la lista de tokens revocados")
+
+    def sync(self):
+        # La lectura va fuera del lock. Se combina con lo que ya había en vez
+        # de reemplazarlo: una revocación local hecha durante la lectura no se
+        # pierde, y una revocación nunca se deshace
+        with Session(self.engine) as session:
+            rows = session.exec(
+                select(TokenRevocado).where(TokenRevocado.expira >= datetime.utcnow())
+            ).all()
+        leidos = {row.jti: int(row.expira.replace(tzinfo=timezone.utc).timestamp()) for row in rows}
+
+        ahora = time.time()
+        with self._lock:
+            self._revocados = {
+                jti: exp for jti, exp in {**self._revocados, **leidos}.items() if exp >= ahora
+            }
+
+
+def build_denylist(engine) -> TokenDenylist:
+    return TokenDenylist(engine, config.TOKEN_DENYLIST_REFRESH_SECONDS)
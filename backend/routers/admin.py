@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session, select
+from db import get_session
+from dependencias import require_admin
+from estadisticas import read_stats
+from models import EstadisticasRead, Tarea, TareaRead
+from tareas import enqueue
+
+'''
+ROUTER
+'''
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+'''
+ESTADÍSTICAS
+'''
+@router.get("/stats", response_model=EstadisticasRead)
+def read_estadisticas(
+    *,
+    session: Session = Depends(get_session),
+    dias: int = Query(default=30, ge=1, le=366),
+    limit: int = Query(default=10, ge=1, le=100),
+    umbral_stock: int = Query(default=5, ge=0)
+):
+    return read_stats(session, dias, limit, umbral_stock)
+
+
+'''
+RECONSTRUIR ESTADÍSTICAS (EN SEGUNDO PLANO)
+'''
+@router.post("/estadisticas/reconstruir", response_model=TareaRead, status_code=status.HTTP_202_ACCEPTED)
+def rebuild_estadisticas(*, session: Session = Depends(get_session)):
+    # Recorre todo el historial de ventas: lo corre un worker, no el request.
+    # Si ya hay una reconstrucción pendiente se devuelve esa
+    llave = "reconstruir_estadisticas"
+    tarea_id = enqueue(session, "reconstruir_estadisticas", llave=llave)
+    session.commit()
+    if tarea_id is None:
+        existente = session.exec(select(Tarea).where(Tarea.llave == llave)).first()
+        if existente:
+            return existente
+        # Terminó entre el INSERT y el SELECT: se encola una nueva
+        tarea_id = enqueue(session, "reconstruir_estadisticas", llave=llave)
+        session.commit()
+    return session.get(Tarea, tarea_id)
+
+
+'''
+TAREAS
+'''
+@router.get("/tareas/{tarea_id}", response_model=TareaRead)
+def read_tarea(*, session: Session = Depends(get_session), tarea_id: int):
+    tarea = session.get(Tarea, tarea_id)
+    if not tarea:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarea no encontrada")
+    return tarea
@@ -1,24 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError
 from sqlmodel import Session, select
+from typing import Optional
+import config
 from db import get_session
-from models import Usuario, UsuarioRegister, UsuarioLogin, UsuarioRead
-from security import hash_password, verify_password
+from dependencias import get_current_user, token_denylist
+from models import TokenRefresh, Usuario, UsuarioRegister, UsuarioLogin, UsuarioRead, UsuarioToken
+from security import (
+    REFRESH, create_access_token, create_refresh_token, decode_token,
+    hash_password_async, verify_and_update_password_async
+)
 
 router = APIRouter(
     prefix="/auth",
     tags=["Autenticación"]
 )
 
+'''
+CONSULTAS
+'''
+def find_usuario(session: Session, correo: str):
+    return session.exec(
+        select(Usuario).where(Usuario.correo == correo)
+        ).first()
+
+def save_usuario(session: Session, usuario: Usuario):
+    session.add(usuario)
+    session.commit()
+    session.refresh(usuario)
+
+
 '''
 REGISTER
 '''
 @router.post("/register", response_model=UsuarioRead, status_code=status.HTTP_201_CREATED)
-def register_usuario(*, session: Session = Depends(get_session), user_data: UsuarioRegister):
+async def register_usuario(*, session: Session = Depends(get_session), user_data: UsuarioRegister):
     
     # Verificar si el correo ya está registrado
-    existing_user = session.exec(
-        select(Usuario).where(Usuario.correo == user_data.correo)
-        ).first()
+    # (las consultas van al threadpool y el hash al ejecutor dedicado)
+    existing_user = await run_in_threadpool(find_usuario, session, user_data.correo)
     
     if existing_user:
         raise HTTPException(
@@ -27,7 +48,7 @@ def register_usuario(*, session: Session = Depends(get_session), user_data: Usua
         )
     
     # Hashear la contraseña
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
 
     # Crear usuario
     user_dict = user_data.model_dump()
@@ -36,9 +57,7 @@ def register_usuario(*, session: Session = Depends(get_session), user_data: Usua
     db_usuario = Usuario.model_validate(user_dict)
 
     # Guardar en la base de datos
-    session.add(db_usuario)
-    session.commit()
-    session.refresh(db_usuario)
+    await run_in_threadpool(save_usuario, session, db_usuario)
 
     return db_usuario
 
@@ -47,12 +66,9 @@ def register_usuario(*, session: Session = Depends(get_session), user_data: Usua
 LOGIN
 '''
 @router.post("/login")
-def login_usuario(*, session: Session = Depends(get_session), login_data: UsuarioLogin):
-
-    usuario = session.exec(
-        select(Usuario).where(Usuario.correo == login_data.correo)
+async def login_usuario(*, session: Session = Depends(get_session), login_data: UsuarioLogin):
 
-    ).first()
+    usuario = await run_in_threadpool(find_usuario, session, login_data.correo)
     
     if not usuario:
         raise HTTPException(
@@ -60,14 +76,70 @@ def login_usuario(*, session: Session = Depends(get_session), login_data: Usuari
             detail="Correo o contraseña incorrectos"
     )
     
-    if not verify_password(login_data.password, usuario.password):
+    valido, nuevo_hash = await verify_and_update_password_async(login_data.password, usuario.password)
+    if not valido:
         raise HTTPException(
             status_code = status.HTTP_401_UNAUTHORIZED,
             detail="Correo o contraseña incorrectos"
         )
 
+    # Rehash transparente si el costo configurado cambió
+    if nuevo_hash:
+        usuario.password = nuevo_hash
+        await run_in_threadpool(save_usuario, session, usuario)
+
     return {
         "message": f"Login exitodoso para el usuario {usuario.nombre}",
         "user_id": usuario.id,
-        "is_admin": usuario.es_admin
-    }
\ No newline at end of file
+        "is_admin": usuario.es_admin,
+        **token_pair(usuario)
+    }
+
+
+'''
+TOKENS
+'''
+def token_pair(usuario: Usuario) -> dict:
+    return {
+        "access_token": create_access_token(usuario.id, usuario.es_admin),
+        "refresh_token": create_refresh_token(usuario.id, usuario.es_admin),
+        "token_type": "bearer",
+        "expires_in": config.ACCESS_TOKEN_MINUTES * 60
+    }
+
+def decode_refresh(refresh_token: str) -> dict:
+    try:
+        claims = decode_token(refresh_token, REFRESH)
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token inválido o expirado")
+
+    if token_denylist.is_revoked(claims["jti"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token revocado")
+    return claims
+
+
+@router.post("/refresh")
+def refresh_tokens(*, session: Session = Depends(get_session), data: TokenRefresh):
+    claims = decode_refresh(data.refresh_token)
+
+    # El refresh es poco frecuente: aquí sí se relee el usuario para que un
+    # cambio de permisos llegue a los claims del siguiente access token
+    usuario = session.get(Usuario, int(claims["sub"]))
+    if not usuario:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
+
+    # Rotación: el refresh token usado ya no sirve. La copia en memoria puede
+    # ir unos segundos atrás de otro worker; el INSERT del jti no: si ya
+    # existía, el token se está reusando (repetido o robado)
+    if not token_denylist.revoke(claims["jti"], claims["exp"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token reutilizado")
+    return token_pair(usuario)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout_usuario(*, usuario: UsuarioToken = Depends(get_current_user), data: Optional[TokenRefresh] = None):
+    token_denylist.revoke(usuario.jti, usuario.exp)
+
+    if data is not None:
+        claims = decode_refresh(data.refresh_token)
+        token_denylist.revoke(claims["jti"], claims["exp"])
\ No newline at end of file
@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 from typing import List, Optional
-from db import get_session
-from models import Carrito, CarritoCreate, CarritoRead, CarritoUpdate, Libro
+from db import get_read_session, get_session, upsert_insert
+from models import (
+    Carrito, CarritoCreate, CarritoDetalle, CarritoItem, CarritoItemCreate, CarritoItemRead,
+    CarritoItemUpdate, CarritoLibroLink, CarritoRead, CarritoUpdate, Libro
+)
 
 '''
 ROUTER
@@ -20,12 +26,12 @@ CREATE
 def create_carrito(*, session: Session = Depends(get_session), carrito_data: CarritoCreate):
     existing_carrito = session.exec(
         select(Carrito).where(Carrito.usuario_id == carrito_data.usuario_id)
-    )
+    ).first()
     
     if existing_carrito:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detaul="El usuario ya tiene un carrito"
+            detail="El usuario ya tiene un carrito"
         )
     
     db_carrito = Carrito.model_validate(carrito_data)
@@ -39,33 +45,69 @@ def create_carrito(*, session: Session = Depends(get_session), carrito_data: Car
 LEER TODOS
 '''
 @router.get("/", response_model=List[CarritoRead])
-def read_carritos(*, session: Session = Depends(get_session), offset: int = 0, limit: int = 100):
+def read_carritos(*, session: Session = Depends(get_read_session), offset: int = 0, limit: int = 100):
+    # selectinload: los libros de todos los carritos salen en una sola consulta
     carritos = session.exec(
-        select(Carrito).offset(offset).limit(limit).all()
-    )
+        select(Carrito).options(selectinload(Carrito.libros)).offset(offset).limit(limit)
+    ).all()
     return carritos
 
 
 '''
-LEER POR ID
+LEER POR ID (con cantidades y totales calculados en SQL)
 '''
-@router.get("/{carrito_id}", response_model=CarritoRead)
-def read_carrito(*, session: Session = Depends(get_session), carrito_id: int):
-    carrito = session.get(Carrito, carrito_id)
-    if not carrito:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detil="Carrito no encontrado")
-    return carrito
+@router.get("/{carrito_id}", response_model=CarritoDetalle)
+def read_carrito(*, session: Session = Depends(get_read_session), carrito_id: int):
+    subtotal = (Libro.precio * CarritoLibroLink.cantidad).label("subtotal")
+
+    # Una sola consulta: carrito + líneas + subtotales + totales (ventana)
+    rows = session.execute(
+        select(
+            Carrito.id,
+            Carrito.usuario_id,
+            Libro.id.label("libro_id"),
+            Libro.titulo,
+            Libro.precio,
+            CarritoLibroLink.cantidad,
+            subtotal,
+            func.coalesce(func.sum(CarritoLibroLink.cantidad).over(), 0).label("total_items"),
+            func.coalesce(func.sum(Libro.precio * CarritoLibroLink.cantidad).over(), 0).label("total"),
+        )
+        .select_from(Carrito)
+        .outerjoin(CarritoLibroLink, CarritoLibroLink.carrito_id == Carrito.id)
+        .outerjoin(Libro, Libro.id == CarritoLibroLink.libro_id)
+        .where(Carrito.id == carrito_id)
+        .order_by(Libro.titulo)
+    ).all()
+
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrito no encontrado")
+
+    first = rows[0]
+    return CarritoDetalle(
+        id=first.id,
+        usuario_id=first.usuario_id,
+        items=[
+            CarritoItemRead(
+                libro_id=row.libro_id, titulo=row.titulo, precio=row.precio,
+                cantidad=row.cantidad, subtotal=row.subtotal
+            )
+            for row in rows if row.libro_id is not None
+        ],
+        total_items=first.total_items,
+        total=round(first.total, 2)
+    )
 
 '''
 ACTUALIZAR POR ID'''
 @router.patch("/{carrito_id}", response_model=CarritoRead)
 def update_carrito(*, session: Session = Depends(get_session), carrito_id: int, carrito_update: CarritoUpdate):
-    db_carrito = session.get(Carrito, carrito_id)
+    db_carrito = session.get(Carrito, carrito_id, options=[selectinload(Carrito.libros)])
     
     if not db_carrito:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrito no encontrado")
     
-    if carrito_update.libros_id is not None:
+    if carrito_update.libros_ids is not None:
         libros_nuevos = []
         if carrito_update.libros_ids:
             libros_nuevos = session.exec(
@@ -85,6 +127,55 @@ def update_carrito(*, session: Session = Depends(get_session), carrito_id: int,
     return db_carrito
 
 
+'''
+LÍNEAS DEL CARRITO (operaciones O(1))
+'''
+def upsert_item(session: Session, carrito_id: int, libro_id: int, cantidad: int, incremental: bool) -> CarritoItem:
+    statement = upsert_insert(session, CarritoLibroLink).values(carrito_id=carrito_id, libro_id=libro_id, cantidad=cantidad)
+    nueva_cantidad = (
+        CarritoLibroLink.cantidad + statement.excluded.cantidad if incremental else statement.excluded.cantidad
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["carrito_id", "libro_id"],
+        set_={"cantidad": nueva_cantidad}
+    ).returning(CarritoLibroLink.cantidad)
+
+    # Las llaves foráneas validan carrito y libro sin consultas previas
+    try:
+        cantidad_final = session.execute(statement).scalar_one()
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrito o libro no encontrado")
+
+    return CarritoItem(carrito_id=carrito_id, libro_id=libro_id, cantidad=cantidad_final)
+
+
+@router.post("/{carrito_id}/items", response_model=CarritoItem)
+def add_carrito_item(*, session: Session = Depends(get_session), carrito_id: int, item: CarritoItemCreate):
+    # Si el libro ya está en el carrito, suma la cantidad
+    return upsert_item(session, carrito_id, item.libro_id, item.cantidad, incremental=True)
+
+
+@router.put("/{carrito_id}/items/{libro_id}", response_model=CarritoItem)
+def set_carrito_item(*, session: Session = Depends(get_session), carrito_id: int, libro_id: int, item: CarritoItemUpdate):
+    return upsert_item(session, carrito_id, libro_id, item.cantidad, incremental=False)
+
+
+@router.delete("/{carrito_id}/items/{libro_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_carrito_item(*, session: Session = Depends(get_session), carrito_id: int, libro_id: int):
+    result = session.execute(
+        delete(CarritoLibroLink).where(
+            CarritoLibroLink.carrito_id == carrito_id,
+            CarritoLibroLink.libro_id == libro_id
+        )
+    )
+    session.commit()
+
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El libro no está en el carrito")
+
+
 '''
 ELIMINAR POR ID
 '''
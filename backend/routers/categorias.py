@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel import Session, select
 from typing import List
-from db import get_session
+import config
+from db import get_read_session, get_session
+from dependencias import require_admin
+from cache import catalog_cache, dump_json
+from eventos import catalog_hub, categoria_evento
+from serializacion import categoria_dicts, dumps
+from versiones import conditional_json
 from models import Categoria, CategoriaCreate, CategoriaRead, CategoriaUpdate
 
 
@@ -16,7 +22,7 @@ router = APIRouter(
 '''
 CREATE
 '''
-@router.post("/", response_model=CategoriaRead, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=CategoriaRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin)])
 def create_categoria(*, session: Session = Depends(get_session), categoria: CategoriaCreate):
     # Check if categoria with same name already exists
     existing = session.exec(select(Categoria).where(Categoria.nombre == categoria.nombre)).first()
@@ -30,6 +36,8 @@ def create_categoria(*, session: Session = Depends(get_session), categoria: Cate
     session.add(db_categoria)
     session.commit()
     session.refresh(db_categoria)
+    catalog_cache.invalidate("categorias")
+    catalog_hub.publish(categoria_evento(db_categoria.id, "creado"))
     return db_categoria
 
 
@@ -37,26 +45,36 @@ def create_categoria(*, session: Session = Depends(get_session), categoria: Cate
 LEER TODAS
 '''
 @router.get("/", response_model=List[CategoriaRead])
-def read_categorias(*, session: Session = Depends(get_session)):
-    categorias = session.exec(select(Categoria)).all()
-    return categorias
+def read_categorias(*, request: Request, session: Session = Depends(get_read_session)):
+    def build():
+        if config.CATALOG_FAST_JSON:
+            rows = session.execute(select(Categoria.nombre, Categoria.id))
+            return dumps(categoria_dicts(rows)), ("categorias",)
+
+        categorias = session.exec(select(Categoria)).all()
+        return dump_json(List[CategoriaRead], categorias), ("categorias",)
+
+    return conditional_json(request, session, ("categoria",), build)
 
 
 '''
 LEER POR ID
 '''
 @router.get("/{categoria_id}", response_model=CategoriaRead)
-def read_categoria(*, session: Session = Depends(get_session), categoria_id: int):
-    categoria = session.get(Categoria, categoria_id)
-    if not categoria:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
-    return categoria
+def read_categoria(*, request: Request, session: Session = Depends(get_read_session), categoria_id: int):
+    def build():
+        categoria = session.get(Categoria, categoria_id)
+        if not categoria:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+        return dump_json(CategoriaRead, categoria), (f"categoria:{categoria_id}",)
+
+    return conditional_json(request, session, ("categoria",), build)
 
 
 '''
 ACTUALIZAR POR ID
 '''
-@router.put("/{categoria_id}", response_model=CategoriaRead)
+@router.put("/{categoria_id}", response_model=CategoriaRead, dependencies=[Depends(require_admin)])
 def update_categoria(*, session: Session = Depends(get_session), categoria_id: int, categoria: CategoriaUpdate):
     db_categoria = session.get(Categoria, categoria_id)
     if not db_categoria:
@@ -83,13 +101,15 @@ def update_categoria(*, session: Session = Depends(get_session), categoria_id: i
     session.add(db_categoria)
     session.commit()
     session.refresh(db_categoria)
+    catalog_cache.invalidate("categorias", f"categoria:{categoria_id}")
+    catalog_hub.publish(categoria_evento(categoria_id, "actualizado"))
     return db_categoria
 
 
 '''
 ELIMINAR POR ID
 '''
-@router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
 def delete_categoria(*, session: Session = Depends(get_session), categoria_id: int):
     categoria = session.get(Categoria, categoria_id)
     
@@ -105,4 +125,6 @@ def delete_categoria(*, session: Session = Depends(get_session), categoria_id: i
     
     session.delete(categoria)
     session.commit()
+    catalog_cache.invalidate("categorias", f"categoria:{categoria_id}")
+    catalog_hub.publish(categoria_evento(categoria_id, "eliminado"))
     return {"ok": True}
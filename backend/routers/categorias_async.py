@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List
+import config
+from db import get_async_session
+from cache import dump_json
+from models import Categoria, CategoriaRead
+from serializacion import categoria_dicts, dumps
+from versiones import conditional_json_async
+
+
+'''
+ROUTER (lecturas async de categorías)
+'''
+router = APIRouter(
+    prefix="/categorias",
+    tags=["Categorias"]
+)
+
+'''
+LEER TODAS
+'''
+@router.get("/", response_model=List[CategoriaRead])
+async def read_categorias(*, request: Request, session: AsyncSession = Depends(get_async_session)):
+    async def build():
+        if config.CATALOG_FAST_JSON:
+            rows = await session.execute(select(Categoria.nombre, Categoria.id))
+            return dumps(categoria_dicts(rows)), ("categorias",)
+
+        categorias = (await session.exec(select(Categoria))).all()
+        return dump_json(List[CategoriaRead], categorias), ("categorias",)
+
+    return await conditional_json_async(request, session, ("categoria",), build)
+
+
+'''
+LEER POR ID
+'''
+@router.get("/{categoria_id}", response_model=CategoriaRead)
+async def read_categoria(*, request: Request, session: AsyncSession = Depends(get_async_session), categoria_id: int):
+    async def build():
+        categoria = await session.get(Categoria, categoria_id)
+        if not categoria:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+        return dump_json(CategoriaRead, categoria), (f"categoria:{categoria_id}",)
+
+    return await conditional_json_async(request, session, ("categoria",), build)
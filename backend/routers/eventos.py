@@ -0,0 +1,31 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from eventos import catalog_hub
+
+
+'''
+ROUTER
+'''
+router = APIRouter(
+    tags=["Eventos"]
+)
+
+'''
+CAMBIOS DEL CATÁLOGO EN VIVO
+'''
+# Cada mensaje es un arreglo JSON de eventos ya combinados, por ejemplo
+# [{"tipo": "libro", "id": 7, "accion": "actualizado",
+#   "campos": ["cantidad_disponible"], "cantidad_disponible": 3}]
+# Con {"tipo": "resync"} el cliente se atrasó y debe volver a pedir la lista.
+@router.websocket("/ws/catalogo")
+async def catalogo_ws(websocket: WebSocket):
+    await websocket.accept()
+    suscriptor = catalog_hub.subscribe()
+    try:
+        # Solo se envía: el cierre del cliente se detecta al fallar un envío
+        # (los pings periódicos lo garantizan aunque no haya cambios)
+        while True:
+            await websocket.send_text(await suscriptor.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        catalog_hub.unsubscribe(suscriptor)
@@ -1,8 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import anyio
+import base64
+import codecs
+import json
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, literal_column, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import Session, select
-from typing import List, Optional
-from db import get_session
-from models import Libro, LibroCreate, LibroRead, LibroUpdate
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import config
+from db import engine, get_read_session, get_session, read_engine
+from dependencias import require_admin
+from busqueda import search_libro_ids
+from cache import catalog_cache, dump_json
+from eventos import catalog_hub, libro_evento
+from importacion import EXPORT_MEDIA_TYPES, IMPORT_BATCH_SIZE, formato_from_content_type, import_libros, iter_export
+from recomendaciones import build_recomendador
+from tareas import enqueue_now
+from serializacion import (
+    dumps, libro_batch_json, libro_dicts, libro_page_json, libro_read_dicts, libro_rows_query, libros_tags
+)
+from versiones import conditional_headers, conditional_json
+from models import (
+    Libro, LibroBatch, LibroBatchRequest, LibroCreate, LibroFiltros, LibroOrden, LibroPage, LibroRead,
+    LibroRelacionados, LibroUpdate, VentaLibroLink, VentaLibroResumen
+)
 
 
 '''
@@ -13,75 +39,501 @@ router = APIRouter(
     tags=["Libros"]
 )
 
+recomendador = build_recomendador(read_engine)
+
 '''
 CREATE
 '''
-@router.post("/", response_model=LibroRead, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=LibroRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin)])
 def create_libro(*, session: Session = Depends(get_session), libro: LibroCreate):
     db_libro = Libro.model_validate(libro)
     session.add(db_libro)
     session.commit()
     session.refresh(db_libro)
+    catalog_cache.invalidate("libros")
+    catalog_hub.publish(libro_evento(db_libro.id, "creado", cantidad_disponible=db_libro.cantidad_disponible))
     return db_libro
 
 
+'''
+FILTROS (query params)
+'''
+def libro_filtros(
+    categoria_id: Optional[int] = None,
+    precio_min: Optional[float] = Query(default=None, ge=0),
+    precio_max: Optional[float] = Query(default=None, ge=0),
+    idioma: Optional[str] = Query(default=None, max_length=100),
+    autor: Optional[str] = Query(default=None, max_length=100),
+    editorial: Optional[str] = Query(default=None, max_length=100),
+    anio_min: Optional[int] = None,
+    anio_max: Optional[int] = None,
+    en_stock: bool = False,
+    orden: LibroOrden = "id"
+) -> LibroFiltros:
+    return LibroFiltros(
+        categoria_id=categoria_id, precio_min=precio_min, precio_max=precio_max, idioma=idioma,
+        autor=autor, editorial=editorial, anio_min=anio_min, anio_max=anio_max,
+        en_stock=en_stock, orden=orden
+    )
+
+
 '''
 LEER TODOS
 '''
 @router.get("/", response_model=List[LibroRead])
 def read_libros(
     *, 
-    session: Session = Depends(get_session), 
+    request: Request,
+    session: Session = Depends(get_read_session), 
     offset: int = 0, 
     limit: int = 100,
-    categoria_id: Optional[int] = None
+    filtros: LibroFiltros = Depends(libro_filtros)
 ):
-    query = select(Libro)
-    
-    # Aplicar filtro de categoría si se proporciona
-    if categoria_id:
-        query = query.where(Libro.categoria_id == categoria_id)
-    
-    # Aplicar offset y limit
-    query = query.offset(offset).limit(limit)
-    
-    libros = session.exec(query).all()
-    return libros
+    def build():
+        # Filtros, orden y después offset y limit
+        query = order_libros(apply_filtros(select(Libro), filtros), filtros.orden)
+        query = query.offset(offset).limit(limit)
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(session.execute(libro_rows_query(query)))
+            return dumps(libros), libros_tags(libros)
+
+        # selectinload: una sola consulta extra para todas las categorías de la página
+        libros = session.exec(query.options(selectinload(Libro.categoria))).all()
+
+        # La lista embebe las categorías, así que también depende de ellas
+        tags = {"libros"} | {f"categoria:{libro.categoria_id}" for libro in libros}
+        return dump_json(List[LibroRead], libros), tags
+
+    return conditional_json(request, session, ("libro", "categoria"), build)
+
+
+'''
+FILTROS Y ORDEN
+'''
+# orden -> (columna, descendente). Cada columna tiene su índice propio, uno
+# compuesto con categoria_id y uno parcial para en_stock
+ORDENES = {
+    "id": (Libro.id, False),
+    "precio": (Libro.precio, False),
+    "-precio": (Libro.precio, True),
+    "fecha_publicacion": (Libro.fecha_publicacion, False),
+    "-fecha_publicacion": (Libro.fecha_publicacion, True),
+    "titulo": (Libro.titulo, False),
+    "-titulo": (Libro.titulo, True),
+}
+
+class selectivo(FunctionElement):
+    # Marca un rango como selectivo para el planner de SQLite (likelihood);
+    # en otros motores se compila como la condición tal cual
+    type = Boolean()
+    name = "selectivo"
+    inherit_cache = True
+    _is_implicitly_boolean = True  # sin "= 1" en motores sin booleano nativo
+
+@compiles(selectivo)
+def _compile_selectivo(element, compiler, **kw):
+    return compiler.process(element.clauses.clauses[0], **kw)
+
+@compiles(selectivo, "sqlite")
+def _compile_selectivo_sqlite(element, compiler, **kw):
+    return f"likelihood({compiler.process(element.clauses.clauses[0], **kw)}, 0.05)"
+
+
+def apply_filtros(query, filtros: LibroFiltros):
+    # Sin filtros de igualdad, SQLite preferiría recorrer completo el índice
+    # del orden (o la tabla por rowid) para no ordenar; marcar como selectivo
+    # un rango sobre otra columna lo lleva a buscar en el índice del rango
+    igualdad = filtros.categoria_id or filtros.idioma or filtros.autor or filtros.editorial
+    columna_orden = ORDENES[filtros.orden][0]
+
+    def rango(columna, condicion):
+        return selectivo(condicion) if columna is not columna_orden and not igualdad else condicion
+
+    if filtros.categoria_id:
+        query = query.where(Libro.categoria_id == filtros.categoria_id)
+    if filtros.precio_min is not None:
+        query = query.where(rango(Libro.precio, Libro.precio >= filtros.precio_min))
+    if filtros.precio_max is not None:
+        query = query.where(rango(Libro.precio, Libro.precio <= filtros.precio_max))
+    if filtros.idioma:
+        query = query.where(Libro.idioma == filtros.idioma)
+    if filtros.autor:
+        query = query.where(Libro.autor == filtros.autor)
+    if filtros.editorial:
+        query = query.where(Libro.editorial == filtros.editorial)
+    if filtros.anio_min is not None:
+        query = query.where(rango(Libro.fecha_publicacion, Libro.fecha_publicacion >= filtros.anio_min))
+    if filtros.anio_max is not None:
+        query = query.where(rango(Libro.fecha_publicacion, Libro.fecha_publicacion <= filtros.anio_max))
+    if filtros.en_stock:
+        # Literal (no parámetro) para que coincida con el índice parcial ix_libro_en_stock
+        query = query.where(Libro.cantidad_disponible > literal_column("0"))
+    return query
+
+def order_libros(query, orden: str):
+    # El id desempata: el orden es total y el keyset no salta ni repite filas
+    columna, descendente = ORDENES[orden]
+    if columna is Libro.id:
+        return query.order_by(Libro.id.desc() if descendente else Libro.id)
+    if descendente:
+        return query.order_by(columna.desc(), Libro.id.desc())
+    return query.order_by(columna, Libro.id)
+
+
+'''
+CURSOR OPACO
+'''
+# Entero más grande que acepta el driver (INTEGER de 64 bits); uno mayor
+# revienta con OverflowError al enlazar el parámetro
+SQL_INT_MAX = 2 ** 63 - 1
+
+def encode_cursor(last_id: int, orden: str = "id", valor: Any = None) -> str:
+    # Para otros órdenes el cursor también guarda el valor de la última fila
+    data = {"id": last_id} if orden == "id" else {"id": last_id, "o": orden, "v": valor}
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, orden: str = "id") -> Tuple[int, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = int(data["id"])
+    except (ValueError, KeyError, TypeError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    if not -SQL_INT_MAX <= last_id <= SQL_INT_MAX:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+    if data.get("o", "id") != orden:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El cursor es de otro orden")
+    valor = data.get("v")
+    if orden != "id" and not valid_cursor_value(valor, orden):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    return last_id, valor
+
+def valid_cursor_value(valor: Any, orden: str) -> bool:
+    # El valor va directo a la comparación por tupla: debe ser del tipo de la
+    # columna del orden y caber en ella (bool es int en Python, pero no vale)
+    campo = orden.lstrip("-")
+    if campo == "titulo":
+        return isinstance(valor, str)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return False
+    if isinstance(valor, int):
+        return -SQL_INT_MAX <= valor <= SQL_INT_MAX
+    return campo == "precio" and math.isfinite(valor)
+
+def page_cursor(ultimo: Any, orden: str) -> str:
+    # ultimo es un Libro o, en el camino rápido, un dict con sus columnas
+    campo = orden.lstrip("-")
+    if isinstance(ultimo, dict):
+        return encode_cursor(ultimo["id"], orden, ultimo[campo])
+    return encode_cursor(ultimo.id, orden, getattr(ultimo, campo))
+
+def libros_page_query(cursor: Optional[str], limit: int, filtros: Optional[LibroFiltros] = None):
+    # Keyset: WHERE (columna, id) > (ultimo_valor, ultimo_id) sigue el índice
+    # del orden, así que el costo no depende de qué tan profunda sea la página
+    filtros = filtros or LibroFiltros()
+    query = order_libros(apply_filtros(select(Libro), filtros), filtros.orden)
+
+    if cursor:
+        last_id, valor = decode_cursor(cursor, filtros.orden)
+        columna, descendente = ORDENES[filtros.orden]
+        if columna is Libro.id:
+            query = query.where(Libro.id < last_id if descendente else Libro.id > last_id)
+        elif descendente:
+            query = query.where(tuple_(columna, Libro.id) < tuple_(valor, last_id))
+        else:
+            query = query.where(tuple_(columna, Libro.id) > tuple_(valor, last_id))
+
+    return query.limit(limit)
+
+
+'''
+LEER POR CURSOR (KEYSET)
+'''
+@router.get("/pagina", response_model=LibroPage)
+def read_libros_pagina(
+    *,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    filtros: LibroFiltros = Depends(libro_filtros)
+):
+    def build():
+        # Se pide un registro extra para saber si existe una página siguiente
+        query = libros_page_query(cursor, limit + 1, filtros)
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(session.execute(libro_rows_query(query)))
+            next_cursor = page_cursor(libros[limit - 1], filtros.orden) if len(libros) > limit else None
+            libros = libros[:limit]
+            return libro_page_json(libros, next_cursor), libros_tags(libros)
+
+        libros = session.exec(query.options(selectinload(Libro.categoria))).all()
+
+        next_cursor = None
+        if len(libros) > limit:
+            libros = libros[:limit]
+            next_cursor = page_cursor(libros[-1], filtros.orden)
+
+        tags = {"libros"} | {f"categoria:{libro.categoria_id}" for libro in libros}
+        return dump_json(LibroPage, LibroPage(items=libros, next_cursor=next_cursor)), tags
+
+    return conditional_json(request, session, ("libro", "categoria"), build)
+
+
+'''
+EXPORTAR CATÁLOGO (NDJSON / CSV)
+'''
+@router.get("/export")
+def export_libros(
+    *,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    categoria_id: Optional[int] = None,
+    formato: str = Query(default="ndjson", pattern="^(ndjson|csv)$")
+):
+    headers, not_modified = conditional_headers(request, session, ("libro", "categoria"))
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return StreamingResponse(
+        iter_export(read_engine, categoria_id, formato),
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers=headers
+    )
+
+
+'''
+IMPORTACIÓN MASIVA (NDJSON / CSV)
+'''
+@router.post("/bulk", dependencies=[Depends(require_admin)])
+async def bulk_import_libros(
+    *,
+    request: Request,
+    lote: int = Query(default=IMPORT_BATCH_SIZE, ge=1, le=10000)
+):
+    formato = formato_from_content_type(request.headers.get("content-type"))
+    stream = request.stream().__aiter__()
+
+    def lines() -> Iterator[str]:
+        # Puente del body async a un iterador sync: el pipeline corre en el
+        # threadpool y va pidiendo trozos del body conforme los necesita
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        while True:
+            try:
+                chunk = anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                break
+            pending += decoder.decode(chunk)
+            *completas, pending = pending.split("\n")
+            for line in completas:
+                yield line + "\n"
+        if pending:
+            yield pending
+
+    report = await run_in_threadpool(import_libros, engine, lines(), formato, lote)
+    if report["insertados"]:
+        catalog_cache.invalidate("libros")
+        catalog_hub.publish({"tipo": "libros", "accion": "importados", "insertados": report["insertados"]})
+        # Compactar el índice de búsqueda fuera del request; varias
+        # importaciones seguidas dejan una sola tarea pendiente
+        await run_in_threadpool(enqueue_now, engine, "reindexar_busqueda", llave="reindexar_busqueda")
+    return report
+
+
+'''
+BÚSQUEDA DE TEXTO COMPLETO
+'''
+@router.get("/search", response_model=List[LibroRead])
+def search_libros(
+    *,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    q: str = Query(min_length=1, max_length=200),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    def build():
+        ids = search_libro_ids(session, q, limit, offset)
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(session.execute(libro_rows_query(select(Libro).where(Libro.id.in_(ids))))) if ids else []
+            por_id = {libro["id"]: libro for libro in libros}
+            return dumps([por_id[libro_id] for libro_id in ids if libro_id in por_id]), ("libros",)
+
+        libros = session.exec(
+            select(Libro).where(Libro.id.in_(ids)).options(selectinload(Libro.categoria))
+        ).all() if ids else []
+
+        # Conservar el orden por relevancia (bm25) que devolvió el índice
+        por_id = {libro.id: libro for libro in libros}
+        ordenados = [por_id[libro_id] for libro_id in ids if libro_id in por_id]
+        return dump_json(List[LibroRead], ordenados), ("libros",)
+
+    return conditional_json(request, session, ("libro", "categoria"), build)
+
+
+'''
+LEER VARIOS POR ID (BATCH)
+'''
+BATCH_CAMPOS = list(LibroRead.model_fields)
+
+def batch_ids(ids: Iterable[int]) -> List[int]:
+    # Sin repetidos, en el orden en que se pidieron
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > config.LIBROS_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {config.LIBROS_BATCH_MAX} ids por consulta"
+        )
+    fuera_de_rango = [libro_id for libro_id in ids if not 0 < libro_id <= SQL_INT_MAX]
+    if fuera_de_rango:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ids fuera de rango: {', '.join(map(str, fuera_de_rango[:10]))}"
+        )
+    return ids
+
+def parse_batch_ids(ids: str) -> List[int]:
+    # Para el GET (?ids=1,2,3), compartido con el router async
+    partes = ids.split(",")
+    # Más de 19 dígitos ya no cabe en 64 bits (y así int() no parsea miles)
+    largos = [parte for parte in partes if len(parte) > 19]
+    if largos:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Ids fuera de rango: {largos[0][:30]}")
+    return batch_ids(int(libro_id) for libro_id in partes)
+
+def batch_campos(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    # El id siempre va, para que el cliente pueda ubicar cada item
+    if not fields:
+        return None
+    pedidos = set(fields) | {"id"}
+    desconocidos = pedidos - set(BATCH_CAMPOS)
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconocidos: {', '.join(sorted(desconocidos))}"
+        )
+    return [campo for campo in BATCH_CAMPOS if campo in pedidos]
+
+def libros_batch_query(ids: List[int]):
+    return select(Libro).where(Libro.id.in_(ids))
+
+def read_batch(session: Session, ids: List[int], campos: Optional[List[str]]) -> Tuple[bytes, set]:
+    # Un solo query con IN para todos los ids
+    query = libros_batch_query(ids)
+    if config.CATALOG_FAST_JSON:
+        libros = libro_dicts(session.execute(libro_rows_query(query)))
+    else:
+        # joinedload: la categoría llega en el mismo query, no en uno aparte
+        libros = libro_read_dicts(session.exec(query.options(joinedload(Libro.categoria))).all())
+    return libro_batch_json(libros, ids, campos)
+
+
+@router.get("/batch", response_model=LibroBatch)
+def read_libros_batch(
+    *,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    ids: str = Query(pattern="^[0-9]+(,[0-9]+)*$", description="Ids separados por coma"),
+    fields: Optional[str] = Query(default=None, pattern="^[a-z_]+(,[a-z_]+)*$")
+):
+    libro_ids = parse_batch_ids(ids)
+    campos = batch_campos(fields.split(",") if fields else None)
+    return conditional_json(request, session, ("libro", "categoria"), lambda: read_batch(session, libro_ids, campos))
+
+
+@router.post("/batch", response_model=LibroBatch)
+def read_libros_batch_post(*, session: Session = Depends(get_read_session), peticion: LibroBatchRequest):
+    # Para sets que no caben en la URL; sin ETag ni caché porque es un POST
+    body, _ = read_batch(session, batch_ids(peticion.ids), batch_campos(peticion.fields))
+    return Response(content=body, media_type="application/json")
 
 
 '''
 LEER POR ID
 '''
 @router.get("/{libro_id}", response_model=LibroRead)
-def read_libro(*, session: Session = Depends(get_session), libro_id: int):
-    libro = session.get(Libro, libro_id)
-    if not libro:
+def read_libro(*, request: Request, session: Session = Depends(get_read_session), libro_id: int):
+    def build():
+        libro = session.get(Libro, libro_id, options=[joinedload(Libro.categoria)])
+        if not libro:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
+        return dump_json(LibroRead, libro), (f"libro:{libro_id}", f"categoria:{libro.categoria_id}")
+
+    return conditional_json(request, session, ("libro", "categoria"), build)
+
+
+'''
+RELACIONADOS ("TAMBIÉN COMPRARON")
+'''
+@router.get("/{libro_id}/relacionados", response_model=LibroRelacionados)
+def read_relacionados(
+    *,
+    session: Session = Depends(get_read_session),
+    libro_id: int,
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    # El top-k sale de la matriz en memoria; la base solo se usa para traer
+    # los libros por llave primaria (y la categoría si el libro es nuevo)
+    ids = recomendador.relacionados(libro_id, limit)
+    por_compras = len(ids)
+
+    if len(ids) < limit:
+        categoria_id = recomendador.categoria_de(libro_id)
+        if categoria_id is None:
+            libro = session.get(Libro, libro_id)
+            if not libro:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
+            categoria_id = libro.categoria_id
+        ids += recomendador.mas_vendidos(categoria_id, limit - len(ids), excluir=[libro_id, *ids])
+
+    libros = session.exec(
+        select(Libro).where(Libro.id.in_([libro_id, *ids])).options(selectinload(Libro.categoria))
+    ).all()
+    por_id = {libro.id: libro for libro in libros}
+    if libro_id not in por_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
-    return libro
+
+    # Un libro borrado después de construir la matriz simplemente no aparece
+    items = [por_id[otro] for otro in ids if otro in por_id]
+    return LibroRelacionados(
+        libro_id=libro_id,
+        items=items,
+        por_compras=sum(1 for otro in ids[:por_compras] if otro in por_id),
+        por_categoria=sum(1 for otro in ids[por_compras:] if otro in por_id),
+    )
 
 
 '''
 ACTUALIZAR POR ID
 '''
-@router.patch("/{libro_id}", response_model=LibroRead)
+@router.patch("/{libro_id}", response_model=LibroRead, dependencies=[Depends(require_admin)])
 def update_libro(*, session: Session = Depends(get_session), libro_id: int, libro: LibroUpdate):
     db_libro = session.get(Libro, libro_id)
     if not db_libro:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
     
     libro_data = libro.model_dump(exclude_unset=True) # Solo campos que se enviaron en el request
-    db_libro.model_validate(db_libro.model_dump() | libro_data) # Actualiza el modelo de la DB
+    cambiados = [key for key, value in libro_data.items() if getattr(db_libro, key) != value]
+    db_libro.sqlmodel_update(libro_data) # Actualiza el modelo de la DB
 
     session.add(db_libro)
     session.commit()
     session.refresh(db_libro)
+    catalog_cache.invalidate("libros", f"libro:{libro_id}")
+    catalog_hub.publish(libro_evento(libro_id, "actualizado", cambiados, db_libro.cantidad_disponible))
     return db_libro
 
 
 '''
 ACTUALIZAR COMPLETO POR ID (PUT)
 '''
-@router.put("/{libro_id}", response_model=LibroRead)
+@router.put("/{libro_id}", response_model=LibroRead, dependencies=[Depends(require_admin)])
 def update_libro_completo(*, 
                           session: Session = Depends(get_session), 
                           libro_id: int, 
@@ -93,6 +545,7 @@ def update_libro_completo(*,
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
     
     nuevos_datos = libro_nuevo.model_dump()
+    cambiados = [key for key, value in nuevos_datos.items() if getattr(db_libro, key) != value]
     
     for key, value in nuevos_datos.items():
         setattr(db_libro, key, value)
@@ -100,19 +553,33 @@ def update_libro_completo(*,
     session.add(db_libro)
     session.commit()
     session.refresh(db_libro)
+    catalog_cache.invalidate("libros", f"libro:{libro_id}")
+    catalog_hub.publish(libro_evento(libro_id, "actualizado", cambiados, db_libro.cantidad_disponible))
     
     return db_libro
 
 '''
 ELIMINAR PRO ID
 '''
-@router.delete("/{libro_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{libro_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
 def delete_libro(*, session: Session = Depends(get_session), libro_id: int):
     libro = session.get(Libro, libro_id)
     
     if not libro:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
-    
+
+    # Un libro vendido es parte del historial: borrarlo se llevaría las líneas
+    # de sus ventas (el total de la venta quedaría sin detalle) y su fila en
+    # los agregados. El resumen se busca por llave primaria; las líneas cubren
+    # ventas que aún no pasaron por el backfill
+    vendido = session.get(VentaLibroResumen, libro_id) is not None or session.exec(
+        select(VentaLibroLink.venta_id).where(VentaLibroLink.libro_id == libro_id).limit(1)
+    ).first() is not None
+    if vendido:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El libro tiene ventas y no se puede eliminar")
+
     session.delete(libro)
     session.commit()
+    catalog_cache.invalidate("libros", f"libro:{libro_id}")
+    catalog_hub.publish(libro_evento(libro_id, "eliminado"))
     return {"ok": True}
\ No newline at end of file
@@ -0,0 +1,199 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterator, List, Optional
+import config
+from db import async_engine, get_async_session
+from busqueda import search_statement
+from cache import dump_json
+from models import Libro, LibroBatch, LibroFiltros, LibroPage, LibroRead
+from importacion import EXPORT_MEDIA_TYPES, export_lines, libros_export_query
+from routers.libros import (
+    apply_filtros, batch_campos, libro_filtros, libros_batch_query, libros_page_query, order_libros, page_cursor,
+    parse_batch_ids
+)
+from serializacion import (
+    dumps, libro_batch_json, libro_dicts, libro_page_json, libro_read_dicts, libro_rows_query, libros_tags
+)
+from versiones import conditional_headers_async, conditional_json_async
+
+
+'''
+ROUTER (lecturas async del catálogo)
+'''
+# Se incluye antes que routers.libros cuando ASYNC_DB está habilitado, así
+# que atiende los GET y deja pasar las escrituras al router sync
+router = APIRouter(
+    prefix="/libros",
+    tags=["Libros"]
+)
+
+'''
+LEER TODOS
+'''
+@router.get("/", response_model=List[LibroRead])
+async def read_libros(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    offset: int = 0,
+    limit: int = 100,
+    filtros: LibroFiltros = Depends(libro_filtros)
+):
+    async def build():
+        query = order_libros(apply_filtros(select(Libro), filtros), filtros.orden)
+        query = query.offset(offset).limit(limit)
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(await session.execute(libro_rows_query(query)))
+            return dumps(libros), libros_tags(libros)
+
+        libros = (await session.exec(query.options(selectinload(Libro.categoria)))).all()
+        tags = {"libros"} | {f"categoria:{libro.categoria_id}" for libro in libros}
+        return dump_json(List[LibroRead], libros), tags
+
+    return await conditional_json_async(request, session, ("libro", "categoria"), build)
+
+
+'''
+LEER POR CURSOR (KEYSET)
+'''
+@router.get("/pagina", response_model=LibroPage)
+async def read_libros_pagina(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    filtros: LibroFiltros = Depends(libro_filtros)
+):
+    async def build():
+        query = libros_page_query(cursor, limit + 1, filtros)
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(await session.execute(libro_rows_query(query)))
+            next_cursor = page_cursor(libros[limit - 1], filtros.orden) if len(libros) > limit else None
+            libros = libros[:limit]
+            return libro_page_json(libros, next_cursor), libros_tags(libros)
+
+        libros = (await session.exec(query.options(selectinload(Libro.categoria)))).all()
+
+        next_cursor = None
+        if len(libros) > limit:
+            libros = libros[:limit]
+            next_cursor = page_cursor(libros[-1], filtros.orden)
+
+        tags = {"libros"} | {f"categoria:{libro.categoria_id}" for libro in libros}
+        return dump_json(LibroPage, LibroPage(items=libros, next_cursor=next_cursor)), tags
+
+    return await conditional_json_async(request, session, ("libro", "categoria"), build)
+
+
+'''
+EXPORTAR CATÁLOGO (NDJSON / CSV)
+'''
+async def iter_export(categoria_id: Optional[int] = None, formato: str = "ndjson") -> AsyncIterator[bytes]:
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream_scalars(libros_export_query(categoria_id))
+        first = True
+        async for partition in result.partitions():
+            yield export_lines(partition, formato, first)
+            first = False
+            # Soltar las filas ya enviadas para que el identity map no crezca
+            for libro in partition:
+                session.expunge(libro)
+
+        if first and formato == "csv":
+            yield export_lines([], formato, True)
+
+@router.get("/export")
+async def export_libros(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    categoria_id: Optional[int] = None,
+    formato: str = Query(default="ndjson", pattern="^(ndjson|csv)$")
+):
+    headers, not_modified = await conditional_headers_async(request, session, ("libro", "categoria"))
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return StreamingResponse(
+        iter_export(categoria_id, formato),
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers=headers
+    )
+
+
+'''
+BÚSQUEDA DE TEXTO COMPLETO
+'''
+@router.get("/search", response_model=List[LibroRead])
+async def search_libros(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    q: str = Query(min_length=1, max_length=200),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    async def build():
+        statement = search_statement(q, limit, offset, async_engine.dialect.name)
+        ids = [row[0] for row in await session.execute(statement)] if statement is not None else []
+
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(await session.execute(libro_rows_query(select(Libro).where(Libro.id.in_(ids))))) if ids else []
+            por_id = {libro["id"]: libro for libro in libros}
+            return dumps([por_id[libro_id] for libro_id in ids if libro_id in por_id]), ("libros",)
+
+        libros = (await session.exec(
+            select(Libro).where(Libro.id.in_(ids)).options(selectinload(Libro.categoria))
+        )).all() if ids else []
+
+        por_id = {libro.id: libro for libro in libros}
+        ordenados = [por_id[libro_id] for libro_id in ids if libro_id in por_id]
+        return dump_json(List[LibroRead], ordenados), ("libros",)
+
+    return await conditional_json_async(request, session, ("libro", "categoria"), build)
+
+
+'''
+LEER VARIOS POR ID (BATCH)
+'''
+# Solo el GET: el POST /libros/batch lo sigue atendiendo el router sync
+@router.get("/batch", response_model=LibroBatch)
+async def read_libros_batch(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    ids: str = Query(pattern="^[0-9]+(,[0-9]+)*$", description="Ids separados por coma"),
+    fields: Optional[str] = Query(default=None, pattern="^[a-z_]+(,[a-z_]+)*$")
+):
+    libro_ids = parse_batch_ids(ids)
+    campos = batch_campos(fields.split(",") if fields else None)
+
+    async def build():
+        query = libros_batch_query(libro_ids)
+        if config.CATALOG_FAST_JSON:
+            libros = libro_dicts(await session.execute(libro_rows_query(query)))
+        else:
+            libros = libro_read_dicts((await session.exec(query.options(joinedload(Libro.categoria)))).all())
+        return libro_batch_json(libros, libro_ids, campos)
+
+    return await conditional_json_async(request, session, ("libro", "categoria"), build)
+
+
+'''
+LEER POR ID
+'''
+@router.get("/{libro_id}", response_model=LibroRead)
+async def read_libro(*, request: Request, session: AsyncSession = Depends(get_async_session), libro_id: int):
+    async def build():
+        libro = await session.get(Libro, libro_id, options=[joinedload(Libro.categoria)])
+        if not libro:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Libro no encontrado")
+        return dump_json(LibroRead, libro), (f"libro:{libro_id}", f"categoria:{libro.categoria_id}")
+
+    return await conditional_json_async(request, session, ("libro", "categoria"), build)
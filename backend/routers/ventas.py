@@ -0,0 +1,232 @@
+import json
+import os
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy import case, delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from typing import Dict, Optional
+from db import get_session
+from cache import catalog_cache
+from dependencias import get_current_user
+from estadisticas import record_venta
+from eventos import catalog_hub, libro_evento
+from tareas import FALLIDA, confirmacion_path, enqueue
+from models import (
+    Carrito, CarritoLibroLink, Libro, Tarea, UsuarioToken,
+    Venta, VentaCreate, VentaIdempotencia, VentaLibroLink, VentaLinea, VentaRead
+)
+
+'''
+ROUTER
+'''
+router = APIRouter(
+    prefix="/ventas",
+    tags=["Ventas"]
+)
+
+
+def venta_read(session: Session, venta: Venta) -> VentaRead:
+    lineas = session.exec(
+        select(VentaLibroLink).where(VentaLibroLink.venta_id == venta.id)
+    ).all()
+    return VentaRead(
+        id=venta.id,
+        usuario_id=venta.usuario_id,
+        total=venta.total,
+        fecha=venta.fecha,
+        forma_pago=venta.forma_pago,
+        lineas=[VentaLinea.model_validate(linea, from_attributes=True) for linea in lineas]
+    )
+
+
+def replay_idempotent(session: Session, clave: str, usuario: UsuarioToken) -> Optional[VentaRead]:
+    registro = session.get(VentaIdempotencia, clave)
+    if registro is None:
+        return None
+    if registro.usuario_id != usuario.id:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Llave de idempotencia ya utilizada")
+    return venta_read(session, session.get(Venta, registro.venta_id))
+
+
+def cart_lines(session: Session, carrito_id: int) -> Dict[int, int]:
+    # libro_id -> cantidad pedida
+    return dict(session.exec(
+        select(CarritoLibroLink.libro_id, CarritoLibroLink.cantidad)
+        .where(CarritoLibroLink.carrito_id == carrito_id)
+    ).all())
+
+
+'''
+CHECKOUT
+'''
+@router.post("/", response_model=VentaRead, status_code=status.HTTP_201_CREATED)
+def create_venta(
+    *,
+    session: Session = Depends(get_session),
+    usuario: UsuarioToken = Depends(get_current_user),
+    venta_data: VentaCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
+):
+    # Reintento de una venta que ya se registró: devolver la misma
+    if idempotency_key:
+        previa = replay_idempotent(session, idempotency_key, usuario)
+        if previa:
+            response.status_code = status.HTTP_200_OK
+            return previa
+
+    carrito = session.get(Carrito, venta_data.carrito_id)
+    if not carrito:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrito no encontrado")
+    if carrito.usuario_id != usuario.id and not usuario.es_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="El carrito no pertenece al usuario")
+
+    lineas = cart_lines(session, carrito.id)
+    if not lineas:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El carrito está vacío")
+
+    # Un solo UPDATE condicional para todas las líneas: la base decide de forma
+    # atómica si alcanza el stock, sin leer-modificar-escribir por libro
+    cantidad = case(lineas, value=Libro.id)
+    vendidos = session.execute(
+        update(Libro)
+        .where(Libro.id.in_(lineas.keys()), Libro.cantidad_disponible >= cantidad)
+        .values(cantidad_disponible=Libro.cantidad_disponible - cantidad)
+        .returning(Libro.id, Libro.precio, Libro.categoria_id, Libro.cantidad_disponible)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if len(vendidos) != len(lineas):
+        session.rollback()
+        agotados = sorted(set(lineas) - {libro_id for libro_id, _, _, _ in vendidos})
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Stock insuficiente", "libros_ids": agotados}
+        )
+
+    precios = {libro_id: precio for libro_id, precio, _, _ in vendidos}
+    categorias = {libro_id: categoria_id for libro_id, _, categoria_id, _ in vendidos}
+    venta = Venta(
+        usuario_id=carrito.usuario_id,
+        total=round(sum(precios[libro_id] * n for libro_id, n in lineas.items()), 2),
+        forma_pago=venta_data.forma_pago
+    )
+    session.add(venta)
+    session.flush()
+
+    venta_lineas = [
+        VentaLinea(libro_id=libro_id, cantidad=n, precio_unitario=precios[libro_id])
+        for libro_id, n in lineas.items()
+    ]
+    session.execute(insert(VentaLibroLink), [
+        {"venta_id": venta.id, "categoria_id": categorias[linea.libro_id], **linea.model_dump()}
+        for linea in venta_lineas
+    ])
+    session.execute(delete(CarritoLibroLink).where(CarritoLibroLink.carrito_id == carrito.id))
+
+    # Agregados del dashboard, en la misma transacción
+    record_venta(session, venta.fecha, [
+        (linea.libro_id, categorias[linea.libro_id], linea.cantidad, linea.precio_unitario)
+        for linea in venta_lineas
+    ])
+
+    if idempotency_key:
+        session.add(VentaIdempotencia(clave=idempotency_key, usuario_id=usuario.id, venta_id=venta.id))
+
+    # El documento de confirmación lo arma un worker; la tarea se confirma con la venta
+    enqueue(session, "confirmacion_venta", {"venta_id": venta.id}, llave=f"confirmacion_venta:{venta.id}")
+
+    # La respuesta se arma antes del commit: el commit devuelve la conexión al
+    # pool y el handler ya no vuelve a pedir otra mientras se envía la respuesta
+    resultado = VentaRead(
+        id=venta.id,
+        usuario_id=venta.usuario_id,
+        total=venta.total,
+        fecha=venta.fecha,
+        forma_pago=venta.forma_pago,
+        lineas=venta_lineas
+    )
+
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otra petición con la misma llave ganó la carrera: se deshace esta
+        # (incluido el descuento de stock) y se devuelve la que quedó
+        session.rollback()
+        previa = replay_idempotent(session, idempotency_key, usuario) if idempotency_key else None
+        if previa is None:
+            raise
+        response.status_code = status.HTTP_200_OK
+        return previa
+
+    catalog_cache.invalidate("libros", *(f"libro:{libro_id}" for libro_id in lineas))
+    # Stock nuevo (el que dejó el UPDATE) para las vistas abiertas del catálogo
+    catalog_hub.publish(*(
+        libro_evento(libro_id, "actualizado", ["cantidad_disponible"], disponible)
+        for libro_id, _, _, disponible in vendidos
+    ))
+    return resultado
+
+
+'''
+LEER POR ID
+'''
+@router.get("/{venta_id}", response_model=VentaRead)
+def read_venta(
+    *,
+    session: Session = Depends(get_session),
+    usuario: UsuarioToken = Depends(get_current_user),
+    venta_id: int
+):
+    venta = session.get(Venta, venta_id)
+    if not venta or (venta.usuario_id != usuario.id and not usuario.es_admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venta no encontrada")
+    return venta_read(session, venta)
+
+
+'''
+DOCUMENTO DE CONFIRMACIÓN
+'''
+@router.get("/{venta_id}/confirmacion")
+def read_confirmacion(
+    *,
+    session: Session = Depends(get_session),
+    usuario: UsuarioToken = Depends(get_current_user),
+    venta_id: int
+):
+    venta = session.get(Venta, venta_id)
+    if not venta or (venta.usuario_id != usuario.id and not usuario.es_admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venta no encontrada")
+
+    path = confirmacion_path(venta_id)
+    if os.path.exists(path):
+        return FileResponse(path, media_type="text/html; charset=utf-8")
+
+    # La llave solo la conserva la tarea viva (pendiente o en curso): el
+    # cliente vuelve a pedirlo en un momento
+    llave = f"confirmacion_venta:{venta_id}"
+    if session.exec(select(Tarea.id).where(Tarea.llave == llave)).first() is None:
+        fallida = session.exec(
+            select(Tarea.error)
+            .where(
+                Tarea.estado == FALLIDA, Tarea.tipo == "confirmacion_venta",
+                Tarea.payload == json.dumps({"venta_id": venta_id})
+            )
+            .order_by(Tarea.id.desc())
+        ).first()
+        if fallida is not None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="No se pudo generar la confirmación del pedido"
+            )
+        # Sin tarea (venta anterior a la cola, o hecha y purgada sin el
+        # archivo): se vuelve a encolar en lugar de esperar para siempre
+        enqueue(session, "confirmacion_venta", {"venta_id": venta_id}, llave=llave)
+        session.commit()
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"detail": "La confirmación se está generando"},
+        headers={"Retry-After": "1"},
+    )
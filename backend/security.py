@@ -1,16 +1,118 @@
-from passlib.context import CryptContext
+import asyncio
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from jose import jwk, jwt
+
+import config
 
 # Esquema de hash - usando pbkdf2_sha256 para mejor compatibilidad
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min/max = rounds hace que needs_update marque cualquier hash con otro costo
+@lru_cache(maxsize=1)
+def pwd_context():
+    # Se arma en el primer hash/verify y no al importar: el arranque (y cada
+    # proceso del pool de hashing) no paga passlib hasta que hay un login
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=config.PASSWORD_HASH_ROUNDS,
+        pbkdf2_sha256__min_rounds=config.PASSWORD_HASH_ROUNDS,
+        pbkdf2_sha256__max_rounds=config.PASSWORD_HASH_ROUNDS,
+    )
 
 '''
 Hashear contraseña
 '''
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 '''
 Verificar contraseña
 '''
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context().verify(plain_password, hashed_password)
+
+'''
+Verificar y, si el costo cambió, devolver el hash nuevo
+'''
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+'''
+EJECUTOR DEDICADO
+'''
+# PBKDF2 es CPU puro: correrlo en el threadpool de Starlette deja sin hilos
+# (y sin GIL) a las rutas del catálogo durante un pico de logins
+_executor: Optional[Executor] = None
+_pending: Optional[asyncio.Semaphore] = None
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if config.PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="hash")
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def _run(fn, *args):
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(config.PASSWORD_HASH_MAX_PENDING)
+
+    # La cola queda acotada: los excedentes esperan aquí, no dentro del pool
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run(verify_and_update_password, plain_password, hashed_password)
+
+
+'''
+TOKENS (JWT)
+'''
+ACCESS = "access"
+REFRESH = "refresh"
+
+@lru_cache(maxsize=1)
+def signing_key():
+    # Construir la llave una sola vez; jose la reutiliza sin re-parsearla
+    return jwk.construct(config.JWT_SECRET, config.JWT_ALGORITHM)
+
+def create_token(user_id: int, es_admin: bool, token_type: str, ttl_seconds: int) -> Tuple[str, Dict[str, Any]]:
+    now = int(time.time())
+    claims = {
+        "sub": str(user_id),
+        "adm": es_admin,
+        "typ": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + ttl_seconds,
+    }
+    return jwt.encode(claims, signing_key(), algorithm=config.JWT_ALGORITHM), claims
+
+def create_access_token(user_id: int, es_admin: bool) -> str:
+    return create_token(user_id, es_admin, ACCESS, config.ACCESS_TOKEN_MINUTES * 60)[0]
+
+def create_refresh_token(user_id: int, es_admin: bool) -> str:
+    return create_token(user_id, es_admin, REFRESH, config.REFRESH_TOKEN_DAYS * 86400)[0]
+
+def decode_token(token: str, token_type: str) -> Dict[str, Any]:
+    # Lanza jose.JWTError si la firma, la expiración o el tipo no son válidos
+    claims = jwt.decode(token, signing_key(), algorithms=[config.JWT_ALGORITHM])
+    if claims.get("typ") != token_type:
+        raise jwt.JWTError("Tipo de token inválido")
+    return claims
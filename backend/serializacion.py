@@ -0,0 +1,66 @@
+import orjson
+from sqlalchemy import Select
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from models import Categoria, Libro, LibroRead
+
+'''
+SERIALIZACIÓN RÁPIDA DEL CATÁLOGO
+'''
+# Con CATALOG_FAST_JSON=1 los GET del catálogo no cargan objetos ORM ni los
+# revalidan con pydantic: leen tuplas de columnas (que ya cumplen el esquema
+# porque se validaron al escribirse) y las codifican con orjson. Las llaves
+# van en el mismo orden que LibroRead, así que el JSON es idéntico.
+LIBRO_CAMPOS = [campo for campo in LibroRead.model_fields if campo != "categoria"]
+LIBRO_COLUMNAS = [getattr(Libro, campo) for campo in LIBRO_CAMPOS]
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data)
+
+
+def libro_rows_query(query: Select) -> Select:
+    # Reusa filtros, orden y límite de una consulta sobre Libro, pero
+    # seleccionando solo columnas (la categoría llega en el mismo JOIN)
+    return query.with_only_columns(
+        *LIBRO_COLUMNAS, Categoria.nombre, Categoria.id, maintain_column_froms=False
+    ).outerjoin(Categoria, Categoria.id == Libro.categoria_id)
+
+
+def libro_dicts(rows: Iterable[Tuple]) -> List[dict]:
+    total = len(LIBRO_CAMPOS)
+    libros = []
+    for row in rows:
+        libro = dict(zip(LIBRO_CAMPOS, row))
+        nombre, categoria_id = row[total], row[total + 1]
+        libro["categoria"] = {"nombre": nombre, "id": categoria_id} if categoria_id is not None else None
+        libros.append(libro)
+    return libros
+
+
+def libro_read_dicts(libros: Iterable[Libro]) -> List[dict]:
+    # Camino ORM: misma forma que LibroRead, validada por pydantic
+    return [LibroRead.model_validate(libro).model_dump(mode="json") for libro in libros]
+
+
+def libros_tags(libros: List[dict]) -> set:
+    return {"libros"} | {f"categoria:{libro['categoria_id']}" for libro in libros}
+
+
+def categoria_dicts(rows: Iterable[Tuple[str, int]]) -> List[dict]:
+    return [{"nombre": nombre, "id": categoria_id} for nombre, categoria_id in rows]
+
+
+def libro_page_json(libros: List[dict], next_cursor: Optional[str]) -> bytes:
+    return dumps({"items": libros, "next_cursor": next_cursor})
+
+
+def libro_batch_json(libros: List[dict], ids: Sequence[int], campos: Optional[List[str]] = None) -> Tuple[bytes, set]:
+    # Devuelve los libros en el orden pedido y los ids que no existen; con
+    # campos, cada item solo lleva esas llaves (en el orden de LibroRead)
+    por_id = {libro["id"]: libro for libro in libros}
+    items = [por_id[libro_id] for libro_id in ids if libro_id in por_id]
+    tags = libros_tags(items) | {f"libro:{libro_id}" for libro_id in por_id}
+    if campos:
+        items = [{campo: libro[campo] for campo in campos} for libro in items]
+    faltantes = [libro_id for libro_id in ids if libro_id not in por_id]
+    return dumps({"items": items, "faltantes": faltantes}), tags
@@ -0,0 +1,424 @@
+import argparse
+import html
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+import config
+from db import upsert_insert
+from models import Libro, Tarea, Usuario, Venta, VentaLibroLink
+
+logger = logging.getLogger("libreria.tareas")
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+HECHA = "hecha"
+FALLIDA = "fallida"
+
+# Cada cuánto un worker devuelve a la cola los leases vencidos y purga las hechas
+MANTENIMIENTO_SECONDS = 30
+
+
+'''
+REGISTRO DE TIPOS
+'''
+# tipo -> fn(engine, payload). Los handlers deben ser idempotentes: una
+# tarea cuyo worker murió a medias se vuelve a correr completa
+HANDLERS: Dict[str, Callable[[Engine, Dict[str, Any]], None]] = {}
+
+
+def tarea(tipo: str):
+    def registrar(fn):
+        HANDLERS[tipo] = fn
+        return fn
+    return registrar
+
+
+'''
+ENCOLAR
+'''
+def enqueue(
+    session: Session,
+    tipo: str,
+    payload: Optional[Dict[str, Any]] = None,
+    llave: Optional[str] = None,
+    retraso: float = 0,
+    max_intentos: Optional[int] = None
+) -> Optional[int]:
+    # Va dentro de la transacción del llamador (no hace commit): la tarea se
+    # confirma junto con lo que la originó o no existe. Con llave, una tarea
+    # igual que siga viva absorbe esta y se devuelve None
+    if tipo not in HANDLERS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+
+    ahora = datetime.utcnow()
+    statement = upsert_insert(session, Tarea).values(
+        tipo=tipo,
+        payload=json.dumps(payload or {}),
+        llave=llave,
+        estado=PENDIENTE,
+        intentos=0,
+        max_intentos=config.TAREAS_MAX_INTENTOS if max_intentos is None else max_intentos,
+        creada=ahora,
+        disponible_en=ahora + timedelta(seconds=retraso),
+    )
+    statement = statement.on_conflict_do_nothing(index_elements=["llave"]).returning(Tarea.id)
+    return session.execute(statement).scalar()
+
+
+def enqueue_now(engine: Engine, tipo: str, payload: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[int]:
+    # Para quien no tiene una transacción abierta (rutas async, CLIs)
+    with Session(engine) as session:
+        tarea_id = enqueue(session, tipo, payload, **kwargs)
+        session.commit()
+    return tarea_id
+
+
+'''
+EJECUCIÓN
+'''
+def backoff(intento: int) -> float:
+    # Exponencial con tope; la mitad aleatoria separa reintentos que fallaron juntos
+    espera = min(config.TAREAS_BACKOFF_MAX_SECONDS, config.TAREAS_BACKOFF_SECONDS * 2 ** (intento - 1))
+    return espera / 2 + random.uniform(0, espera / 2)
+
+
+def claim(engine: Engine, worker: str):
+    # Un solo UPDATE ... RETURNING: en SQLite el lock de escritura serializa a
+    # los workers; en PostgreSQL SKIP LOCKED evita que se pisen
+    ahora = datetime.utcnow()
+    siguiente = (
+        select(Tarea.id)
+        .where(Tarea.estado == PENDIENTE, Tarea.disponible_en <= ahora)
+        .order_by(Tarea.disponible_en)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    with engine.begin() as conn:
+        return conn.execute(
+            update(Tarea)
+            .where(Tarea.id == siguiente, Tarea.estado == PENDIENTE)
+            .values(
+                estado=EN_CURSO,
+                worker=worker,
+                intentos=Tarea.intentos + 1,
+                iniciada=ahora,
+                lease_hasta=ahora + timedelta(seconds=config.TAREAS_LEASE_SECONDS),
+            )
+            .returning(Tarea.id, Tarea.tipo, Tarea.payload, Tarea.intentos, Tarea.max_intentos)
+        ).first()
+
+
+def complete(engine: Engine, tarea_id: int, worker: str):
+    # Solo si el lease sigue siendo de este worker; la llave queda libre
+    with engine.begin() as conn:
+        conn.execute(
+            update(Tarea)
+            .where(Tarea.id == tarea_id, Tarea.worker == worker, Tarea.estado == EN_CURSO)
+            .values(estado=HECHA, terminada=datetime.utcnow(), llave=None, lease_hasta=None, error=None)
+        )
+
+
+def fail(engine: Engine, fila, worker: str, error: str):
+    ahora = datetime.utcnow()
+    if fila.intentos >= fila.max_intentos:
+        valores = dict(estado=FALLIDA, terminada=ahora, llave=None)
+        logger.error("Tarea %s (%s) fallida tras %d intentos: %s", fila.id, fila.tipo, fila.intentos, error)
+    else:
+        valores = dict(estado=PENDIENTE, disponible_en=ahora + timedelta(seconds=backoff(fila.intentos)))
+        logger.warning("Tarea %s (%s) falló (intento %d), se reintenta: %s", fila.id, fila.tipo, fila.intentos, error)
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(Tarea)
+            .where(Tarea.id == fila.id, Tarea.worker == worker, Tarea.estado == EN_CURSO)
+            .values(lease_hasta=None, error=error[:2000], **valores)
+        )
+
+
+def run_one(engine: Engine, worker: str) -> bool:
+    fila = claim(engine, worker)
+    if fila is None:
+        return False
+    try:
+        HANDLERS[fila.tipo](engine, json.loads(fila.payload))
+    except Exception as exc:
+        fail(engine, fila, worker, f"{type(exc).__name__}: {exc}")
+    else:
+        complete(engine, fila.id, worker)
+    return True
+
+
+def maintain(engine: Engine):
+    ahora = datetime.utcnow()
+    with engine.begin() as conn:
+        # Worker muerto a media tarea: vuelve a la cola (o falla si ya no le quedan intentos)
+        vencidas = conn.execute(
+            select(Tarea.id, Tarea.intentos, Tarea.max_intentos)
+            .where(Tarea.estado == EN_CURSO, Tarea.lease_hasta < ahora)
+        ).all()
+        for tarea_id, intentos, max_intentos in vencidas:
+            valores = dict(estado=FALLIDA, terminada=ahora, llave=None) if intentos >= max_intentos else dict(estado=PENDIENTE)
+            conn.execute(
+                update(Tarea)
+                .where(Tarea.id == tarea_id, Tarea.estado == EN_CURSO)
+                .values(lease_hasta=None, error="Lease vencido", **valores)
+            )
+        conn.execute(
+            delete(Tarea).where(
+                Tarea.estado == HECHA, Tarea.terminada < ahora - timedelta(hours=config.TAREAS_RETENCION_HORAS)
+            )
+        )
+
+
+def drain(engine: Engine, worker: str = "local") -> int:
+    # Corre en este proceso todo lo que esté disponible ahora (CLI, pruebas sin workers)
+    corridas = 0
+    while run_one(engine, worker):
+        corridas += 1
+    return corridas
+
+
+def work(engine: Engine, worker: str, stop, poll_seconds: float):
+    mantenimiento = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - mantenimiento >= MANTENIMIENTO_SECONDS:
+                maintain(engine)
+                mantenimiento = time.monotonic()
+            trabajo = run_one(engine, worker)
+        except OperationalError as exc:
+            # Base ocupada o caída: se reintenta en la siguiente vuelta
+            logger.warning("Worker %s: %s", worker, exc)
+            trabajo = False
+        # Con cola vacía se espera; si hubo trabajo se sigue sin pausa
+        if not trabajo:
+            stop.wait(poll_seconds)
+
+
+'''
+PROCESOS
+'''
+# Cada worker es un `python -m tareas proceso` aparte: importa db y arma su
+# propio motor y pool, sin conexiones ni estado heredados del proceso de la API
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _proceso():
+    stop = threading.Event()
+    # SIGTERM del padre: terminar la tarea en curso y salir. Ctrl+C llega a
+    # todo el grupo; lo ignora el worker y el padre coordina el apagado
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    padre = os.getppid()
+
+    def vigilar_padre():
+        # Si el padre muere sin avisar (kill -9), el worker no queda huérfano
+        while not stop.wait(1):
+            if os.getppid() != padre:
+                stop.set()
+
+    threading.Thread(target=vigilar_padre, daemon=True).start()
+
+    from db import engine
+    work(engine, f"{socket.gethostname()}:{os.getpid()}", stop, config.TAREAS_POLL_SECONDS)
+
+
+class WorkerPool:
+    def __init__(self, procesos: int):
+        self.procesos = procesos
+        self._workers: List[subprocess.Popen] = []
+
+    def start(self):
+        pythonpath = os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))
+        env = dict(os.environ, PYTHONPATH=pythonpath)
+        for _ in range(self.procesos):
+            self._workers.append(subprocess.Popen([sys.executable, "-m", "tareas", "proceso"], env=env))
+
+    def alive(self) -> bool:
+        return any(proceso.poll() is None for proceso in self._workers)
+
+    def stop(self, timeout: float = 10):
+        # Cada worker termina la tarea en curso; el que no alcanza se mata y
+        # su tarea vuelve a la cola cuando vence el lease
+        for proceso in self._workers:
+            if proceso.poll() is None:
+                proceso.terminate()
+        limite = time.monotonic() + timeout
+        for proceso in self._workers:
+            try:
+                proceso.wait(max(0.0, limite - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+                proceso.wait()
+        self._workers = []
+
+
+'''
+ESTADÍSTICAS
+'''
+def _percentil(valores: List[float], pct: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * pct / 100))], 1)
+
+
+def queue_stats(session: Session, muestra: int = 500) -> Dict[str, Any]:
+    ahora = datetime.utcnow()
+    por_estado = dict(session.execute(select(Tarea.estado, func.count()).group_by(Tarea.estado)).all())
+    mas_antigua = session.execute(
+        select(func.min(Tarea.disponible_en)).where(Tarea.estado == PENDIENTE, Tarea.disponible_en <= ahora)
+    ).scalar()
+
+    # Latencia de las últimas tareas hechas: espera en cola y duración
+    recientes = session.execute(
+        select(Tarea.creada, Tarea.iniciada, Tarea.terminada)
+        .where(Tarea.estado == HECHA)
+        .order_by(Tarea.terminada.desc())
+        .limit(muestra)
+    ).all()
+    esperas = [(iniciada - creada).total_seconds() * 1000 for creada, iniciada, _ in recientes]
+    duraciones = [(terminada - iniciada).total_seconds() * 1000 for _, iniciada, terminada in recientes]
+
+    return {
+        "pendientes": por_estado.get(PENDIENTE, 0),
+        "en_curso": por_estado.get(EN_CURSO, 0),
+        "hechas": por_estado.get(HECHA, 0),
+        "fallidas": por_estado.get(FALLIDA, 0),
+        "espera_mas_antigua_s": round((ahora - mas_antigua).total_seconds(), 1) if mas_antigua else 0,
+        "espera_p50_ms": _percentil(esperas, 50),
+        "espera_p99_ms": _percentil(esperas, 99),
+        "duracion_p50_ms": _percentil(duraciones, 50),
+        "duracion_p99_ms": _percentil(duraciones, 99),
+    }
+
+
+'''
+TAREAS
+'''
+def confirmacion_path(venta_id: int) -> str:
+    return os.path.join(config.CONFIRMACIONES_DIR, f"venta-{venta_id}.html")
+
+
+@tarea("confirmacion_venta")
+def generar_confirmacion(engine: Engine, payload: Dict[str, Any]):
+    # Documento de confirmación del pedido (lo que muestra OrderConfirmation)
+    venta_id = payload["venta_id"]
+    with Session(engine) as session:
+        venta = session.get(Venta, venta_id)
+        if venta is None:
+            return
+        usuario = session.get(Usuario, venta.usuario_id)
+        lineas = session.execute(
+            select(Libro.titulo, Libro.autor, VentaLibroLink.cantidad, VentaLibroLink.precio_unitario)
+            .join(Libro, Libro.id == VentaLibroLink.libro_id)
+            .where(VentaLibroLink.venta_id == venta_id)
+            .order_by(Libro.titulo)
+        ).all()
+
+    filas = "".join(
+        f"<tr><td>{html.escape(titulo)}</td><td>{html.escape(autor)}</td><td>{cantidad}</td>"
+        f"<td>${precio:.2f}</td><td>${cantidad * precio:.2f}</td></tr>"
+        for titulo, autor, cantidad, precio in lineas
+    )
+    documento = (
+        "<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+        f"<title>Pedido {venta.id}</title></head><body>"
+        f"<h1>Confirmación del pedido #{venta.id}</h1>"
+        f"<p>{html.escape(usuario.nombre)} &lt;{html.escape(usuario.correo)}&gt;<br>{html.escape(usuario.direccion)}</p>"
+        f"<p>Fecha: {venta.fecha:%Y-%m-%d %H:%M} UTC · Forma de pago: {html.escape(venta.forma_pago)}</p>"
+        "<table><thead><tr><th>Título</th><th>Autor</th><th>Cantidad</th><th>Precio</th><th>Subtotal</th></tr></thead>"
+        f"<tbody>{filas}</tbody></table>"
+        f"<p><strong>Total: ${venta.total:.2f}</strong></p></body></html>"
+    )
+
+    # Escritura atómica: quien lee nunca ve un documento a medias
+    os.makedirs(config.CONFIRMACIONES_DIR, exist_ok=True)
+    destino = confirmacion_path(venta_id)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(documento)
+    os.replace(temporal, destino)
+
+
+@tarea("reindexar_busqueda")
+def reindexar_busqueda(engine: Engine, payload: Dict[str, Any]):
+    # Tras una importación grande: rebuild + optimize del índice FTS5
+    if engine.dialect.name != "sqlite":
+        return
+    from busqueda import rebuild_search_index
+    rebuild_search_index(engine)
+
+
+@tarea("reconstruir_estadisticas")
+def reconstruir_estadisticas(engine: Engine, payload: Dict[str, Any]):
+    from estadisticas import backfill
+    backfill(engine)
+
+
+'''
+CLI
+'''
+# python -m tareas worker [--procesos N]
+# python -m tareas proceso  (un solo worker; lo lanza WorkerPool)
+# python -m tareas drenar
+# python -m tareas estado
+# python -m tareas encolar reconstruir_estadisticas [--payload '{}'] [--llave ...]
+def main(argv: Optional[List[str]] = None):
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m tareas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    worker = sub.add_parser("worker")
+    worker.add_argument("--procesos", type=int, default=max(1, config.TAREAS_WORKERS))
+    sub.add_parser("proceso")
+    sub.add_parser("drenar")
+    sub.add_parser("estado")
+    encolar = sub.add_parser("encolar")
+    encolar.add_argument("tipo", choices=sorted(HANDLERS))
+    encolar.add_argument("--payload", default="{}")
+    encolar.add_argument("--llave", default=None)
+    args = parser.parse_args(argv)
+
+    if args.comando == "worker":
+        pool = WorkerPool(args.procesos)
+        pool.start()
+        # SIGTERM/SIGINT: apagado ordenado de los procesos
+        signal.signal(signal.SIGTERM, lambda *_: pool.stop())
+        try:
+            while pool.alive():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pool.stop()
+    elif args.comando == "proceso":
+        logging.basicConfig(level=logging.INFO)
+        _proceso()
+    elif args.comando == "drenar":
+        print(f"{drain(engine)} tareas ejecutadas")
+    elif args.comando == "estado":
+        with Session(engine) as session:
+            print(json.dumps(queue_stats(session), indent=2))
+    else:
+        tarea_id = enqueue_now(engine, args.tipo, json.loads(args.payload), llave=args.llave)
+        print(f"Tarea {tarea_id} encolada" if tarea_id else "Ya había una tarea con esa llave")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import uuid
+
+# La configuración se lee al importar: base, artefactos y workers se apuntan a
+# un directorio temporal antes de importar la app
+_tmp = tempfile.TemporaryDirectory(prefix="libreria-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp.name, 'tests.db')}",
+    "RECOMENDACIONES_DIR": os.path.join(_tmp.name, "recomendaciones"),
+    "CONFIRMACIONES_DIR": os.path.join(_tmp.name, "confirmaciones"),
+    "JWT_SECRET": "tests",
+    "TAREAS_WORKERS": "0",
+    "RATE_LIMIT_ENABLED": "0",
+    "LOAD_SHED_ENABLED": "0",
+    "METRICS_ENABLED": "0",
+    # Sin sincronizaciones de fondo a mitad de un test: los tests llaman sync()
+    "TOKEN_DENYLIST_REFRESH_SECONDS": "3600",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+import db
+from main import app
+from models import Categoria, Libro, Usuario
+from security import create_access_token
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def session(client):
+    with Session(db.engine) as session:
+        yield session
+
+
+@pytest.fixture
+def admin(session) -> Usuario:
+    usuario = Usuario(
+        correo=f"admin-{uuid.uuid4().hex[:8]}@example.com", password="x", nombre="Admin",
+        direccion="D", telefono="1", rfc="R", es_admin=True
+    )
+    session.add(usuario)
+    session.commit()
+    session.refresh(usuario)
+    return usuario
+
+
+@pytest.fixture
+def admin_headers(admin) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(admin.id, True)}"}
+
+
+@pytest.fixture
+def categoria(session) -> Categoria:
+    categoria = Categoria(nombre=f"Categoría {uuid.uuid4().hex[:8]}")
+    session.add(categoria)
+    session.commit()
+    session.refresh(categoria)
+    return categoria
+
+
+@pytest.fixture
+def crear_libro(session, categoria):
+    def crear(**valores) -> Libro:
+        libro = Libro(**{
+            "titulo": "Libro de prueba", "autor": "Autor", "editorial": "Editorial", "precio": 100,
+            "cantidad_disponible": 10, "descripcion": "Descripción", "paginas": 100,
+            "categoria_id": categoria.id, "idioma": "Español", "fecha_publicacion": 2000,
+            "imagen_url": "https://example.com/img.png", **valores
+        })
+        session.add(libro)
+        session.commit()
+        session.refresh(libro)
+        return libro
+    return crear
+
+
+@pytest.fixture
+def vender(client, admin, admin_headers):
+    # Checkout real por la API: el carrito del admin (uno por usuario; el
+    # checkout lo vacía) con las líneas dadas
+    carrito = client.post("/carritos/", json={"usuario_id": admin.id}, headers=admin_headers).json()
+
+    def vender(*lineas) -> dict:
+        for libro_id, cantidad in lineas:
+            response = client.post(
+                f"/carritos/{carrito['id']}/items", json={"libro_id": libro_id, "cantidad": cantidad},
+                headers=admin_headers
+            )
+            assert response.status_code == 200, response.text
+        response = client.post("/ventas/", json={"carrito_id": carrito["id"], "forma_pago": "tarjeta"}, headers=admin_headers)
+        assert response.status_code == 201, response.text
+        return response.json()
+    return vender
@@ -0,0 +1,182 @@
+import asyncio
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from admision import AUTH, ESCRITURA, LECTURA, AdmissionMiddleware, LoadShedder, RateLimiter, TokenBuckets
+
+
+'''
+TOKEN BUCKETS
+'''
+def test_take_hasta_la_rafaga():
+    buckets = TokenBuckets(tasa=1, rafaga=3, shards=1)
+
+    assert [buckets.take("a", 0) for _ in range(3)] == [0, 0, 0]
+    # Sin tokens: segundos hasta el siguiente
+    assert buckets.take("a", 0) == pytest.approx(1)
+    assert buckets.take("a", 0.25) == pytest.approx(0.75)
+    assert buckets.rechazados == 2
+    # Otro cliente tiene su propio bucket
+    assert buckets.take("b", 0.25) == 0
+
+
+def test_take_recarga_con_tope():
+    buckets = TokenBuckets(tasa=2, rafaga=3, shards=1)
+    for _ in range(3):
+        buckets.take("a", 0)
+
+    # Medio segundo a 2 tokens/s: uno solo
+    assert buckets.take("a", 0.5) == 0
+    assert buckets.take("a", 0.5) > 0
+
+    # Mucho tiempo inactivo: se llena hasta la ráfaga, no más
+    assert [buckets.take("a", 100) for _ in range(4)][-1] > 0
+
+
+def test_sweep_desaloja_clientes_inactivos():
+    # Con rafaga / tasa = 2 s sin uso el bucket ya está lleno y se puede borrar
+    buckets = TokenBuckets(tasa=1, rafaga=2, shards=2)
+    buckets.take("inactivo", 0)
+    buckets.take("activo", 0)
+    assert len(buckets) == 2
+
+    # Un shard por barrido: en ~1 s pasan todos
+    buckets.take("activo", 1.5)
+    buckets.take("activo", 2.5)
+    buckets.take("activo", 3.0)
+
+    assert len(buckets) == 1
+    assert buckets.desalojados == 1
+    # Volver tras el desalojo es como no haberse ido: bucket lleno
+    assert buckets.take("inactivo", 3.0) == 0
+    assert buckets.take("inactivo", 3.0) == 0
+
+
+'''
+LIMITADOR DE CONCURRENCIA
+'''
+def test_load_shedder_cola_llena():
+    async def escenario():
+        shedder = LoadShedder(max_inflight=1, max_queue=1, max_wait_ms=10_000)
+        assert await shedder.acquire()
+        encolado = asyncio.create_task(shedder.acquire())
+        await asyncio.sleep(0)
+
+        # Lugar ocupado y cola llena: rechazo inmediato
+        assert not await shedder.acquire()
+        assert shedder.stats()["rechazados"] == 1
+
+        shedder.release()
+        assert await encolado
+        shedder.release()
+        assert shedder.stats()["en_vuelo"] == 0
+
+    asyncio.run(escenario())
+
+
+def test_load_shedder_espera_vencida():
+    async def escenario():
+        shedder = LoadShedder(max_inflight=1, max_queue=1, max_wait_ms=10)
+        assert await shedder.acquire()
+
+        assert not await shedder.acquire()
+        assert shedder.stats() == {"en_vuelo": 1, "en_cola": 0, "admitidos": 1, "encolados": 1, "rechazados": 1}
+
+        # El que vence no se queda en la cola: el lugar vuelve a quedar libre
+        shedder.release()
+        assert shedder.stats()["en_vuelo"] == 0
+
+    asyncio.run(escenario())
+
+
+def test_load_shedder_cancelado_en_la_cola():
+    async def escenario():
+        shedder = LoadShedder(max_inflight=1, max_queue=2, max_wait_ms=10_000)
+        assert await shedder.acquire()
+        encolado = asyncio.create_task(shedder.acquire())
+        await asyncio.sleep(0)
+
+        encolado.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await encolado
+        assert shedder.stats()["en_cola"] == 0
+
+        shedder.release()
+        assert shedder.stats()["en_vuelo"] == 0
+
+    asyncio.run(escenario())
+
+
+def test_load_shedder_cancelado_tras_recibir_el_lugar():
+    # release() le pasa el lugar y el cliente se va antes de retomarlo: el
+    # lugar no se pierde, lo devuelve él o lo usa y lo devuelve quien lo llamó
+    async def escenario():
+        shedder = LoadShedder(max_inflight=1, max_queue=2, max_wait_ms=10_000)
+        assert await shedder.acquire()
+        encolado = asyncio.create_task(shedder.acquire())
+        await asyncio.sleep(0)
+
+        shedder.release()
+        encolado.cancel()
+        try:
+            admitido = await encolado
+        except asyncio.CancelledError:
+            admitido = False
+        if admitido:
+            shedder.release()
+
+        assert shedder.stats()["en_vuelo"] == 0
+        assert shedder.stats()["en_cola"] == 0
+        assert await shedder.acquire()
+
+    asyncio.run(escenario())
+
+
+'''
+MIDDLEWARE
+'''
+async def app_ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def limiter(lectura):
+    return RateLimiter({AUTH: (1, 1), LECTURA: lectura, ESCRITURA: (1, 1)}, shards=1)
+
+
+def test_middleware_429_con_retry_after():
+    client = TestClient(AdmissionMiddleware(app_ok, limiter=limiter((0.1, 1))))
+
+    assert client.get("/libros/").status_code == 200
+    response = client.get("/libros/")
+
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Demasiadas solicitudes, intenta más tarde"}
+    # Un token cada 10 s
+    assert response.headers["Retry-After"] == "10"
+    # Cada clase de ruta tiene su propio bucket, y /metrics no pasa por la admisión
+    assert client.post("/carritos/").status_code == 200
+    assert client.get("/metrics").status_code == 200
+
+
+def test_middleware_503_con_retry_after():
+    shedder = LoadShedder(max_inflight=0, max_queue=0, max_wait_ms=10)
+    client = TestClient(AdmissionMiddleware(app_ok, shedder=shedder))
+
+    response = client.get("/libros/")
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Servidor saturado, intenta más tarde"}
+    assert response.headers["Retry-After"] == str(max(1, math.ceil(config.LOAD_SHED_RETRY_AFTER)))
+    assert shedder.stats()["rechazados"] == 1
+
+
+def test_middleware_devuelve_el_lugar():
+    shedder = LoadShedder(max_inflight=1, max_queue=0, max_wait_ms=10)
+    client = TestClient(AdmissionMiddleware(app_ok, shedder=shedder))
+
+    assert [client.get("/libros/").status_code for _ in range(3)] == [200, 200, 200]
+    assert shedder.stats()["en_vuelo"] == 0
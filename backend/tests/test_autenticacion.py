@@ -0,0 +1,66 @@
+import time
+
+import db
+from dependencias import token_denylist
+from revocacion import TokenDenylist
+from security import REFRESH, create_refresh_token, decode_token
+
+
+def test_refresh_rota_el_token(client, admin):
+    refresh_token = create_refresh_token(admin.id, True)
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200, response.text
+    assert response.json()["refresh_token"] != refresh_token
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+def test_refresh_reusado_en_otro_worker(client, admin):
+    # Otro worker ya rotó este token y la copia en memoria de este todavía no
+    # lo sabe: el INSERT del jti choca y el refresh se rechaza igual
+    refresh_token = create_refresh_token(admin.id, True)
+    claims = decode_token(refresh_token, REFRESH)
+    otro_worker = TokenDenylist(db.engine, 3600)
+    assert otro_worker.revoke(claims["jti"], claims["exp"])
+    assert not token_denylist.is_revoked(claims["jti"])
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Refresh token reutilizado"
+
+
+def test_revoke_es_insert_simple(client, admin):
+    claims = decode_token(create_refresh_token(admin.id, True), REFRESH)
+    denylist = TokenDenylist(db.engine, 3600)
+
+    assert denylist.revoke(claims["jti"], claims["exp"])
+    assert not denylist.revoke(claims["jti"], claims["exp"])
+    assert not TokenDenylist(db.engine, 3600).revoke(claims["jti"], claims["exp"])
+
+
+def test_sincronizacion_en_segundo_plano(client, admin):
+    claims = decode_token(create_refresh_token(admin.id, True), REFRESH)
+    denylist = TokenDenylist(db.engine, 0.05)
+    denylist.start()
+    try:
+        TokenDenylist(db.engine, 3600).revoke(claims["jti"], claims["exp"])
+        # is_revoked no consulta la base: el jti aparece cuando pasa el hilo
+        limite = time.monotonic() + 5
+        while not denylist.is_revoked(claims["jti"]) and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert denylist.is_revoked(claims["jti"])
+    finally:
+        denylist.stop()
+
+
+def test_is_revoked_no_consulta_la_base(client, admin):
+    claims = decode_token(create_refresh_token(admin.id, True), REFRESH)
+    TokenDenylist(db.engine, 3600).revoke(claims["jti"], claims["exp"])
+    denylist = TokenDenylist(db.engine, 0)
+
+    assert not denylist.is_revoked(claims["jti"])
+    denylist.sync()
+    assert denylist.is_revoked(claims["jti"])
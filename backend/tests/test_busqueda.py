@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+from sqlmodel import Session
+
+import db
+from busqueda import search_libro_ids, search_statement
+
+
+@pytest.fixture
+def palabra():
+    return f"zq{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def libros(crear_libro, palabra):
+    # La palabra en la descripción (peso 2) y en el título (peso 10)
+    en_descripcion = crear_libro(descripcion=f"Trata de {palabra} y mar")
+    en_titulo = crear_libro(titulo=f"El {palabra.upper()} perdido")
+    return en_titulo.id, en_descripcion.id
+
+
+def like_ids(q: str, limit: int = 20, offset: int = 0):
+    # El respaldo de PostgreSQL, corrido sobre la base de los tests
+    with Session(db.engine) as session:
+        return [row[0] for row in session.execute(search_statement(q, limit, offset, "postgresql"))]
+
+
+def test_busqueda_fts(libros, palabra):
+    with Session(db.engine) as session:
+        assert search_libro_ids(session, palabra) == list(libros)
+
+
+def test_busqueda_like_por_relevancia(libros, palabra):
+    assert like_ids(palabra) == list(libros)
+    assert like_ids(palabra, limit=1, offset=1) == [libros[1]]
+    # Todas las palabras deben aparecer
+    assert like_ids(f"{palabra} perdido") == [libros[0]]
+    assert like_ids(f"{palabra} inexistente{palabra}") == []
+
+
+def test_busqueda_like_escapa_comodines(crear_libro, palabra):
+    libro = crear_libro(titulo=f"{palabra}_a")
+    crear_libro(titulo=f"{palabra}xa")
+
+    assert like_ids(f"{palabra}_a") == [libro.id]
+    assert search_statement("%", dialect="postgresql") is None
+
+
+def test_endpoint_search(client, libros, palabra):
+    response = client.get("/libros/search", params={"q": palabra})
+
+    assert response.status_code == 200
+    assert [libro["id"] for libro in response.json()] == list(libros)
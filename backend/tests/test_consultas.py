@@ -0,0 +1,89 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, insert, select
+
+import db
+from cache import catalog_cache
+from models import Carrito, CarritoLibroLink, Categoria, Libro, Usuario
+
+# Detector de N+1: el número de sentencias por request no debe crecer con el
+# tamaño de la página, del batch ni del objeto leído
+
+
+@pytest.fixture(scope="module")
+def datos(client):
+    with Session(db.engine) as session:
+        categoria_id = session.exec(select(Categoria.id)).first()
+        marca = uuid.uuid4().hex[:8]
+        libro_ids = session.execute(insert(Libro).returning(Libro.id), [
+            {
+                "titulo": f"Libro {marca} {i}", "autor": "Autor", "editorial": "Editorial", "precio": 100,
+                "cantidad_disponible": 10, "descripcion": "Descripción", "paginas": 100,
+                "categoria_id": categoria_id, "idioma": "Español",
+                "fecha_publicacion": 2000, "imagen_url": "https://example.com/img.png",
+            }
+            for i in range(300)
+        ]).scalars().all()
+        carrito_ids = []
+        for i in range(50):
+            usuario = Usuario(
+                correo=f"consultas-{marca}-{i}@example.com", password="x", nombre="U", direccion="D",
+                telefono="1", rfc="R"
+            )
+            session.add(usuario)
+            session.flush()
+            carrito = Carrito(usuario_id=usuario.id)
+            session.add(carrito)
+            session.flush()
+            session.execute(insert(CarritoLibroLink), [
+                {"carrito_id": carrito.id, "libro_id": libro_id} for libro_id in libro_ids[:1 + i % 10]
+            ])
+            carrito_ids.append(carrito.id)
+        session.commit()
+    return libro_ids, carrito_ids
+
+
+@pytest.fixture
+def contar(client):
+    statements = []
+
+    def registrar(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # Los GET usan el pool de solo lectura; se cuentan los dos motores
+    engines = {db.engine, db.read_engine}
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", registrar)
+
+    def contar(url: str) -> int:
+        catalog_cache.clear()
+        statements.clear()
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.text)
+        return len(statements)
+
+    yield contar
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+def urls(datos):
+    libro_ids, carrito_ids = datos
+    return {
+        "libros": [f"/libros/?limit={n}" for n in (1, 10, 100, 300)],
+        "libros/pagina": [f"/libros/pagina?limit={n}" for n in (1, 10, 100, 300)],
+        "libros/batch": ["/libros/batch?ids=" + ",".join(map(str, libro_ids[:n])) for n in (1, 10, 100)],
+        "libro": [f"/libros/{libro_ids[0]}", f"/libros/{libro_ids[-1]}"],
+        "carritos": [f"/carritos/?limit={n}" for n in (1, 10, 50)],
+        # El primero con un libro, el último con diez
+        "carrito": [f"/carritos/{carrito_ids[0]}", f"/carritos/{carrito_ids[9]}"],
+    }
+
+
+@pytest.mark.parametrize("caso", ["libros", "libros/pagina", "libros/batch", "libro", "carritos", "carrito"])
+def test_consultas_constantes(datos, contar, caso):
+    conteos = {url: contar(url) for url in urls(datos)[caso]}
+
+    assert len(set(conteos.values())) == 1, conteos
@@ -0,0 +1,32 @@
+from sqlmodel import select
+
+import db
+from estadisticas import backfill
+from models import Categoria, VentaCategoriaResumen, VentaDiaria, VentaLibroResumen
+
+
+def snapshot(session):
+    session.expire_all()
+    return {
+        model.__tablename__: sorted((tuple(fila) for fila in session.exec(select(*model.__table__.columns)).all()))
+        for model in (VentaDiaria, VentaLibroResumen, VentaCategoriaResumen)
+    }
+
+
+def test_backfill_coincide_con_los_agregados_incrementales(client, session, admin_headers, crear_libro, vender):
+    otra = Categoria(nombre="Otra categoría")
+    session.add(otra)
+    session.commit()
+    libro = crear_libro(precio=50)
+    categoria_original = libro.categoria_id
+    vender((libro.id, 3))
+
+    # La venta queda en la categoría que tenía el libro al venderse
+    response = client.patch(f"/libros/{libro.id}", json={"categoria_id": otra.id}, headers=admin_headers)
+    assert response.status_code == 200
+    incremental = snapshot(session)
+    assert session.get(VentaCategoriaResumen, categoria_original).unidades >= 3
+
+    backfill(db.engine)
+
+    assert snapshot(session) == incremental
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+import db
+from models import Libro, VentaLibroLink
+
+
+def test_delete_libro_sin_ventas(client, session, admin_headers, crear_libro):
+    libro_id = crear_libro().id
+
+    response = client.delete(f"/libros/{libro_id}", headers=admin_headers)
+
+    assert response.status_code == 204
+    session.expire_all()
+    assert session.get(Libro, libro_id) is None
+
+
+def test_delete_libro_vendido_conserva_el_historial(client, session, admin_headers, crear_libro, vender):
+    libro = crear_libro()
+    venta = vender((libro.id, 2))
+
+    response = client.delete(f"/libros/{libro.id}", headers=admin_headers)
+
+    assert response.status_code == 409
+    session.expire_all()
+    assert session.get(Libro, libro.id) is not None
+    lineas = session.exec(select(VentaLibroLink).where(VentaLibroLink.venta_id == venta["id"])).all()
+    assert [(linea.libro_id, linea.cantidad) for linea in lineas] == [(libro.id, 2)]
+
+
+@pytest.fixture(scope="module")
+def async_client(client):
+    # El router async solo se monta con ASYNC_DB=1 al importar main; aquí se
+    # monta solo, con su sesión sobre la misma base de los tests
+    from fastapi import FastAPI
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from routers import libros_async
+
+    async_engine = db.build_async_engine()
+
+    async def get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(libros_async.router)
+    app.dependency_overrides[db.get_async_session] = get_async_session
+    with TestClient(app) as async_client:
+        yield async_client
+
+
+@pytest.mark.parametrize("cliente", ["client", "async_client"])
+@pytest.mark.parametrize("ids", ["9" * 20, "1," + "9" * 5000, str(2 ** 63)], ids=["20-digitos", "5000-digitos", "2**63"])
+def test_batch_ids_fuera_de_rango(request, cliente, ids):
+    response = request.getfixturevalue(cliente).get("/libros/batch", params={"ids": ids})
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Ids fuera de rango")
+
+
+@pytest.mark.parametrize("cliente", ["client", "async_client"])
+def test_batch_ids_validos(request, cliente, crear_libro):
+    libro = crear_libro()
+
+    response = request.getfixturevalue(cliente).get("/libros/batch", params={"ids": f"{libro.id},{2 ** 63 - 1}"})
+
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["items"]] == [libro.id]
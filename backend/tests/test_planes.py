@@ -0,0 +1,31 @@
+import pytest
+from sqlmodel import SQLModel
+
+from benchmarks.paginacion import seed
+from benchmarks.planes_libros import combinaciones, revisar
+from db import build_engine
+
+# Cada índice del catálogo lo usa su filtro a solas, así que con hasta dos
+# filtros a la vez un índice borrado o un filtro que deja de ser indexable
+# ya aparece. python -m benchmarks.planes_libros revisa todas
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    engine = build_engine(f"sqlite:///{tmp_path_factory.mktemp('planes') / 'planes.db'}")
+    SQLModel.metadata.create_all(engine)
+    seed(engine, 2000)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+@pytest.mark.parametrize("combinacion", list(combinaciones(2)), ids=lambda combinacion: "+".join(combinacion) or "sin_filtros")
+def test_filtros_usan_indices(conn, combinacion):
+    fallas = [
+        (orden, "cursor" if con_cursor else "", encontrados)
+        for orden, con_cursor, _, encontrados in revisar(conn, combinacion)
+        if encontrados
+    ]
+
+    assert not fallas
@@ -0,0 +1,197 @@
+import json
+import os
+
+import pytest
+from sqlmodel import Session, delete, select, update
+
+import config
+import db
+import tareas
+from models import Tarea
+from tareas import EN_CURSO, FALLIDA, HECHA, PENDIENTE, claim, complete, drain, enqueue, enqueue_now, maintain, run_one
+
+corridas = []
+
+
+@tareas.tarea("prueba")
+def tarea_de_prueba(engine, payload):
+    corridas.append(payload)
+    if payload.get("falla"):
+        raise RuntimeError("falla a propósito")
+
+
+@pytest.fixture
+def cola(tmp_path):
+    # Cola propia por test: las ventas de otros tests encolan sus confirmaciones
+    # en la base compartida y claim() las tomaría
+    engine = db.build_engine(f"sqlite:///{tmp_path / 'cola.db'}")
+    Tarea.__table__.create(engine)
+    corridas.clear()
+    yield engine
+    engine.dispose()
+
+
+def tarea(engine, tarea_id) -> Tarea:
+    with Session(engine) as session:
+        return session.get(Tarea, tarea_id)
+
+
+'''
+ENCOLAR
+'''
+def test_enqueue_con_llave_deduplica(cola):
+    primera = enqueue_now(cola, "prueba", {"n": 1}, llave="prueba:1")
+
+    assert primera is not None
+    assert enqueue_now(cola, "prueba", {"n": 2}, llave="prueba:1") is None
+    with Session(cola) as session:
+        assert session.exec(select(Tarea.payload)).all() == [json.dumps({"n": 1})]
+
+    # Terminada la tarea la llave queda libre y se puede volver a encolar
+    assert drain(cola) == 1
+    assert enqueue_now(cola, "prueba", {"n": 3}, llave="prueba:1") is not None
+
+
+def test_enqueue_va_en_la_transaccion_del_llamador(cola):
+    with Session(cola) as session:
+        enqueue(session, "prueba", {}, llave="prueba:rollback")
+        session.rollback()
+
+    assert enqueue_now(cola, "prueba", {}, llave="prueba:rollback") is not None
+
+
+def test_enqueue_tipo_desconocido(cola):
+    with pytest.raises(ValueError):
+        enqueue_now(cola, "no_existe")
+
+
+'''
+LEASES
+'''
+def test_lease_vencido_lo_toma_otro_worker(cola, monkeypatch):
+    tarea_id = enqueue_now(cola, "prueba", {"n": 1})
+    monkeypatch.setattr(config, "TAREAS_LEASE_SECONDS", -1)
+    assert claim(cola, "worker-a").id == tarea_id
+    # Mientras la tiene worker-a nadie más la puede tomar
+    assert claim(cola, "worker-b") is None
+
+    # worker-a murió: el mantenimiento la devuelve a la cola
+    maintain(cola)
+    assert tarea(cola, tarea_id).estado == PENDIENTE
+    assert tarea(cola, tarea_id).error == "Lease vencido"
+
+    monkeypatch.setattr(config, "TAREAS_LEASE_SECONDS", 300)
+    fila = claim(cola, "worker-b")
+    assert (fila.id, fila.intentos) == (tarea_id, 2)
+
+    # worker-a revive tarde: su complete ya no cuenta
+    complete(cola, tarea_id, "worker-a")
+    assert tarea(cola, tarea_id).estado == EN_CURSO
+    complete(cola, tarea_id, "worker-b")
+    assert tarea(cola, tarea_id).estado == HECHA
+
+
+def test_lease_vencido_sin_intentos_falla(cola, monkeypatch):
+    tarea_id = enqueue_now(cola, "prueba", {}, max_intentos=1)
+    monkeypatch.setattr(config, "TAREAS_LEASE_SECONDS", -1)
+    claim(cola, "worker-a")
+
+    maintain(cola)
+
+    assert tarea(cola, tarea_id).estado == FALLIDA
+    assert tarea(cola, tarea_id).llave is None
+
+
+'''
+REINTENTOS
+'''
+def test_backoff_exponencial_con_tope(monkeypatch):
+    monkeypatch.setattr(config, "TAREAS_BACKOFF_SECONDS", 2)
+    monkeypatch.setattr(config, "TAREAS_BACKOFF_MAX_SECONDS", 10)
+
+    for intento, espera in [(1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+        assert espera / 2 <= tareas.backoff(intento) <= espera
+
+
+def test_reintentos_hasta_fallida(cola, monkeypatch):
+    tarea_id = enqueue_now(cola, "prueba", {"falla": True}, llave="prueba:falla", max_intentos=3)
+
+    # Primer fallo: vuelve a pendiente, pero no disponible hasta que pase el backoff
+    assert run_one(cola, "worker")
+    fallida = tarea(cola, tarea_id)
+    assert (fallida.estado, fallida.intentos, fallida.llave) == (PENDIENTE, 1, "prueba:falla")
+    assert fallida.disponible_en > fallida.iniciada
+    assert fallida.error == "RuntimeError: falla a propósito"
+    assert not run_one(cola, "worker")
+
+    # Sin espera, los intentos que quedan corren seguidos
+    monkeypatch.setattr(tareas, "backoff", lambda intento: 0)
+    with cola.begin() as conn:
+        conn.execute(update(Tarea).where(Tarea.id == tarea_id).values(disponible_en=fallida.iniciada))
+    assert drain(cola) == 2
+
+    fallida = tarea(cola, tarea_id)
+    assert (fallida.estado, fallida.intentos, fallida.llave) == (FALLIDA, 3, None)
+    assert len(corridas) == 3
+    assert not run_one(cola, "worker")
+
+
+'''
+CONFIRMACIÓN DE LA VENTA
+'''
+@pytest.fixture
+def venta(vender, crear_libro):
+    return vender((crear_libro().id, 1))
+
+
+def tareas_de(session, venta_id):
+    session.expire_all()
+    return session.exec(
+        select(Tarea).where(Tarea.tipo == "confirmacion_venta", Tarea.payload == json.dumps({"venta_id": venta_id}))
+    ).all()
+
+
+def test_confirmacion_pendiente(client, session, admin_headers, venta):
+    response = client.get(f"/ventas/{venta['id']}/confirmacion", headers=admin_headers)
+
+    assert response.status_code == 202
+    assert response.headers["Retry-After"] == "1"
+    # La tarea viva absorbe la consulta: no se encola otra
+    assert [t.estado for t in tareas_de(session, venta["id"])] == [PENDIENTE]
+
+
+def test_confirmacion_generada(client, session, admin_headers, venta):
+    drain(db.engine)
+
+    response = client.get(f"/ventas/{venta['id']}/confirmacion", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert os.path.exists(tareas.confirmacion_path(venta["id"]))
+
+
+def test_confirmacion_fallida(client, session, admin_headers, venta):
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(Tarea)
+            .where(Tarea.llave == f"confirmacion_venta:{venta['id']}")
+            .values(estado=FALLIDA, llave=None, error="RuntimeError: sin disco")
+        )
+
+    response = client.get(f"/ventas/{venta['id']}/confirmacion", headers=admin_headers)
+
+    assert response.status_code == 500
+    # No se reintenta sola: sigue habiendo una única tarea, fallida
+    assert [t.estado for t in tareas_de(session, venta["id"])] == [FALLIDA]
+
+
+def test_confirmacion_sin_tarea_se_reencola(client, session, admin_headers, venta):
+    # Hecha y purgada sin que el archivo exista
+    with db.engine.begin() as conn:
+        conn.execute(delete(Tarea).where(Tarea.llave == f"confirmacion_venta:{venta['id']}"))
+
+    response = client.get(f"/ventas/{venta['id']}/confirmacion", headers=admin_headers)
+
+    assert response.status_code == 202
+    nuevas = tareas_de(session, venta["id"])
+    assert [(t.estado, t.llave) for t in nuevas] == [(PENDIENTE, f"confirmacion_venta:{venta['id']}")]
@@ -0,0 +1,158 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import config
+from cache import cache_key, cached_json, cached_json_async
+from models import VersionTabla
+
+'''
+TRIGGERS DE VERSIÓN
+'''
+# Cada INSERT/UPDATE/DELETE sobre una tabla versionada incrementa su contador.
+# Al vivir en la base, la versión es la misma para todos los workers y cubre
+# cualquier ruta de escritura (routers, importaciones, checkout...).
+VERSIONED_TABLES = ("libro", "categoria")
+
+
+POSTGRES_VERSION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION bump_version_tabla() RETURNS trigger AS $$
+    BEGIN
+        UPDATE versiontabla SET version = version + 1, actualizado = now() WHERE tabla = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def version_ddl(dialect_name: str) -> List[str]:
+    # Filas iniciales de versiontabla y los triggers que las incrementan
+    ddl = [
+        f"INSERT INTO versiontabla (tabla, version, actualizado) VALUES ('{tabla}', 0, CURRENT_TIMESTAMP) ON CONFLICT DO NOTHING"
+        for tabla in VERSIONED_TABLES
+    ]
+
+    if dialect_name == "postgresql":
+        ddl.append(POSTGRES_VERSION_FUNCTION)
+        for tabla in VERSIONED_TABLES:
+            ddl.append(f"""
+                CREATE OR REPLACE TRIGGER {tabla}_version
+                AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_version_tabla()
+            """)
+        return ddl
+
+    for tabla in VERSIONED_TABLES:
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            ddl.append(f"""
+                CREATE TRIGGER IF NOT EXISTS {tabla}_version_{evento.lower()}
+                AFTER {evento} ON {tabla} BEGIN
+                    UPDATE versiontabla
+                    SET version = version + 1, actualizado = CURRENT_TIMESTAMP
+                    WHERE tabla = '{tabla}';
+                END
+            """)
+    return ddl
+
+
+def create_version_triggers(engine):
+    with engine.begin() as conn:
+        for ddl in version_ddl(engine.dialect.name):
+            conn.execute(text(ddl))
+
+
+'''
+VALIDADORES (ETag / Last-Modified)
+'''
+def versions_query(tables: Sequence[str]):
+    return select(VersionTabla).where(VersionTabla.tabla.in_(tables))
+
+
+def catalog_validators(request: Request, versiones: Sequence[VersionTabla]) -> Tuple[str, datetime]:
+    # Misma URL + mismas versiones => mismo cuerpo, así que el ETag no
+    # necesita el contenido serializado
+    firma = cache_key(request) + "|" + ",".join(
+        f"{v.tabla}:{v.version}" for v in sorted(versiones, key=lambda v: v.tabla)
+    )
+    etag = '"' + hashlib.blake2b(firma.encode(), digest_size=12).hexdigest() + '"'
+
+    last_modified = max(
+        (v.actualizado for v in versiones),
+        default=datetime(1970, 1, 1)
+    ).replace(tzinfo=timezone.utc, microsecond=0)
+
+    return etag, last_modified
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in etags or etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def _conditional_headers(request: Request, versiones: Sequence[VersionTabla]) -> Tuple[Dict[str, str], bool]:
+    etag, last_modified = catalog_validators(request, versiones)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": config.CATALOG_CACHE_CONTROL,
+    }
+    return headers, is_not_modified(request, etag, last_modified)
+
+
+def conditional_headers(request: Request, session: Session, tables: Iterable[str]) -> Tuple[Dict[str, str], bool]:
+    return _conditional_headers(request, session.exec(versions_query(tuple(tables))).all())
+
+
+async def conditional_headers_async(request: Request, session: AsyncSession, tables: Iterable[str]) -> Tuple[Dict[str, str], bool]:
+    return _conditional_headers(request, (await session.exec(versions_query(tuple(tables)))).all())
+
+
+def conditional_json(
+    request: Request,
+    session: Session,
+    tables: Iterable[str],
+    build: Callable[[], Tuple[bytes, Iterable[str]]]
+) -> Response:
+    headers, not_modified = conditional_headers(request, session, tables)
+
+    # 304 antes de consultar o serializar el catálogo
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    # El ETag forma parte de la llave: una escritura hecha por otro worker
+    # cambia la versión y nunca se sirve una entrada vieja de esta caché
+    response = cached_json(request, build, key=f"{cache_key(request)}#{headers['ETag']}")
+    response.headers.update(headers)
+    return response
+
+
+async def conditional_json_async(
+    request: Request,
+    session: AsyncSession,
+    tables: Iterable[str],
+    build: Callable[[], Awaitable[Tuple[bytes, Iterable[str]]]]
+) -> Response:
+    headers, not_modified = await conditional_headers_async(request, session, tables)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response = await cached_json_async(request, build, key=f"{cache_key(request)}#{headers['ETag']}")
+    response.headers.update(headers)
+    return response